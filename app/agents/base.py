@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict
+from app.core.metrics import metrics
+from app.models.domain import GitHubIssue
+from app.utils.extractors import ContextExtractor
 
 class BaseAgent(ABC):
     @abstractmethod
@@ -8,3 +11,21 @@ class BaseAgent(ABC):
         Process the input data and return a result dictionary.
         """
         pass
+
+    @property
+    def metric_name(self) -> str:
+        return type(self).__name__.removesuffix("Agent").lower()
+
+    def prompt_body(self, issue: GitHubIssue, max_tokens: int) -> str:
+        """
+        The issue body trimmed to a token budget for an LLM prompt. Raw and
+        trimmed sizes are recorded as prompt.<agent>.body_chars_raw/_trimmed.
+        """
+        raw = issue.body or ""
+        trimmed = ContextExtractor.prepare_for_prompt(raw, max_tokens)
+        metrics.observe(f"prompt.{self.metric_name}.body_chars_raw", len(raw))
+        metrics.observe(f"prompt.{self.metric_name}.body_chars_trimmed", len(trimmed))
+        return trimmed or "No description provided."
+
+    def record_prompt(self, prompt: str):
+        metrics.observe(f"prompt.{self.metric_name}.prompt_chars", len(prompt))
@@ -1,20 +1,286 @@
 from app.agents.base import BaseAgent
 from app.services.llm import llm_service
+from app.services.embedding_cache import normalize_text
 from app.models.domain import GitHubIssue
+from app.models.llm import BatchClassification, Classification
 from app.config.settings import get_settings
+from app.core.cache import TTLCache
+from app.core.metrics import metrics
+import asyncio
+import hashlib
 import logging
-import json
+import re
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# LLM classifications keyed by issue content, shared across agent instances
+classification_cache = TTLCache(
+    ttl=settings.CLASSIFICATION_CACHE_TTL,
+    max_entries=settings.CLASSIFICATION_CACHE_SIZE,
+    name="classifier.cache"
+)
+
+def classification_key(issue: GitHubIssue) -> str:
+    return hashlib.sha256(f"{normalize_text(issue.title)}\0{normalize_text(issue.body or '')}".encode()).hexdigest()
+
+# Signal strengths: an explicit label or issue-template marker is usually
+# decisive, a keyword alone is not (it stays below the default threshold)
+LABEL_CONFIDENCE = 0.95
+TEMPLATE_CONFIDENCE = 0.9
+KEYWORD_CONFIDENCE = 0.6
+
+LABEL_CATEGORIES = {
+    "bug": "bug",
+    "enhancement": "feature",
+    "feature": "feature",
+    "feature request": "feature",
+    "question": "question",
+    "documentation": "docs",
+    "docs": "docs",
+    "security": "security",
+}
+
+TEMPLATE_MARKERS = {
+    "bug": [r"\bbug report\b", r"steps to reproduce", r"expected behaviou?r", r"actual behaviou?r"],
+    "feature": [r"\bfeature request\b", r"is your feature request related to a problem", r"describe the solution you'?d like"],
+    "docs": [r"\bdocumentation (?:issue|request|improvement)\b"],
+    "security": [r"\bsecurity (?:vulnerability|issue|report)\b", r"\bCVE-\d{4}-\d+"],
+    "question": [r"^\s*#+\s*question\b"],
+}
+
+# "[Bug] ...", "feat: ...", "Docs: ..."
+TITLE_PREFIX = re.compile(r"^\s*\[?(bug|feature|feat|docs?|question|security)\]?\s*[:\]-]", re.IGNORECASE)
+TITLE_PREFIX_CATEGORIES = {"bug": "bug", "feature": "feature", "feat": "feature", "doc": "docs", "docs": "docs", "question": "question", "security": "security"}
+
+KEYWORDS = {
+    "bug": [r"\bcrash(?:es|ed)?\b", r"\bexception\b", r"\btraceback\b", r"\bbroken\b", r"\bfails?\b", r"\berror\b"],
+    "feature": [r"\badd support\b", r"\bwould be nice\b", r"\bplease add\b"],
+    "question": [r"\bhow (?:do|can|to)\b"],
+    "docs": [r"\btypo\b", r"\breadme\b"],
+    "security": [r"\bvulnerab", r"\bxss\b", r"\binjection\b"],
+}
+
+class RuleClassifier:
+    """
+    Cheap local classifier from issue labels, issue-template markers, title
+    prefixes and keywords. Returns a result only when one category clearly
+    wins; conflicting signals lower the confidence. A security signal is
+    never outranked: a vulnerability filed with the bug template must not
+    get the public bug response.
+    """
+
+    def classify(self, issue: GitHubIssue) -> dict | None:
+        scores: dict[str, float] = {}
+        reasons: dict[str, str] = {}
+
+        def signal(category: str, strength: float, reason: str):
+            if strength > scores.get(category, 0.0):
+                scores[category] = strength
+                reasons[category] = reason
+
+        for label in issue.labels:
+            name = (label.get("name") if isinstance(label, dict) else str(label)).lower()
+            name = re.sub(r"^(?:type|kind)\s*[:/]\s*", "", name)
+            if name in LABEL_CATEGORIES:
+                signal(LABEL_CATEGORIES[name], LABEL_CONFIDENCE, f"labelled '{name}'")
+
+        prefix = TITLE_PREFIX.match(issue.title)
+        if prefix:
+            signal(TITLE_PREFIX_CATEGORIES[prefix.group(1).lower()], TEMPLATE_CONFIDENCE, f"title prefix '{prefix.group(0).strip()}'")
+
+        body = issue.body or ""
+        for category, patterns in TEMPLATE_MARKERS.items():
+            for pattern in patterns:
+                if re.search(pattern, body, re.IGNORECASE | re.MULTILINE):
+                    signal(category, TEMPLATE_CONFIDENCE, "issue template")
+                    break
+
+        text = f"{issue.title}\n{body}"
+        for category, patterns in KEYWORDS.items():
+            if any(re.search(pattern, text, re.IGNORECASE) for pattern in patterns):
+                signal(category, KEYWORD_CONFIDENCE, "keywords")
+
+        if not scores:
+            return None
+
+        if "security" in scores:
+            # As confident as the strongest signal, whichever category it was for
+            return {
+                "category": "security",
+                "confidence": max(scores.values()),
+                "reasoning": f"Rule-based: {reasons['security']}."
+            }
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        category, confidence = ranked[0]
+        if len(ranked) > 1:
+            runner_up = ranked[1][1]
+            confidence = 0.5 if runner_up >= TEMPLATE_CONFIDENCE else confidence - 0.1
+
+        return {
+            "category": category,
+            "confidence": confidence,
+            "reasoning": f"Rule-based: {reasons[category]}."
+        }
+
 class ClassifierAgent(BaseAgent):
     def __init__(self):
         self.categories = ["bug", "feature", "question", "docs", "security"]
-        
+        self.rules = RuleClassifier()
+        self.confidence_threshold = settings.CLASSIFICATION_CONFIDENCE_THRESHOLD
+
+    def classify_fast(self, issue: GitHubIssue) -> dict | None:
+        """
+        Classify without the LLM: a cached LLM result for the same content,
+        or the local rules when they are at least
+        CLASSIFICATION_CONFIDENCE_THRESHOLD confident. None otherwise.
+        """
+        cached = classification_cache.get(classification_key(issue))
+        if cached is not None:
+            metrics.inc("classifier.source.cache")
+            return {**cached, "source": "cache"}
+
+        ruled = self.rules.classify(issue)
+        if ruled and ruled["confidence"] >= self.confidence_threshold:
+            metrics.inc("classifier.source.rules")
+            logger.info(f"Classified as {ruled['category']} by rules (confidence: {ruled['confidence']})")
+            return {**ruled, "source": "rules"}
+        return None
+
+    def remember(self, issue: GitHubIssue, result: dict):
+        """Cache a model-produced classification for this issue's content."""
+        if result.get("source") in ("llm", "fused", "batch"):
+            classification_cache.set(classification_key(issue), {
+                k: v for k, v in result.items() if k in ("category", "confidence", "reasoning")
+            })
+
     async def process(self, issue: GitHubIssue) -> dict:
+        """
+        Classify an issue, cheapest source first: the cache, then the local
+        rules, then the LLM.
+        """
         logger.info(f"Classifying issue #{issue.number}")
-        
+
+        fast = self.classify_fast(issue)
+        if fast is not None:
+            return fast
+
+        metrics.inc("classifier.source.llm")
+        result = await self._classify_llm(issue)
+        self.remember(issue, result)
+        return result
+
+    async def classify_many(self, issues: list[GitHubIssue]) -> list[dict]:
+        """
+        Classify many issues with as few LLM calls as possible. Issues the
+        cache or rules can answer skip the LLM; the rest are packed into
+        prompts of at most CLASSIFICATION_BATCH_MAX_ITEMS issues and
+        CLASSIFICATION_BATCH_TOKEN_BUDGET estimated tokens. Items missing
+        or invalid in a batch response are retried individually.
+
+        Returns one result per issue, in order.
+        """
+        results: list[dict | None] = [self.classify_fast(issue) for issue in issues]
+        pending = [i for i, result in enumerate(results) if result is None]
+
+        batches = self._pack([issues[i] for i in pending])
+        outcomes = await asyncio.gather(*(self._classify_batch(batch) for batch in batches))
+
+        offset = 0
+        retries = []
+        for batch, outcome in zip(batches, outcomes):
+            for j, result in enumerate(outcome):
+                index = pending[offset + j]
+                if result is None:
+                    retries.append(index)
+                else:
+                    results[index] = result
+                    self.remember(issues[index], result)
+            offset += len(batch)
+
+        if retries:
+            metrics.inc("classifier.batch.retried_items", len(retries))
+            retried = await asyncio.gather(*(self.process(issues[i]) for i in retries))
+            for index, result in zip(retries, retried):
+                results[index] = result
+
+        return results
+
+    def _item_text(self, issue: GitHubIssue) -> str:
+        return f"Title: {issue.title}\nBody:\n{self.prompt_body(issue, settings.CLASSIFIER_BODY_TOKEN_BUDGET)}"
+
+    def _pack(self, issues: list[GitHubIssue]) -> list[list[GitHubIssue]]:
+        # ~4 characters per token is close enough for budgeting
+        budget = settings.CLASSIFICATION_BATCH_TOKEN_BUDGET * 4
+        batches: list[list[GitHubIssue]] = []
+        current: list[GitHubIssue] = []
+        used = 0
+        body_budget = settings.CLASSIFIER_BODY_TOKEN_BUDGET * 4
+        for issue in issues:
+            # Bodies are trimmed to their budget when the prompt is built
+            size = len(issue.title) + min(len(issue.body or ""), body_budget)
+            if current and (used + size > budget or len(current) >= settings.CLASSIFICATION_BATCH_MAX_ITEMS):
+                batches.append(current)
+                current, used = [], 0
+            current.append(issue)
+            used += size
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _classify_batch(self, batch: list[GitHubIssue]) -> list[dict | None]:
+        """
+        Classify a packed batch in one call. Returns a result or None (to
+        be retried alone) per issue.
+        """
+        if len(batch) == 1:
+            metrics.inc("classifier.source.llm")
+            result = await self._classify_llm(batch[0])
+            return [None if result.get("source") == "fallback" else result]
+
+        items = "\n\n".join(
+            f"### Issue {n}\n{self._item_text(issue)}" for n, issue in enumerate(batch, start=1)
+        )
+        prompt = f"""
+        You are an expert at classifying GitHub issues.
+        Categories: {', '.join(self.categories)}
+
+        Classify each of the {len(batch)} issues below. Respond with a JSON
+        array containing one object per issue with:
+        1. "id": The issue's number from its "### Issue <n>" heading.
+        2. "category": The best matching category from the list above.
+        3. "confidence": A float between 0.0 and 1.0 indicating your confidence.
+        4. "reasoning": A brief explanation of why you chose this category.
+
+        {items}
+
+        Respond ONLY with the valid JSON array.
+        """
+
+        metrics.inc("classifier.source.batch")
+        metrics.observe("classifier.batch.size", len(batch))
+        self.record_prompt(prompt)
+        try:
+            parsed = await llm_service.generate_structured(prompt, list[BatchClassification])
+        except Exception as e:
+            logger.warning(f"Batch classification of {len(batch)} issues failed: {e}")
+            return [None] * len(batch)
+
+        by_id = {item.id: item for item in parsed}
+
+        results: list[dict | None] = []
+        for n in range(1, len(batch) + 1):
+            item = by_id.get(n)
+            results.append(None if item is None else {
+                "category": item.category,
+                "confidence": item.confidence,
+                "reasoning": item.reasoning,
+                "source": "batch"
+            })
+        return results
+
+    async def _classify_llm(self, issue: GitHubIssue) -> dict:
         prompt = f"""
         You are an expert at classifying GitHub issues.
         Categories: {', '.join(self.categories)}
@@ -27,31 +293,29 @@ class ClassifierAgent(BaseAgent):
         Issue Title: {issue.title}
         
         Issue Body:
-        {issue.body or "No description provided."}
+        {self.prompt_body(issue, settings.CLASSIFIER_BODY_TOKEN_BUDGET)}
         
         Respond ONLY with the valid JSON string.
         """
+        self.record_prompt(prompt)
         
         try:
-            response_text = await llm_service.generate_content(prompt)
-            
-            # Clean up potential markdown formatting in response (e.g. ```json ... ```)
-            cleaned_response = response_text.replace("```json", "").replace("```", "").strip()
-            
-            result = json.loads(cleaned_response)
-            
-            # Validate category
-            if result.get("category") not in self.categories:
-                logger.warning(f"Invalid category returned: {result.get('category')}")
-                result["category"] = "question" # Default fallback
-                
-            logger.info(f"Classified as {result['category']} (confidence: {result.get('confidence')})")
+            classification = await llm_service.generate_structured(prompt, Classification)
+            result = {**classification.model_dump(), "source": "llm"}
+            logger.info(f"Classified as {result['category']} (confidence: {result['confidence']})")
             return result
             
         except Exception as e:
+            # Includes CircuitOpenError: the rules' answer, even below the
+            # threshold, beats a blind guess
             logger.error(f"Classification failed: {e}")
+            ruled = self.rules.classify(issue)
+            if ruled is not None:
+                metrics.inc("classifier.source.rules_fallback")
+                return {**ruled, "source": "fallback"}
             return {
                 "category": "question",
                 "confidence": 0.0,
-                "reasoning": "Classification failed due to error."
+                "reasoning": "Classification failed due to error.",
+                "source": "fallback"
             }
@@ -0,0 +1,66 @@
+from app.agents.base import BaseAgent
+from app.services.llm import llm_service
+from app.models.domain import GitHubIssue
+from app.models.llm import FusedTriage
+from app.config.settings import get_settings
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+TEAM_PLACEHOLDER = "{team}"
+
+class FusedTriageAgent(BaseAgent):
+    """
+    Classifies an issue and drafts the reply in a single LLM call, so the
+    issue text is sent once instead of twice. Routing depends on the
+    category, so the draft refers to the team as a placeholder that
+    ResponderAgent.finalize fills in once the issue is routed.
+    """
+
+    def __init__(self):
+        self.categories = ["bug", "feature", "question", "docs", "security"]
+
+    async def process(self, issue: GitHubIssue) -> dict | None:
+        """
+        Return {"category", "confidence", "reasoning", "draft", "source"},
+        or None if the response could not be parsed, in which case the
+        caller falls back to separate classify and respond calls.
+        """
+        logger.info(f"Classifying and drafting a reply for issue #{issue.number} in one call")
+
+        prompt = f"""
+        You are a helpful GitHub bot assistant that triages issues.
+        Categories: {', '.join(self.categories)}
+
+        Analyze the following issue and respond with a JSON object containing:
+        1. "category": The best matching category from the list above.
+        2. "confidence": A float between 0.0 and 1.0 indicating your confidence.
+        3. "reasoning": A brief explanation of why you chose this category.
+        4. "reply": A polite, helpful reply to the user that acknowledges the
+           issue type, says it has been routed to {TEAM_PLACEHOLDER} (write
+           that placeholder literally, it is replaced with the team name),
+           is concise and professional, and does not promise a timeline.
+
+        Issue Title: {issue.title}
+
+        Issue Body:
+        {self.prompt_body(issue, settings.CLASSIFIER_BODY_TOKEN_BUDGET)}
+
+        Respond ONLY with the valid JSON string.
+        """
+        self.record_prompt(prompt)
+
+        try:
+            result = await llm_service.generate_structured(prompt, FusedTriage)
+        except Exception as e:
+            logger.warning(f"Fused triage call failed: {e}")
+            return None
+
+        return {
+            "category": result.category,
+            "confidence": result.confidence,
+            "reasoning": result.reasoning,
+            "draft": result.reply.strip(),
+            "source": "fused"
+        }
@@ -1,74 +1,273 @@
+import asyncio
 import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+from app.config.settings import get_settings
+from app.core.metrics import metrics
 from app.models.domain import WebhookPayload
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Issue actions that run the full triage pipeline
+TRIAGE_ACTIONS = {"opened", "reopened"}
+# Issue actions that only update the similarity index
+INDEX_ACTIONS = {"edited", "closed", "deleted"}
+
+def repository_of(payload: WebhookPayload) -> str:
+    return payload.repository.full_name if payload.repository else "unknown"
+
+@dataclass
+class Stage:
+    """
+    A unit of work in the issue pipeline. `func` receives the results of
+    all previously completed stages, keyed by stage name.
+    """
+    name: str
+    func: Callable[[dict], Awaitable[Any]]
+    deps: tuple[str, ...] = ()
+
+async def run_stages(stages: list[Stage]) -> tuple[dict, dict]:
+    """
+    Run stages as a dependency DAG: each stage starts as soon as its
+    dependencies have finished, so independent stages run concurrently.
+    Stages must be listed after their dependencies.
+
+    Returns (results, timings) where timings are per-stage wall-clock ms.
+    If any stage fails, the remaining stages are cancelled and the error
+    is re-raised.
+    """
+    results: dict[str, Any] = {}
+    timings: dict[str, float] = {}
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def run(stage: Stage):
+        if stage.deps:
+            await asyncio.gather(*(tasks[dep] for dep in stage.deps))
+        start = time.perf_counter()
+        try:
+            results[stage.name] = await stage.func(results)
+        finally:
+            timings[stage.name] = (time.perf_counter() - start) * 1000
+
+    defined: set[str] = set()
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in defined]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on undefined stages: {missing}")
+        defined.add(stage.name)
+
+    for stage in stages:
+        tasks[stage.name] = asyncio.create_task(run(stage), name=f"stage-{stage.name}")
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except Exception:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    return results, timings
+
+@dataclass
+class Agents:
+    """The agents one orchestrator uses, built once and shared by all issues."""
+    classifier: Any
+    fused: Any
+    similarity: Any
+    router: Any
+    responder: Any
+
+    @classmethod
+    def build(cls) -> "Agents":
+        from app.agents.classifier import ClassifierAgent
+        from app.agents.fused import FusedTriageAgent
+        from app.agents.similarity import SimilarityAgent
+        from app.agents.router import RouterAgent
+        from app.agents.responder import ResponderAgent
+
+        return cls(
+            classifier=ClassifierAgent(),
+            fused=FusedTriageAgent(),
+            similarity=SimilarityAgent(),
+            router=RouterAgent(),
+            responder=ResponderAgent(),
+        )
 
 class AgentOrchestrator:
-    def __init__(self):
-        pass
-        
+    def __init__(self, agents: Agents | None = None, github=None):
+        self._agents = agents
+        self._github = github
+
+    @property
+    def agents(self) -> Agents:
+        # Built on first use when not injected, e.g. in scripts and tests
+        if self._agents is None:
+            self._agents = Agents.build()
+        return self._agents
+
+    @property
+    def github(self):
+        # Injected by the container; the module default otherwise
+        if self._github is None:
+            from app.services.github import github_service
+            self._github = github_service
+        return self._github
+
+    async def handle_event(self, payload: WebhookPayload):
+        """
+        Entry point for queued webhook events.
+        """
+        if payload.action in TRIAGE_ACTIONS:
+            return await self.process_issue(payload)
+        if payload.action in INDEX_ACTIONS:
+            return await self.sync_index(payload)
+        logger.info(f"No handler for action {payload.action}")
+
+    async def prepare_batch(self, payloads: list[WebhookPayload]):
+        """
+        Classify a backlog of new issues with batched LLM calls. The results
+        land in the classification cache, so each job's own classify stage
+        is a cache hit.
+        """
+        issues = [p.issue for p in payloads if p.action in TRIAGE_ACTIONS and p.issue]
+        if len(issues) < 2:
+            return
+
+        await self.agents.classifier.classify_many(issues)
+        logger.info(f"Pre-classified a batch of {len(issues)} issues")
+
+    async def sync_index(self, payload: WebhookPayload):
+        """
+        Update the similarity index for an edited, closed or deleted issue.
+        """
+        if not payload.issue:
+            logger.warning("Payload received but no issue data found")
+            return
+
+        return await self.agents.similarity.sync(payload.issue, payload.action, repo=repository_of(payload))
+
     async def process_issue(self, payload: WebhookPayload):
         """
         Orchestrate the processing of a new issue.
-        For now, just log the event.
+
+        Classification and duplicate detection are independent and run
+        concurrently. GitHub writes go through one per-issue mutation
+        buffer: labels and assignees are flushed as soon as routing is
+        done, overlapping response generation, and the comment is flushed
+        once the reply is ready. End-to-end latency is bounded by the
+        critical path classify -> route -> respond -> comment. With
+        SEMANTIC_ROUTING, route also waits for similarity, whose embedding
+        it reuses.
+
+        With LLM_FUSED_TRIAGE, an issue the cache and rules cannot classify
+        gets one LLM call that returns the category and a draft reply;
+        respond then only fills in the routed team.
+
+        The whole pipeline is bounded by TRIAGE_TIMEOUT_SECONDS; on timeout
+        the stages are cancelled and TimeoutError is raised, so the queue
+        retries the job later.
         """
         if not payload.issue:
             logger.warning("Payload received but no issue data found")
             return
-            
+
         issue = payload.issue
         logger.info(f"Processing issue #{issue.number}: {issue.title}")
-        
-        # Call classification agent
-        from app.agents.classifier import ClassifierAgent
-        classifier = ClassifierAgent()
-        classification_result = await classifier.process(issue)
-        
-        logger.info(f"Issue #{issue.number} classified as: {classification_result['category']}")
 
-        # Call similarity agent (Phase 2)
-        from app.agents.similarity import SimilarityAgent
-        similarity_agent = SimilarityAgent()
-        similarity_result = await similarity_agent.process(issue)
-        
-        if similarity_result["is_duplicate"]:
-            duplicates = [d['number'] for d in similarity_result['duplicates']]
-            logger.info(f"Issue #{issue.number} is a potential duplicate of: {duplicates}")
-            # Add context to routing/response if needed
-
-        
-        # Call routing agent
-        from app.agents.router import RouterAgent
-        router = RouterAgent()
-        routing_result = await router.process(issue, category=classification_result.get("category", "question"))
-        
-        logger.info(f"Issue #{issue.number} routed to: {routing_result['team']}")
+        github_service = self.github
+        agents = self.agents
+        classifier = agents.classifier
+        similarity_agent = agents.similarity
+        router = agents.router
+        responder = agents.responder
 
-        # Apply label via GitHub API
-        from app.services.github import github_service
-        category = classification_result.get("category", "question")
-        await github_service.add_labels(issue, [f"triage/{category}"])
+        def category_of(results: dict) -> str:
+            return results["classify"].get("category", "question")
 
-        # Call response agent
-        from app.agents.responder import ResponderAgent
-        responder = ResponderAgent()
-        
-        # Add duplicates context if available
-        context = {}
-        if 'similarity_result' in locals() and similarity_result['is_duplicate']:
-             context['duplicates'] = similarity_result['duplicates']
-
-        response_result = await responder.process(
-            issue, 
-            category=classification_result.get("category", "question"),
-            team=routing_result.get("team", "triage-team")
-        )
-        
-        # Post comment via GitHub API
-        if response_result.get("response"):
-            await github_service.post_comment(issue, response_result["response"])
-        
-        logger.info(f"Finished processing issue #{issue.number}")
+        async def classify(results: dict):
+            classification_result = classifier.classify_fast(issue)
+            if classification_result is None and settings.LLM_FUSED_TRIAGE:
+                # One call for classification and the draft reply
+                classification_result = await agents.fused.process(issue)
+                if classification_result is not None:
+                    metrics.inc("orchestrator.fused.used")
+                    classifier.remember(issue, classification_result)
+                else:
+                    metrics.inc("orchestrator.fused.fallback")
+            if classification_result is None:
+                classification_result = await classifier.process(issue)
+            logger.info(f"Issue #{issue.number} classified as: {classification_result['category']}")
+            return classification_result
+
+        async def similarity(results: dict):
+            similarity_result = await similarity_agent.process(issue, repo=repository_of(payload))
+            if similarity_result["is_duplicate"]:
+                duplicates = [d['number'] for d in similarity_result['duplicates']]
+                logger.info(f"Issue #{issue.number} is a potential duplicate of: {duplicates}")
+            return similarity_result
+
+        async def route(results: dict):
+            # None when no embedding is available; the router then uses its rules only
+            embedding = results["similarity"].get("embedding") if "similarity" in results else None
+            routing_result = await router.process(
+                issue, category=category_of(results), repo=repository_of(payload), embedding=embedding
+            )
+            logger.info(f"Issue #{issue.number} routed to: {routing_result['team']}")
+            return routing_result
+
+        async def respond(results: dict):
+            team = results["route"].get("team", "triage-team")
+            draft = results["classify"].get("draft")
+            if draft:
+                return responder.finalize(draft, team, router.known_teams)
+            return await responder.process(issue, category=category_of(results), team=team)
+
+        mutations = github_service.mutations(issue)
+
+        async def label(results: dict):
+            # Labels and assignees do not need the reply, so send them early
+            mutations.add_labels([f"triage/{category_of(results)}"])
+            team = results["route"].get("team", "triage-team")
+            mutations.add_assignees(settings.TEAM_ASSIGNEES.get(team, []))
+            return await github_service.flush(mutations)
+
+        async def comment(results: dict):
+            response_result = results["respond"]
+            if response_result.get("response"):
+                mutations.set_comment(response_result["response"])
+            return await github_service.flush(mutations)
+
+        stages = [
+            Stage("classify", classify),
+            Stage("similarity", similarity),
+            # Semantic routing reuses the similarity stage's embedding
+            Stage("route", route, deps=("classify", "similarity") if router.centroids is not None else ("classify",)),
+            Stage("label", label, deps=("classify", "route")),
+            Stage("respond", respond, deps=("classify", "route")),
+            Stage("comment", comment, deps=("respond", "label")),
+        ]
+
+        start = time.perf_counter()
+        try:
+            results, timings = await asyncio.wait_for(run_stages(stages), timeout=settings.TRIAGE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            metrics.inc("orchestrator.timeouts")
+            logger.error(f"Processing issue #{issue.number} timed out after {settings.TRIAGE_TIMEOUT_SECONDS}s")
+            raise TimeoutError(f"Triage of issue #{issue.number} exceeded {settings.TRIAGE_TIMEOUT_SECONDS}s")
+        total_ms = (time.perf_counter() - start) * 1000
+
+        for name, elapsed in timings.items():
+            metrics.observe(f"orchestrator.stage.{name}_ms", elapsed)
+        metrics.observe("orchestrator.total_ms", total_ms)
+        metrics.inc("orchestrator.issues_processed")
+
+        stage_summary = ", ".join(f"{name}={elapsed:.0f}ms" for name, elapsed in timings.items())
+        logger.info(f"Finished processing issue #{issue.number} in {total_ms:.0f}ms ({stage_summary})")
+
+        return {"results": results, "timings": timings, "total_ms": total_ms}
 
 # Global instance for now
 orchestrator = AgentOrchestrator()
@@ -3,6 +3,7 @@ from app.services.llm import llm_service
 from app.models.domain import GitHubIssue
 from app.config.settings import get_settings
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -40,7 +41,7 @@ class ResponderAgent(BaseAgent):
         prompt = f"""
         You are a helpful GitHub bot assistant.
         Issue Title: {issue.title}
-        Issue Body: {issue.body}
+        Issue Body: {self.prompt_body(issue, settings.RESPONDER_BODY_TOKEN_BUDGET)}
         Category: {category}
         Assigned Team: {team}
         
@@ -50,6 +51,7 @@ class ResponderAgent(BaseAgent):
         - Be concise and professional.
         - Do not promise a specific timeline, but say someone will look at it.
         """
+        self.record_prompt(prompt)
         
         try:
             response_text = await llm_service.generate_content(prompt)
@@ -66,3 +68,17 @@ class ResponderAgent(BaseAgent):
             "response": response_text.strip(),
             "generated_by": "llm" if "Unavailable" not in response_text else "template"
         }
+
+    def finalize(self, draft: str, team: str, known_teams: set[str] = frozenset()) -> dict:
+        """
+        Turn a draft reply written before routing into the final response:
+        fill in the team placeholder, and correct any other team the model
+        named on its own.
+        """
+        response_text = draft.replace("{team}", team)
+        for other in known_teams - {team}:
+            response_text = re.sub(rf"\b{re.escape(other)}\b", team, response_text)
+        return {
+            "response": response_text.strip(),
+            "generated_by": "llm"
+        }
@@ -1,56 +1,80 @@
 from app.agents.base import BaseAgent
 from app.models.domain import GitHubIssue
+from app.config.settings import get_settings
+from app.services.routing_rules import CompiledRules, load_routing_config
+from app.services.team_centroids import TeamCentroidService, team_centroids
+from app.core.metrics import metrics
+import numpy as np
 import logging
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 class RouterAgent(BaseAgent):
-    def __init__(self):
-        # Basic routing rules
-        self.rules = {
-            "bug": {
-                "auth": "backend-team",
-                "login": "backend-team",
-                "ui": "frontend-team",
-                "css": "frontend-team",
-                "security": "security-team"
-            },
-            "feature": {
-                "default": "product-team"
-            },
-            "security": {
-                "default": "security-team"
-            },
-            "docs": {
-                "default": "docs-team"
-            }
-        }
-        
-    async def process(self, issue: GitHubIssue, category: str = "question") -> dict:
-        logger.info(f"Routing issue #{issue.number} (Category: {category})")
-        
-        # Default team
-        team = "triage-team"
-        
-        # Check rule based routing
-        text = f"{issue.title} {issue.body}".lower()
-        
-        if category in self.rules:
-            category_rules = self.rules[category]
-            
-            # Check keywords for specific sub-routing
-            for keyword, target_team in category_rules.items():
-                if keyword != "default" and keyword in text:
-                    team = target_team
-                    break
-            
-            # Use default for category if no keyword matched
-            if team == "triage-team" and "default" in category_rules:
-                team = category_rules["default"]
-                
-        logger.info(f"Routed to: {team}")
-        
+    """
+    Routes issues to teams with per-repository rules from ROUTING_RULES_FILE
+    (or the built-in defaults), compiled once when the agent is built.
+
+    With SEMANTIC_ROUTING, issues without any rule signal go to the team
+    whose earlier issues are closest to the issue's embedding (see
+    app/services/team_centroids.py). Only issues routed by rules or pinned
+    categories are added to the centroids, so the router does not learn
+    from its own guesses.
+    """
+
+    def __init__(self, config: dict | None = None, centroids: TeamCentroidService | None = None):
+        config = config or load_routing_config(settings.ROUTING_RULES_FILE)
+        self.centroids = centroids or (team_centroids if settings.SEMANTIC_ROUTING else None)
+        self.default_rules = CompiledRules.compile(config["default"])
+        self.repo_rules = {repo: CompiledRules.compile(section) for repo, section in config["repos"].items()}
+
+    def rules_for(self, repo: str) -> CompiledRules:
+        return self.repo_rules.get(repo, self.default_rules)
+
+    @property
+    def known_teams(self) -> set[str]:
+        teams = set(self.default_rules.teams)
+        for rules in self.repo_rules.values():
+            teams.update(rules.teams)
+        return teams
+
+    async def _route_semantic(self, issue: GitHubIssue, result: dict, repo: str, embedding: np.ndarray) -> dict:
+        centroids = await self.centroids.load(repo)
+        if result["source"] != "default":
+            self.centroids.record(repo, str(issue.id), result["team"], embedding)
+            return result
+
+        nearest = centroids.nearest(embedding, settings.SEMANTIC_ROUTING_MIN_ISSUES)
+        if nearest is None or nearest[1] < settings.SEMANTIC_ROUTING_MIN_SIMILARITY:
+            return result
+
+        team, similarity = nearest
+        metrics.inc("router.semantic")
         return {
             "team": team,
-            "reasoning": f"Based on category '{category}' and keywords in valid rules."
+            "score": similarity,
+            "source": "semantic",
+            "reasoning": f"No routing signals; closest to {team}'s earlier issues (similarity {similarity:.2f})."
         }
+
+    async def process(
+        self,
+        issue: GitHubIssue,
+        category: str = "question",
+        repo: str = "unknown",
+        embedding: np.ndarray | None = None
+    ) -> dict:
+        """
+        Route with the repository's rules. `embedding` is the issue's
+        embedding from SimilarityAgent, used for semantic routing when
+        enabled; no model is called here.
+        """
+        logger.info(f"Routing issue #{issue.number} (Category: {category})")
+
+        labels = [label.get("name", "") if isinstance(label, dict) else str(label) for label in issue.labels]
+        result = self.rules_for(repo).route(issue.title, issue.body or "", labels, category)
+        if self.centroids is not None and embedding is not None:
+            result = await self._route_semantic(issue, result, repo, embedding)
+
+        logger.info(f"Routed to: {result['team']}")
+        return result
@@ -1,65 +1,213 @@
 from app.agents.base import BaseAgent
 from app.services.embedding import embedding_service
-from app.services.vectorstore import vector_store
+from app.services.lexical_index import BM25Index, lexical_fields, lexical_index, reciprocal_rank_fusion
+from app.services.vectorstore import VectorStore, vector_store
 from app.models.domain import GitHubIssue
 from app.config.settings import get_settings
+from app.core.metrics import metrics
+import asyncio
+import numpy as np
 import logging
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Background indexing tasks started by signature short-circuits; held so
+# they are not garbage collected before finishing
+_background_tasks: set[asyncio.Task] = set()
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> float:
+    denominator = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(np.dot(a, b)) / denominator if denominator else 0.0
+
 class SimilarityAgent(BaseAgent):
     def __init__(self):
         self.threshold = settings.SIMILARITY_THRESHOLD
-        
-    async def process(self, issue: GitHubIssue) -> dict:
-        logger.info(f"Checking for duplicates for issue #{issue.number}")
-        
-        text = f"{issue.title} {issue.body or ''}"
-        
-        # 1. Generate embedding
-        embedding = embedding_service.encode(text)
-        if not embedding:
-            return {"duplicates": [], "is_duplicate": False}
-            
-        # 2. Search vector store
-        results = vector_store.search(embedding)
-        
-        duplicates = []
-        if results and results['ids']:
-            ids = results['ids'][0]
-            distances = results['distances'][0]
-            metadatas = results['metadatas'][0]
-            
-            for i, dist in enumerate(distances):
-                # Distance is usually cosine distance (1 - similarity) or euclidean
-                # Chroma default is L2. For cosine, lower is closer.
-                # Assuming simple threshold for now.
-                # If using default l2, we might need to adjust threshold logic
-                # For this MVP let's assume < 0.5 is similar enough in L2 space for normalized vectors
-                # But implementation plan mentioned cosine similarity > 0.85
-                # For now just returning what we found
-                
-                # Check if it's the same issue
-                if str(metadatas[i].get("number")) == str(issue.number):
-                    continue
-                    
-                duplicates.append({
-                    "id": ids[i],
-                    "number": metadatas[i].get("number"),
-                    "title": metadatas[i].get("title"),
-                    "distance": dist
-                })
-        
-        # 3. Store current issue (if not already there)
-        metadata = {
+        self.lexical_threshold = settings.LEXICAL_SIMILARITY_THRESHOLD
+        self.candidates = settings.SIMILARITY_CANDIDATES
+        self.rrf_k = settings.HYBRID_RRF_K
+
+    def _metadata(self, issue: GitHubIssue, fingerprint: str, fields: dict) -> dict:
+        return {
             "number": issue.number,
             "title": issue.title,
-            "state": issue.state
+            "state": issue.state,
+            "fingerprint": fingerprint,
+            **fields
         }
-        vector_store.add_issue(str(issue.id), embedding, metadata, text)
-        
+
+    async def _embed(self, issue: GitHubIssue, store: VectorStore, fields: dict) -> tuple[np.ndarray | None, bool]:
+        """
+        Return (embedding, changed). Unchanged issues reuse the stored vector
+        and need no re-embedding or write; changed or new issues are encoded
+        and upserted.
+        """
+        text = f"{issue.title} {issue.body or ''}"
+        fingerprint = embedding_service.fingerprint(text)
+        metadata = self._metadata(issue, fingerprint, fields)
+
+        stored = store.get_issue(str(issue.id))
+        if stored and "team" in stored["metadata"]:
+            # Set by semantic routing; survives edits and state changes
+            metadata["team"] = stored["metadata"]["team"]
+        if stored and stored["metadata"].get("fingerprint") == fingerprint:
+            if stored["metadata"] != metadata:
+                store.update_metadata(str(issue.id), metadata)
+            return stored["embedding"], False
+
+        embedding = await embedding_service.encode(text)
+        if embedding is None:
+            return None, False
+
+        store.add_issue(str(issue.id), embedding, metadata, text)
+        return embedding, True
+
+    def _stored_embedding(self, store: VectorStore, ids: list[str]) -> np.ndarray | None:
+        """
+        The first stored embedding among `ids`, or None. For a signature
+        duplicate still being embedded, the original report of the same
+        crash stands in for semantic routing.
+        """
+        for doc_id in ids:
+            stored = store.get_issue(doc_id)
+            if stored is not None and stored["embedding"] is not None:
+                return stored["embedding"]
+        return None
+
+    def _index_lexical(self, issue: GitHubIssue, lexical: BM25Index, fields: dict):
+        lexical.add(
+            str(issue.id),
+            fields["terms"].split(),
+            fields["signature"] or None,
+            {"number": issue.number, "title": issue.title}
+        )
+
+    async def _index(self, issue: GitHubIssue, store: VectorStore, lexical: BM25Index, fields: dict) -> bool:
+        self._index_lexical(issue, lexical, fields)
+        _, changed = await self._embed(issue, store, fields)
+        return changed
+
+    def _index_in_background(self, issue: GitHubIssue, store: VectorStore, lexical: BM25Index, fields: dict):
+        # The issue is still embedded so later semantic searches can find
+        # it, just off the triage critical path
+        self._index_lexical(issue, lexical, fields)
+        task = asyncio.create_task(self._embed(issue, store, fields))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    async def process(self, issue: GitHubIssue, repo: str = "unknown") -> dict:
+        """
+        Find earlier issues in the same repository that duplicate this one.
+
+        An issue whose exact crash signature (exception plus top frames) was
+        already reported is a duplicate of those issues without any
+        embedding call on the critical path; it is still embedded in the
+        background so later searches find it. Otherwise BM25 over titles and error signatures and
+        vector search each propose candidates, fused by reciprocal rank. A
+        candidate is kept if its cosine similarity is at least
+        SIMILARITY_THRESHOLD, or LEXICAL_SIMILARITY_THRESHOLD when BM25 also
+        retrieved it.
+        """
+        logger.info(f"Checking for duplicates for issue #{issue.number}")
+        store = vector_store.for_repo(repo)
+        lexical = lexical_index.for_repo(repo)
+        fields = lexical_fields(issue.title, issue.body)
+        issue_id = str(issue.id)
+
+        # 1. Exact signature short-circuit
+        if fields["signature"]:
+            matches = [d for d in lexical.signature_matches(fields["signature"]) if d != issue_id]
+            if matches:
+                metrics.inc("similarity.signature_hits")
+                self._index_in_background(issue, store, lexical, fields)
+                duplicates = [
+                    {
+                        "id": doc_id,
+                        "number": lexical.metadata.get(doc_id, {}).get("number"),
+                        "title": lexical.metadata.get(doc_id, {}).get("title"),
+                        "match": "signature"
+                    }
+                    for doc_id in matches
+                ]
+                logger.info(f"Issue #{issue.number} matches the crash signature of {len(duplicates)} issue(s)")
+                return {
+                    "duplicates": duplicates,
+                    "is_duplicate": True,
+                    "embedding": self._stored_embedding(store, [issue_id, *matches])
+                }
+
+        # 2. Generate embedding, or reuse the stored one if unchanged
+        self._index_lexical(issue, lexical, fields)
+        embedding, _ = await self._embed(issue, store, fields)
+        if embedding is None:
+            return {"duplicates": [], "is_duplicate": False, "embedding": None}
+
+        # 3. Retrieve candidates from both indexes of this repository
+        vector_hits: dict[str, tuple[float, dict]] = {}
+        results = store.search(embedding, n_results=self.candidates + 1)
+        if results and results['ids']:
+            for doc_id, dist, metadata in zip(results['ids'][0], results['distances'][0], results['metadatas'][0]):
+                if doc_id != issue_id:
+                    # Cosine distance, so similarity is its complement
+                    vector_hits[doc_id] = (1.0 - dist, metadata)
+
+        lexical_hits = [
+            doc_id for doc_id, _ in lexical.search(fields["terms"].split(), self.candidates + 1)
+            if doc_id != issue_id
+        ]
+        lexical_set = set(lexical_hits)
+
+        # 4. Fuse and keep candidates above their bar
+        duplicates = []
+        for doc_id, score in reciprocal_rank_fusion([list(vector_hits), lexical_hits], k=self.rrf_k):
+            if doc_id in vector_hits:
+                similarity, metadata = vector_hits[doc_id]
+            else:
+                stored = store.get_issue(doc_id)
+                if stored is None:
+                    continue
+                similarity, metadata = _cosine(embedding, stored["embedding"]), stored["metadata"]
+
+            threshold = self.lexical_threshold if doc_id in lexical_set else self.threshold
+            if similarity < threshold:
+                continue
+
+            if doc_id in lexical_set:
+                match = "hybrid" if doc_id in vector_hits else "lexical"
+            else:
+                match = "vector"
+
+            duplicates.append({
+                "id": doc_id,
+                "number": metadata.get("number"),
+                "title": metadata.get("title"),
+                "distance": 1.0 - similarity,
+                "similarity": similarity,
+                "score": score,
+                "match": match
+            })
+
         return {
             "duplicates": duplicates,
-            "is_duplicate": len(duplicates) > 0
+            "is_duplicate": len(duplicates) > 0,
+            # For semantic routing, which reuses it instead of encoding again
+            "embedding": embedding
         }
+
+    async def sync(self, issue: GitHubIssue, action: str, repo: str = "unknown") -> dict:
+        """
+        Keep the indexes in step with issue lifecycle events without running
+        triage: edits re-embed only if the content changed, state changes
+        update metadata, deletions remove the issue.
+        """
+        store = vector_store.for_repo(repo)
+        lexical = lexical_index.for_repo(repo)
+        if action == "deleted":
+            store.delete_issue(str(issue.id))
+            lexical.remove(str(issue.id))
+            logger.info(f"Removed issue #{issue.number} from the index")
+            return {"action": action, "reindexed": False, "deleted": True}
+
+        changed = await self._index(issue, store, lexical, lexical_fields(issue.title, issue.body))
+        logger.info(f"Synced issue #{issue.number} after '{action}' (re-embedded: {changed})")
+        return {"action": action, "reindexed": changed, "deleted": False}
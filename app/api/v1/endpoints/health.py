@@ -1,13 +1,19 @@
 from fastapi import APIRouter
 from app.config.settings import get_settings
+from app.services.embedding import embedding_service
 
 router = APIRouter()
 settings = get_settings()
 
 @router.get("/health")
 async def health_check():
+    embedding = embedding_service.status()
     return {
         "status": "ok",
+        "ready": embedding["ready"],
         "app_name": settings.APP_NAME,
-        "debug": settings.DEBUG
+        "debug": settings.DEBUG,
+        "components": {
+            "embedding": embedding
+        }
     }
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from app.core.metrics import metrics
+from app.core.resilience import policies
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
+@router.get("/resilience")
+async def get_resilience():
+    """Circuit breaker and retry budget state per dependency."""
+    return {name: policy.snapshot() for name, policy in policies.items()}
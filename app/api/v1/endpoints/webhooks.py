@@ -1,32 +1,91 @@
-from fastapi import APIRouter, Depends, Header, HTTPException, Request, BackgroundTasks
-from app.core.security import verify_github_signature
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from app.config.settings import get_settings
+from app.core.cache import TTLCache
+from app.core.metrics import metrics
+from app.core.security import verify_signature
 from app.models.domain import WebhookPayload
-from app.agents.orchestrator import orchestrator
+from app.agents.orchestrator import INDEX_ACTIONS, TRIAGE_ACTIONS
+from app.services.queue import triage_queue
 import logging
 
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    import json
+    json_loads = json.loads
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# X-GitHub-Delivery ids already queued. GitHub keeps the id when it
+# retries or redelivers an event.
+seen_deliveries = TTLCache(
+    ttl=settings.WEBHOOK_DELIVERY_TTL,
+    max_entries=settings.WEBHOOK_DELIVERY_CACHE_SIZE
+)
 
 @router.post("/webhooks/github")
-async def github_webhook(
-    background_tasks: BackgroundTasks,
-    payload: WebhookPayload,
-    request: Request,
-    _: None = Depends(verify_github_signature)
-):
+async def github_webhook(request: Request):
     """
     Handle GitHub webhooks.
+
+    The raw body is read once and used both for the signature check and
+    for parsing. Events and actions we do not handle are answered from a
+    plain dict; only issue events that will be queued are validated into
+    a WebhookPayload. A delivery id that was already queued is
+    acknowledged without queueing it again.
     """
-    if payload.action not in ["opened", "reopened"]:
-        logger.info(f"Ignoring action {payload.action}")
-        return {"status": "ignored", "reason": f"Action {payload.action} not supported"}
+    body = await request.body()
+    verify_signature(body, request.headers.get("X-Hub-Signature-256"))
+
+    event = request.headers.get("X-GitHub-Event")
+    if event is not None and event != "issues":
+        metrics.inc("webhooks.ignored")
+        return {"status": "ignored", "reason": f"Event {event} not supported"}
+
+    try:
+        data = json_loads(body)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON body")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON object")
+
+    action = data.get("action")
+    if action not in TRIAGE_ACTIONS | INDEX_ACTIONS:
+        logger.info(f"Ignoring action {action}")
+        metrics.inc("webhooks.ignored")
+        return {"status": "ignored", "reason": f"Action {action} not supported"}
     
-    if not payload.issue:
+    if not data.get("issue"):
+        metrics.inc("webhooks.ignored")
         return {"status": "ignored", "reason": "Not an issue event"}
+
+    try:
+        payload = WebhookPayload.model_validate(data)
+    except ValidationError as e:
+        # Same 422 response FastAPI gives for an invalid request body
+        raise RequestValidationError(e.errors())
         
     logger.info(f"Received webhook for issue #{payload.issue.number}: {payload.issue.title}")
     
-    # Process in background to respond quickly to GitHub
-    background_tasks.add_task(orchestrator.process_issue, payload)
+    delivery_id = request.headers.get("X-GitHub-Delivery")
+    if delivery_id and not seen_deliveries.add(delivery_id):
+        logger.info(f"Ignoring repeated delivery {delivery_id}")
+        metrics.inc("webhooks.duplicate_deliveries")
+        return {"status": "duplicate", "reason": f"Delivery {delivery_id} already queued"}
+
+    # Persist the job and respond quickly to GitHub; queue workers process it
+    try:
+        job_id = await triage_queue.enqueue(payload)
+    except Exception:
+        # Not queued, so GitHub's retry must not be treated as a duplicate
+        if delivery_id:
+            seen_deliveries.pop(delivery_id)
+        raise
+    metrics.inc("webhooks.accepted")
     
-    return {"status": "accepted", "message": "Issue processing started"}
+    return {"status": "accepted", "message": "Issue queued for processing", "job_id": job_id}
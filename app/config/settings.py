@@ -10,24 +10,125 @@ class Settings(BaseSettings):
     # GitHub
     GITHUB_TOKEN: str = ""
     GITHUB_WEBHOOK_SECRET: str = ""
+    GITHUB_HTTP2: bool = True
+    GITHUB_HTTP_TIMEOUT: float = 10.0
+    GITHUB_HTTP_CONNECT_TIMEOUT: float = 5.0
+    GITHUB_MAX_CONNECTIONS: int = 20
+    GITHUB_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    GITHUB_KEEPALIVE_EXPIRY: float = 30.0
+    GITHUB_WRITE_MIN_INTERVAL: float = 1.0
+    GITHUB_RATE_LIMIT_RESERVE: int = 50
+    GITHUB_MAX_RETRIES: int = 3
+    GITHUB_MAX_RETRY_WAIT: float = 120.0
+    GITHUB_MUTATION_HISTORY_SIZE: int = 10000
+    # Retries of connection failures and 5xx responses (throttling is
+    # retried separately, see GITHUB_MAX_RETRIES)
+    GITHUB_TRANSIENT_RETRIES: int = 2
+    # Send a second GET if the first has not answered after this many
+    # seconds (0 disables hedging)
+    GITHUB_HEDGE_AFTER: float = 0.0
     
     # Gemini API
     GEMINI_API_KEY: str = ""
     GEMINI_MODEL: str = "gemini-1.5-flash"
     GEMINI_TEMPERATURE: float = 0.1
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_TIMEOUT_SECONDS: float = 30.0
+    LLM_MAX_RETRIES: int = 1
+    # Start a second identical LLM call if the first has not answered after
+    # this many seconds (0 disables hedging; each hedge is a billed call)
+    LLM_HEDGE_AFTER: float = 0.0
+    # Re-asks allowed when a structured (JSON) response fails validation
+    LLM_STRUCTURED_REASKS: int = 1
+    # Token budgets for the issue body in each agent's prompt (the fused
+    # and batch prompts use the classifier's)
+    CLASSIFIER_BODY_TOKEN_BUDGET: int = 1500
+    RESPONDER_BODY_TOKEN_BUDGET: int = 1000
+    # Classify and draft the reply in a single LLM call
+    LLM_FUSED_TRIAGE: bool = False
     
+    # Resilience (circuit breakers and retries for LLM and GitHub calls)
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RESET_TIMEOUT: float = 30.0
+    RETRY_BACKOFF_BASE: float = 0.5
+    RETRY_BACKOFF_MAX: float = 8.0
+    # Retries may add at most this fraction of the recent request rate,
+    # plus RETRY_BUDGET_MIN per RETRY_BUDGET_WINDOW seconds
+    RETRY_BUDGET_RATIO: float = 0.2
+    RETRY_BUDGET_MIN: int = 10
+    RETRY_BUDGET_WINDOW: float = 10.0
+    # Upper bound on one issue's whole triage pipeline
+    TRIAGE_TIMEOUT_SECONDS: float = 120.0
+
     # Database
     DATABASE_URL: str = "sqlite:///./triagebot.db"
+
+    # Triage queue
+    QUEUE_WORKERS: int = 4
+    QUEUE_POLL_INTERVAL: float = 1.0
+    QUEUE_VISIBILITY_TIMEOUT: float = 300.0
+    QUEUE_MAX_ATTEMPTS: int = 5
+    QUEUE_RETRY_BACKOFF_BASE: float = 2.0
+    QUEUE_RETRY_BACKOFF_MAX: float = 300.0
+    # Above this many queued jobs, workers claim jobs in batches and
+    # classify them with one LLM call per batch
+    QUEUE_BATCH_THRESHOLD: int = 50
+    QUEUE_BATCH_SIZE: int = 20
+    # Remembered X-GitHub-Delivery ids, to drop retried deliveries
+    WEBHOOK_DELIVERY_TTL: float = 86400.0
+    WEBHOOK_DELIVERY_CACHE_SIZE: int = 100000
     
-    # ChromaDB
+    # Vector store: "chroma", "numpy" (exact, small repos) or "hnsw" (large repos)
+    VECTOR_STORE_BACKEND: str = "chroma"
     CHROMA_PERSIST_DIR: str = "./chroma_db"
+    # Snapshot directory for the numpy and hnsw backends
+    VECTOR_STORE_DIR: str = "./vector_index"
+    VECTOR_SNAPSHOT_INTERVAL: float = 30.0
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 200
+    HNSW_EF_SEARCH: int = 64
+    VECTOR_UPSERT_BATCH_SIZE: int = 1000
+    INGESTION_BATCH_SIZE: int = 256
+    INGESTION_CHECKPOINT_INTERVAL: float = 30.0
     
     # Embeddings
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_PRELOAD: bool = True
+    EMBEDDING_WARMUP: bool = True
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_BATCH_WAIT_MS: float = 5.0
+    EMBEDDING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    # Empty disables the on-disk tier
+    EMBEDDING_CACHE_DIR: str = ""
     
     # Agent Configuration
     CLASSIFICATION_CONFIDENCE_THRESHOLD: float = 0.7
+    CLASSIFICATION_CACHE_TTL: float = 3600.0
+    CLASSIFICATION_CACHE_SIZE: int = 10000
+    # Batched classification (classify_many)
+    CLASSIFICATION_BATCH_MAX_ITEMS: int = 20
+    CLASSIFICATION_BATCH_TOKEN_BUDGET: int = 8000
     SIMILARITY_THRESHOLD: float = 0.85
+    # Hybrid duplicate search: candidates per retriever, fusion constant, and
+    # the lower similarity bar for candidates that BM25 also retrieved
+    SIMILARITY_CANDIDATES: int = 10
+    HYBRID_RRF_K: int = 60
+    LEXICAL_SIMILARITY_THRESHOLD: float = 0.7
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+    # JSON routing rules per repository; empty uses the built-in rules
+    ROUTING_RULES_FILE: str = ""
+    # Only this much of an issue body is scanned for routing signals
+    ROUTING_MAX_BODY_CHARS: int = 20000
+    # Semantic routing: issues without rule signals go to the team whose
+    # past issues are closest in embedding space, if close enough
+    SEMANTIC_ROUTING: bool = False
+    SEMANTIC_ROUTING_MIN_SIMILARITY: float = 0.5
+    # Teams with fewer routed issues are not candidates
+    SEMANTIC_ROUTING_MIN_ISSUES: int = 5
+    TEAM_CENTROIDS_DIR: str = "./team_centroids"
+    # Team name -> GitHub logins to assign when an issue is routed there
+    TEAM_ASSIGNEES: dict[str, list[str]] = {}
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from app.core.metrics import metrics
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire `ttl` seconds after they
+    were stored. When `name` is given, hits and misses are counted as
+    `<name>.hits` / `<name>.misses` metrics.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, name: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.name = name
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key: Hashable, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return _MISSING
+        return value
+
+    def _store(self, key: Hashable, value: Any, now: float):
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._live(key, time.monotonic())
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+        if self.name:
+            metrics.inc(f"{self.name}.misses" if value is _MISSING else f"{self.name}.hits")
+        return default if value is _MISSING else value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._store(key, value, time.monotonic())
+
+    def add(self, key: Hashable, value: Any = True) -> bool:
+        """
+        Store the key only if it is not already live. Returns True if it
+        was added, so callers can use it as an atomic "first seen" check.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._live(key, now) is not _MISSING:
+                return False
+            self._store(key, value, now)
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._live(key, time.monotonic()) is not _MISSING
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
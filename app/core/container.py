@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from sqlalchemy.engine import Engine
+from app.agents.orchestrator import AgentOrchestrator, Agents
+from app.config.settings import get_settings
+from app.db.session import engine, init_db
+from app.services.embedding import EmbeddingService, embedding_service
+from app.services.github import GitHubService, github_service
+from app.services.llm import LLMService, llm_service
+from app.services.queue import TriageQueue, triage_queue
+from app.services.team_centroids import TeamCentroidService, team_centroids
+from app.services.vectorstore import VectorStoreService, vector_store
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+def single_process_reasons() -> list[str]:
+    """
+    Settings that keep state in files only one process may write. Running
+    several workers with any of them loses or overwrites data, so
+    gunicorn.conf.py then starts a single worker.
+    """
+    reasons = []
+    if settings.VECTOR_STORE_BACKEND.lower() in ("numpy", "hnsw"):
+        reasons.append(f"VECTOR_STORE_BACKEND={settings.VECTOR_STORE_BACKEND} snapshots the index from one process")
+    if settings.SEMANTIC_ROUTING:
+        reasons.append("SEMANTIC_ROUTING keeps team centroids in per-process files")
+    return reasons
+
+@dataclass
+class ServiceContainer:
+    """
+    Owns the application's services and agents and their lifecycle.
+
+    The service modules still provide default instances, so scripts and
+    tests work without the app; the container decides when those are
+    loaded, started and shut down, and builds the agents once for every
+    issue instead of once per issue.
+    """
+    engine: Engine
+    llm: LLMService
+    embedding: EmbeddingService
+    vector_store: VectorStoreService
+    github: GitHubService
+    queue: TriageQueue
+    orchestrator: AgentOrchestrator
+    team_centroids: TeamCentroidService
+
+    @classmethod
+    def default(cls) -> "ServiceContainer":
+        return cls(
+            engine=engine,
+            llm=llm_service,
+            embedding=embedding_service,
+            vector_store=vector_store,
+            github=github_service,
+            queue=triage_queue,
+            orchestrator=AgentOrchestrator(github=github_service),
+            team_centroids=team_centroids,
+        )
+
+    def preload(self):
+        """
+        Load heavy, read-only resources in a server's master process before
+        it forks workers (see gunicorn.conf.py). Nothing that owns threads,
+        sockets or database connections is created here.
+        """
+        if settings.EMBEDDING_PRELOAD:
+            self.embedding.preload()
+
+    async def startup(self):
+        """
+        Build the agents and open resources concurrently, then start the
+        queue workers. The embedding model keeps loading (or warming up)
+        in the background so webhooks are accepted immediately.
+        """
+        start = time.perf_counter()
+        if settings.EMBEDDING_PRELOAD:
+            self.embedding.start_background_load()
+
+        agents, *_ = await asyncio.gather(
+            asyncio.to_thread(Agents.build),
+            asyncio.to_thread(init_db, self.engine),
+            self.github.start(),
+        )
+        self.orchestrator = AgentOrchestrator(agents, github=self.github)
+        self.queue.start(self.orchestrator.handle_event, prepare=self.orchestrator.prepare_batch)
+        logger.info(f"Started in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    async def shutdown(self):
+        await self.queue.stop()
+        await self.github.close()
+        self.llm.shutdown()
+        self.team_centroids.close()
+        self.vector_store.close()
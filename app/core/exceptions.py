@@ -13,3 +13,22 @@ class LLMError(TriageBotException):
 class GitHubAPIError(TriageBotException):
     """Raised when GitHub API fails"""
     pass
+
+class GitHubRateLimitError(GitHubAPIError):
+    """Raised when GitHub throttling outlasts what a request may wait"""
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class GitHubUnavailableError(GitHubAPIError):
+    """Raised when GitHub cannot be reached or answers with a server error"""
+    def __init__(self, message: str, sent: bool = True):
+        super().__init__(message)
+        # False when the request never reached GitHub, so it is safe to retry
+        self.sent = sent
+
+class CircuitOpenError(TriageBotException):
+    """Raised without calling a dependency whose circuit breaker is open"""
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -0,0 +1,55 @@
+import threading
+from collections import defaultdict, deque
+
+class Metrics:
+    """
+    Minimal in-process metrics registry: counters, gauges and timing samples.
+    Exposed via the /api/v1/metrics endpoint.
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = defaultdict(float)
+        self._gauges: dict[str, float] = {}
+        self._timings: dict[str, deque] = defaultdict(lambda: deque(maxlen=max_samples))
+
+    def inc(self, name: str, value: float = 1.0):
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            self._timings[name].append(value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            timings = {}
+            for name, samples in self._timings.items():
+                ordered = sorted(samples)
+                if not ordered:
+                    continue
+                timings[name] = {
+                    "count": len(ordered),
+                    "mean": sum(ordered) / len(ordered),
+                    "p50": ordered[len(ordered) // 2],
+                    "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    "max": ordered[-1],
+                }
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": timings,
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+
+# Singleton instance
+metrics = Metrics()
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+from app.config.settings import get_settings
+from app.core.exceptions import CircuitOpenError
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Closed: calls pass. After failure_threshold failures in a row it opens
+    and rejects calls with CircuitOpenError for reset_timeout seconds. It
+    then lets a single probe call through (half-open): success closes it,
+    failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not be attempted."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            retry_after = max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+        metrics.inc(f"resilience.{self.name}.rejected")
+        raise CircuitOpenError(f"Circuit for {self.name} is open", retry_after=retry_after or self.reset_timeout)
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info(f"Circuit for {self.name} closed")
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                if self.opened_at is None:
+                    logger.warning(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+                metrics.inc(f"resilience.{self.name}.opened")
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """Give up a half-open probe slot without an outcome (e.g. on cancellation)."""
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+class RetryBudget:
+    """
+    Caps retries (and hedges) at `ratio` of the requests seen in the last
+    `window` seconds, plus `min_retries` so low traffic can still retry.
+    Stops retry storms from multiplying load on a struggling dependency.
+    """
+
+    def __init__(self, ratio: float, min_retries: int, window: float):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        for events in (self._requests, self._retries):
+            while events and events[0] <= now - self.window:
+                events.popleft()
+
+    def record_request(self):
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+                return False
+            self._retries.append(now)
+            return True
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._trim(time.monotonic())
+            return {"requests": len(self._requests), "retries": len(self._retries)}
+
+class ResiliencePolicy:
+    """
+    Circuit breaker, jittered retries under a retry budget, and optional
+    hedging for one dependency.
+
+    Only exceptions of `failure_types` count as dependency failures: they
+    trip the breaker and may be retried. Anything else (e.g. a 404) means
+    the dependency answered, and is re-raised as is.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_types: tuple[type[BaseException], ...],
+        max_retries: int,
+        hedge_after: float = 0.0,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.failure_types = failure_types
+        self.max_retries = max_retries
+        self.hedge_after = hedge_after
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold or settings.CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout or settings.CIRCUIT_RESET_TIMEOUT
+        )
+        self.budget = RetryBudget(settings.RETRY_BUDGET_RATIO, settings.RETRY_BUDGET_MIN, settings.RETRY_BUDGET_WINDOW)
+        policies[name] = self
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        hedge: bool = False,
+        retryable: Optional[Callable[[BaseException], bool]] = None,
+    ) -> Any:
+        """
+        Run `fn` under the policy. `hedge` allows a second concurrent
+        attempt when the first is slower than hedge_after; only use it for
+        idempotent calls. `retryable` can veto retrying a failure.
+        """
+        self.budget.record_request()
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            try:
+                if hedge and self.hedge_after > 0:
+                    result = await self._hedged(fn)
+                else:
+                    result = await fn()
+            except self.failure_types as e:
+                self.breaker.record_failure()
+                if (
+                    attempt == self.max_retries
+                    or (retryable is not None and not retryable(e))
+                    or not self.budget.try_spend()
+                ):
+                    raise
+                metrics.inc(f"resilience.{self.name}.retries")
+                delay = backoff_delay(attempt, settings.RETRY_BACKOFF_BASE, settings.RETRY_BACKOFF_MAX)
+                logger.warning(f"{self.name} call failed ({e!r}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Not a dependency failure; only free a half-open probe slot
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def _hedged(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        first = asyncio.ensure_future(fn())
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if done or not self.budget.try_spend():
+                return await first
+
+            metrics.inc(f"resilience.{self.name}.hedges")
+            tasks.add(asyncio.ensure_future(fn()))
+            error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def snapshot(self) -> dict:
+        return {
+            **self.breaker.snapshot(),
+            "budget": self.budget.snapshot(),
+            "max_retries": self.max_retries,
+            "hedge_after": self.hedge_after or None,
+        }
+
+# Policies by dependency name, for the /api/v1/resilience endpoint
+policies: dict[str, ResiliencePolicy] = {}
@@ -5,9 +5,9 @@ from app.config.settings import get_settings
 
 settings = get_settings()
 
-async def verify_github_signature(request: Request):
+def verify_signature(body: bytes, signature: str | None):
     """
-    Verify that the request came from GitHub.
+    Verify the X-Hub-Signature-256 header against the raw request body.
     """
     if not settings.GITHUB_WEBHOOK_SECRET:
         # If no secret is configured, skip verification (development mode only)
@@ -18,16 +18,12 @@ async def verify_github_signature(request: Request):
             detail="Webhook secret not configured"
         )
         
-    signature = request.headers.get("X-Hub-Signature-256")
     if not signature:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Missing signature headers"
         )
         
-    # Read the raw body
-    body = await request.body()
-    
     # Calculate the expected signature
     secret = settings.GITHUB_WEBHOOK_SECRET.encode()
     expected_signature = "sha256=" + hmac.new(
@@ -42,3 +38,9 @@ async def verify_github_signature(request: Request):
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid signature"
         )
+
+async def verify_github_signature(request: Request):
+    """
+    Verify that the request came from GitHub.
+    """
+    verify_signature(await request.body(), request.headers.get("X-Hub-Signature-256"))
@@ -0,0 +1,43 @@
+from datetime import datetime
+from sqlalchemy import DateTime, Float, Integer, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.session import Base
+
+class TriageJob(Base):
+    __tablename__ = "triage_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # "<owner>/<repo>#<number>", useful for inspection and coalescing
+    issue_key: Mapped[str] = mapped_column(String(255), index=True)
+    action: Mapped[str] = mapped_column(String(32))
+    payload: Mapped[str] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(String(16), default="queued", index=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    # Epoch seconds; a job is claimable once available_at has passed, and a
+    # running job becomes visible again once locked_until has passed.
+    available_at: Mapped[float] = mapped_column(Float, index=True)
+    locked_until: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # Random token of the current claim; only its holder may extend,
+    # complete or fail the job
+    lease_id: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+class DeadLetterJob(Base):
+    __tablename__ = "triage_dead_letters"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_id: Mapped[int] = mapped_column(Integer)
+    issue_key: Mapped[str] = mapped_column(String(255), index=True)
+    action: Mapped[str] = mapped_column(String(32))
+    payload: Mapped[str] = mapped_column(Text)
+    attempts: Mapped[int] = mapped_column(Integer)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    failed_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+class PostedComment(Base):
+    __tablename__ = "posted_comments"
+
+    # Issue API URL; one bot comment per issue, whatever its text
+    issue_url: Mapped[str] = mapped_column(String(512), primary_key=True)
+    posted_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
@@ -0,0 +1,24 @@
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from app.config.settings import get_settings
+
+settings = get_settings()
+
+class Base(DeclarativeBase):
+    pass
+
+def make_engine(database_url: str) -> Engine:
+    connect_args = {}
+    if database_url.startswith("sqlite"):
+        # Sessions are used from worker threads via asyncio.to_thread
+        connect_args["check_same_thread"] = False
+    return create_engine(database_url, connect_args=connect_args)
+
+def init_db(bind: Engine):
+    # Import models so they are registered on the metadata
+    from app.db import models  # noqa: F401
+    Base.metadata.create_all(bind=bind)
+
+engine = make_engine(settings.DATABASE_URL)
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
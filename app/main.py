@@ -1,21 +1,36 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.config.settings import get_settings
 from app.config.logging import setup_logging
-from app.api.v1.endpoints import health, webhooks
+from app.api.v1.endpoints import health, metrics, webhooks
+from app.core.container import ServiceContainer
 
 # Setup logging
 setup_logging()
 settings = get_settings()
 
+container = ServiceContainer.default()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.container = container
+    await container.startup()
+    yield
+    await container.shutdown()
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     description="AI-powered GitHub issue triaging system",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Include routers
 app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(webhooks.router, prefix="/api/v1", tags=["webhooks"])
+app.include_router(metrics.router, prefix="/api/v1", tags=["metrics"])
 
 
 @app.get("/")
@@ -0,0 +1,18 @@
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+# Shapes of the structured LLM responses, validated by
+# LLMService.generate_structured
+
+Category = Literal["bug", "feature", "question", "docs", "security"]
+
+class Classification(BaseModel):
+    category: Category
+    confidence: float = Field(ge=0.0, le=1.0)
+    reasoning: Optional[str] = None
+
+class BatchClassification(Classification):
+    id: int
+
+class FusedTriage(Classification):
+    reply: str = Field(min_length=1)
@@ -1,36 +1,235 @@
-from sentence_transformers import SentenceTransformer
 from app.config.settings import get_settings
+from app.core.metrics import metrics
+from app.services.embedding_cache import EmbeddingCache, cache_key
+from typing import Callable
+import numpy as np
+import asyncio
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+class EmbeddingBatcher:
+    """
+    Collects concurrent encode requests for up to `max_wait` seconds or
+    `max_batch` items and runs them as one batched model call in a worker
+    thread. Batched MiniLM inference is several times cheaper per item
+    than one call per text, and the event loop never blocks on the model.
+    """
+
+    def __init__(self, encode_batch: Callable[[list[str]], np.ndarray], max_batch: int, max_wait: float):
+        self.encode_batch = encode_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+
+    async def submit(self, text: str) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: list[tuple[str, asyncio.Future]]):
+        texts = [text for text, _ in batch]
+        metrics.observe("embedding.batch_size", len(texts))
+        try:
+            vectors = await asyncio.to_thread(self.encode_batch, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
 class EmbeddingService:
+    """
+    Wraps the sentence-transformers model. The model is loaded lazily in a
+    background thread (kicked off from the app lifespan, or by the first
+    encode call), so importing this module and starting the server stay
+    fast. Until the model is ready, encode returns an empty embedding and
+    callers degrade gracefully.
+    """
+
     def __init__(self):
         self.model_name = settings.EMBEDDING_MODEL
+        self.model = None
+        # not_loaded -> loading -> ready | failed
+        self.state = "not_loaded"
+        self.error: str | None = None
+        self._lock = threading.Lock()
+        self._loader: threading.Thread | None = None
+        self._warmed = False
+        self._batchers: dict[asyncio.AbstractEventLoop, EmbeddingBatcher] = {}
+        self.cache = EmbeddingCache(
+            self.model_name,
+            max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+            directory=settings.EMBEDDING_CACHE_DIR
+        )
+
+    @property
+    def available(self) -> bool:
+        return self.state == "ready"
+
+    def load(self, warmup: bool | None = None):
+        """
+        Load the model synchronously. Safe to call from several threads;
+        only the first call does the work. `warmup` defaults to
+        EMBEDDING_WARMUP; pass False when loading in a process that will
+        fork (see `preload`), so no inference threads exist yet.
+        """
+        with self._lock:
+            if self.state == "not_loaded":
+                self.state = "loading"
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    self.model = SentenceTransformer(self.model_name)
+                    self.state = "ready"
+                    logger.info(f"Embedding model {self.model_name} loaded")
+                except Exception as e:
+                    logger.warning(f"Failed to load embedding model: {e}")
+                    self.error = str(e)
+                    self.state = "failed"
+
+        if settings.EMBEDDING_WARMUP if warmup is None else warmup:
+            self.warmup()
+
+    def warmup(self):
+        """Run one encode, which allocates buffers and compiles kernels."""
+        with self._lock:
+            if self.state != "ready" or self._warmed:
+                return
+            try:
+                self.model.encode("warmup")
+                self._warmed = True
+            except Exception as e:
+                logger.warning(f"Embedding warmup failed: {e}")
+
+    def preload(self):
+        """
+        Load the weights without running inference. Called in a server's
+        master process before it forks workers, which then share the
+        weights' memory pages copy-on-write.
+        """
+        self.load(warmup=False)
+
+    def start_background_load(self):
+        """
+        Start loading (or, after `preload`, warming up) the model in a
+        daemon thread if that has not started yet.
+        """
+        if self._loader is not None or self.state in ("loading", "failed"):
+            return
+        if self.state == "ready" and (self._warmed or not settings.EMBEDDING_WARMUP):
+            return
+        self._loader = threading.Thread(target=self.load, name="embedding-loader", daemon=True)
+        self._loader.start()
+
+    async def wait_until_ready(self, timeout: float | None = None) -> bool:
+        """
+        Load the model off the event loop and wait for it. Returns readiness.
+        """
         try:
-            # Load model (this might take time on first run)
-            self.model = SentenceTransformer(self.model_name)
-            self.available = True
-        except Exception as e:
-            logger.warning(f"Failed to load embedding model: {e}")
-            self.available = False
+            await asyncio.wait_for(asyncio.to_thread(self.load), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.available
 
-    def encode(self, text: str) -> list[float]:
+    def status(self) -> dict:
+        return {
+            "model": self.model_name,
+            "state": self.state,
+            "ready": self.available,
+            "error": self.error,
+            "cache": self.cache.stats(),
+        }
+
+    def fingerprint(self, text: str) -> str:
+        """
+        Content fingerprint stored with indexed issues: if it matches, the
+        stored embedding is still valid for this model and text.
+        """
+        return cache_key(self.model_name, text)
+
+    def encode_batch(self, texts: list[str]) -> np.ndarray:
+        """
+        Encode texts synchronously in one model call. Returns a float32
+        matrix with one row per text. Intended for worker threads and
+        offline jobs; request handlers should use `encode`.
+        """
+        vectors = self.model.encode(texts, batch_size=settings.EMBEDDING_BATCH_SIZE, convert_to_numpy=True)
+        return np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+
+    def encode_many(self, texts: list[str]) -> np.ndarray:
+        """
+        Encode many texts synchronously for offline jobs such as backfills:
+        cached texts are looked up, the rest are encoded in one batched
+        call. Loads the model if needed. Returns a float32 matrix.
+        """
+        self.load()
         if not self.available:
-            return []
-        
+            raise RuntimeError(f"Embedding model unavailable: {self.error}")
+
+        cached = [self.cache.get(text) for text in texts]
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if missing:
+            vectors = self.encode_batch([texts[i] for i in missing])
+            for i, vector in zip(missing, vectors):
+                self.cache.put(texts[i], vector)
+                cached[i] = vector
+        return np.vstack(cached).astype(np.float32, copy=False)
+
+    def _batcher(self) -> EmbeddingBatcher:
+        # One batcher per event loop, since it holds loop-bound futures
+        loop = asyncio.get_running_loop()
+        if loop not in self._batchers:
+            self._batchers[loop] = EmbeddingBatcher(
+                self.encode_batch,
+                max_batch=settings.EMBEDDING_BATCH_SIZE,
+                max_wait=settings.EMBEDDING_BATCH_WAIT_MS / 1000
+            )
+        return self._batchers[loop]
+
+    async def encode(self, text: str) -> np.ndarray | None:
+        """
+        Encode one text, answering from the embedding cache when possible
+        and otherwise via the micro-batcher. Returns a float32 vector, or
+        None while the model is not ready or if encoding fails.
+        """
+        cached = self.cache.get(text)
+        if cached is not None:
+            return cached
+
+        if not self.available:
+            self.start_background_load()
+            return None
+
         try:
-            embedding = self.model.encode(text)
-            return embedding.tolist()
+            vector = await self._batcher().submit(text)
         except Exception as e:
             logger.error(f"Error encoding text: {e}")
-            return []
-
-# Singleton instance
-# We initialize it lazily or here. For now, here.
-# Warning: This makes startup slower.
-try:
-    embedding_service = EmbeddingService()
-except Exception:
-    embedding_service = None
+            return None
+
+        self.cache.put(text, vector)
+        return vector
+
+# Singleton instance; construction is cheap, the model loads lazily
+embedding_service = EmbeddingService()
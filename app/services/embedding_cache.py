@@ -0,0 +1,175 @@
+from app.core.metrics import metrics
+from app.utils.filelock import file_lock
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+import hashlib
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    # Whitespace-only edits and redeliveries should hit the same entry
+    return re.sub(r"\s+", " ", text).strip()
+
+def cache_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode()).hexdigest()
+
+class DiskEmbeddingTier:
+    """
+    Append-only on-disk store: a raw float32 matrix (`vectors.f32`) read via
+    np.memmap and a parallel `keys.txt` with one "key row" line per vector.
+
+    Appends take a file lock and derive the row from the file's size, so
+    several processes (e.g. gunicorn workers) can share the directory.
+    Rows are written before keys, so a crash can only leave an unreferenced
+    row, which later keys simply skip. Entries appended by other processes
+    are seen after a restart.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.f32"
+        self.keys_path = self.directory / "keys.txt"
+        self.lock_path = self.directory / "lock"
+        self.dim: int | None = None
+        self.rows: dict[str, int] = {}
+        self._n_rows = 0
+        self._mmap: np.memmap | None = None
+        self._load()
+
+    def _load(self):
+        dim_path = self.directory / "dim"
+        if not dim_path.exists() or not self.keys_path.exists() or not self.vectors_path.exists():
+            return
+        self.dim = int(dim_path.read_text())
+        self._n_rows = self.vectors_path.stat().st_size // (self.dim * 4)
+        for line_number, line in enumerate(self.keys_path.read_text().splitlines()):
+            key, _, row = line.partition(" ")
+            # Lines without a row come from the older one-key-per-row format
+            row = int(row) if row else line_number
+            if key and row < self._n_rows:
+                self.rows[key] = row
+
+    def _matrix(self) -> np.memmap | None:
+        if self._n_rows == 0 or self.dim is None:
+            return None
+        if self._mmap is None or self._mmap.shape[0] < self._n_rows:
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self._n_rows, self.dim))
+        return self._mmap
+
+    def get(self, key: str) -> np.ndarray | None:
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        matrix = self._matrix()
+        return None if matrix is None else np.array(matrix[row])
+
+    def put(self, key: str, vector: np.ndarray):
+        if key in self.rows:
+            return
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        with file_lock(self.lock_path):
+            dim_path = self.directory / "dim"
+            if self.dim is None and dim_path.exists():
+                # Another process created the store
+                self.dim = int(dim_path.read_text())
+            if self.dim is None:
+                self.dim = vector.shape[0]
+                dim_path.write_text(str(self.dim))
+            elif vector.shape[0] != self.dim:
+                logger.warning(f"Embedding cache dimension mismatch ({vector.shape[0]} != {self.dim}); not persisting")
+                return
+
+            with open(self.vectors_path, "ab") as f:
+                # The true row count, including rows other processes or an
+                # interrupted append left behind
+                row = f.tell() // (self.dim * 4)
+                f.seek(row * self.dim * 4)
+                f.truncate()
+                f.write(vector.tobytes())
+            with open(self.keys_path, "a") as f:
+                f.write(f"{key} {row}\n")
+        self.rows[key] = row
+        self._n_rows = max(self._n_rows, row + 1)
+
+class EmbeddingCache:
+    """
+    Embedding cache keyed by a hash of model name plus normalized text.
+    An in-memory LRU bounded by bytes sits in front of an optional
+    memory-mapped on-disk tier that survives restarts.
+    """
+
+    def __init__(self, model_name: str, max_bytes: int, directory: str = ""):
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.disk: DiskEmbeddingTier | None = None
+        if directory:
+            safe_model = re.sub(r"[^\w.-]", "_", model_name)
+            try:
+                self.disk = DiskEmbeddingTier(Path(directory) / safe_model)
+            except Exception as e:
+                logger.warning(f"Embedding disk cache disabled: {e}")
+
+    def _remember(self, key: str, vector: np.ndarray):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = vector
+        self._bytes += vector.nbytes
+        while self._bytes > self.max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def get(self, text: str) -> np.ndarray | None:
+        key = cache_key(self.model_name, text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                metrics.inc("embedding.cache.hits")
+                return vector
+
+            if self.disk is not None:
+                vector = self.disk.get(key)
+                if vector is not None:
+                    self._remember(key, vector)
+                    self.hits += 1
+                    metrics.inc("embedding.cache.hits")
+                    metrics.inc("embedding.cache.disk_hits")
+                    return vector
+
+            self.misses += 1
+            metrics.inc("embedding.cache.misses")
+            return None
+
+    def put(self, text: str, vector: np.ndarray):
+        key = cache_key(self.model_name, text)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+            if self.disk is not None:
+                try:
+                    self.disk.put(key, vector)
+                except Exception as e:
+                    logger.warning(f"Failed to persist embedding: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._bytes,
+                "disk_entries": len(self.disk.rows) if self.disk is not None else 0,
+            }
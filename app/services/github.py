@@ -1,39 +1,425 @@
 import httpx
 from app.config.settings import get_settings
+from app.core.exceptions import CircuitOpenError, GitHubAPIError, GitHubRateLimitError, GitHubUnavailableError
+from app.core.metrics import metrics
+from app.core.resilience import ResiliencePolicy
 from app.models.domain import GitHubIssue
+from app.db.models import PostedComment
+from app.db.session import SessionLocal
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import partial
+from sqlalchemy.orm import sessionmaker
+import asyncio
+import hashlib
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+class GitHubRateLimiter:
+    """
+    Tracks the REST rate-limit budget of one token from response headers
+    and schedules requests so backfills use the budget without tripping
+    primary or secondary (abuse) limits.
+
+    - Writes are spaced at least GITHUB_WRITE_MIN_INTERVAL apart, and
+      further apart when the remaining budget would not last until reset.
+    - When the budget is exhausted or GitHub answers 403/429 with
+      Retry-After, all requests on the token wait until it is lifted.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        """Forget all observed budget and scheduling state."""
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self.reset_at: float | None = None
+        self.blocked_until = 0.0
+        self._next_write_at = 0.0
+
+    def _write_interval(self, now: float) -> float:
+        interval = settings.GITHUB_WRITE_MIN_INTERVAL
+        if self.remaining is not None and self.reset_at is not None:
+            budget = self.remaining - settings.GITHUB_RATE_LIMIT_RESERVE
+            window = max(0.0, self.reset_at - now)
+            # Spread what is left of the budget evenly over the window
+            interval = max(interval, window / max(budget, 1))
+        return interval
+
+    def reserve(self, write: bool = False, max_wait: float | None = None) -> float:
+        """
+        Reserve a slot for one request and return how many seconds the
+        caller must wait before sending it.
+
+        Raises GitHubRateLimitError without reserving anything if the token
+        is blocked for longer than max_wait. This is plain synchronous code
+        with no awaits, so concurrent callers on the event loop cannot
+        interleave and no lock is needed.
+        """
+        now = time.time()
+        ready_at = self.blocked_until
+
+        if (
+            self.remaining is not None
+            and self.reset_at is not None
+            and self.remaining <= settings.GITHUB_RATE_LIMIT_RESERVE
+        ):
+            ready_at = max(ready_at, self.reset_at)
+
+        blocked_for = ready_at - now
+        if max_wait is not None and blocked_for > max_wait:
+            raise GitHubRateLimitError(
+                f"GitHub token rate limited for another {blocked_for:.0f}s",
+                retry_after=blocked_for
+            )
+
+        if write:
+            ready_at = max(ready_at, self._next_write_at)
+            self._next_write_at = max(now, ready_at) + self._write_interval(now)
+
+        return max(0.0, ready_at - now)
+
+    async def acquire(self, write: bool = False, max_wait: float | None = None):
+        delay = self.reserve(write=write, max_wait=max_wait)
+        if delay > 0:
+            metrics.inc("github.rate_limit.waits")
+            await asyncio.sleep(delay)
+
+    def update(self, response: httpx.Response):
+        headers = response.headers
+        try:
+            if "X-RateLimit-Limit" in headers:
+                self.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Remaining" in headers:
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                self.reset_at = float(headers["X-RateLimit-Reset"])
+        except ValueError:
+            logger.warning("Malformed GitHub rate-limit headers")
+            return
+
+        if self.remaining is not None:
+            metrics.set_gauge(f"github.rate_limit.{self.name}.remaining", self.remaining)
+        if self.limit is not None:
+            metrics.set_gauge(f"github.rate_limit.{self.name}.limit", self.limit)
+        if self.reset_at is not None:
+            metrics.set_gauge(f"github.rate_limit.{self.name}.reset_at", self.reset_at)
+
+    def throttle_delay(self, response: httpx.Response) -> float | None:
+        """
+        Return how long to wait before retrying a throttled response, or
+        None if the response was not rate limited.
+        """
+        if response.status_code not in (403, 429):
+            return None
+
+        now = time.time()
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                delay = 60.0
+        elif self.remaining == 0 and self.reset_at is not None:
+            delay = max(0.0, self.reset_at - now)
+        elif response.status_code == 429 or "rate limit" in response.text.lower():
+            # Secondary limit without Retry-After: GitHub asks for at least a minute
+            delay = 60.0
+        else:
+            # A plain 403 (e.g. missing permissions) is not a throttle
+            return None
+
+        self.blocked_until = max(self.blocked_until, now + delay)
+        metrics.inc("github.rate_limit.throttled")
+        return delay
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset_at": self.reset_at,
+            "blocked_until": self.blocked_until or None,
+        }
+
+@dataclass
+class IssueMutations:
+    """
+    Pending writes for one issue, collected during processing and sent
+    together by GitHubService.flush.
+    """
+    issue: GitHubIssue
+    labels: list[str] = field(default_factory=list)
+    assignees: list[str] = field(default_factory=list)
+    comment: str | None = None
+
+    def add_labels(self, labels: list[str]):
+        for label in labels:
+            if label not in self.labels:
+                self.labels.append(label)
+
+    def add_assignees(self, assignees: list[str]):
+        for login in assignees:
+            if login not in self.assignees:
+                self.assignees.append(login)
+
+    def set_comment(self, body: str):
+        self.comment = body
+
+class CommentLedger:
+    """
+    Durable record of which issues already received a bot comment.
+    Replies are LLM-generated and differ between runs, so deduplication is
+    per issue rather than per comment text, and it survives restarts.
+    """
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal):
+        self.session_factory = session_factory
+        self._table_ready = False
+
+    def _ensure_table(self):
+        if not self._table_ready:
+            PostedComment.__table__.create(bind=self.session_factory.kw["bind"], checkfirst=True)
+            self._table_ready = True
+
+    def _has_commented_sync(self, issue_url: str) -> bool:
+        self._ensure_table()
+        with self.session_factory() as session:
+            return session.get(PostedComment, issue_url) is not None
+
+    def _record_sync(self, issue_url: str):
+        self._ensure_table()
+        with self.session_factory() as session:
+            if session.get(PostedComment, issue_url) is None:
+                session.add(PostedComment(issue_url=issue_url))
+                session.commit()
+
+    async def has_commented(self, issue: GitHubIssue) -> bool:
+        return await asyncio.to_thread(self._has_commented_sync, issue.url)
+
+    async def record(self, issue: GitHubIssue):
+        await asyncio.to_thread(self._record_sync, issue.url)
+
 class GitHubService:
-    def __init__(self):
+    def __init__(self, token: str | None = None, comment_ledger: CommentLedger | None = None):
+        self.token = settings.GITHUB_TOKEN if token is None else token
         self.base_url = "https://api.github.com"
         self.headers = {
-            "Authorization": f"Bearer {settings.GITHUB_TOKEN}",
+            "Authorization": f"Bearer {self.token}",
             "Accept": "application/vnd.github.v3+json",
             "X-GitHub-Api-Version": "2022-11-28"
         }
-    
+        self._client: httpx.AsyncClient | None = None
+        # Budget is tracked per token, and each service owns one token
+        self.rate_limiter = GitHubRateLimiter(hashlib.sha256(self.token.encode()).hexdigest()[:8])
+        # Recently applied labels/assignees per issue, so redeliveries and
+        # reopened events do not repeat identical mutations
+        self._applied: OrderedDict[str, dict] = OrderedDict()
+        self.comment_ledger = comment_ledger or CommentLedger()
+        self.resilience = ResiliencePolicy(
+            "github",
+            failure_types=(GitHubUnavailableError,),
+            max_retries=settings.GITHUB_TRANSIENT_RETRIES,
+            hedge_after=settings.GITHUB_HEDGE_AFTER
+        )
+
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = settings.GITHUB_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("h2 package not installed. Falling back to HTTP/1.1 for GitHub API.")
+                http2 = False
+
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.GITHUB_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GITHUB_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.GITHUB_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(
+                settings.GITHUB_HTTP_TIMEOUT,
+                connect=settings.GITHUB_HTTP_CONNECT_TIMEOUT
+            )
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so scripts and tests work without the app lifespan
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def start(self):
+        """
+        Open the shared connection pool. Called from the app lifespan.
+        """
+        _ = self.client
+
+    async def close(self):
+        """
+        Close the shared connection pool. Called from the app lifespan.
+        """
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def _send(self, method: str, url: str, write: bool, **kwargs) -> httpx.Response:
+        await self.rate_limiter.acquire(write=write, max_wait=settings.GITHUB_MAX_RETRY_WAIT)
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            raise GitHubUnavailableError(f"Could not connect for {method} {url}: {e!r}", sent=False) from e
+        except httpx.TransportError as e:
+            raise GitHubUnavailableError(f"{method} {url} failed: {e!r}") from e
+        self.rate_limiter.update(response)
+        if response.status_code >= 500:
+            raise GitHubUnavailableError(f"{method} {url} returned {response.status_code}")
+        return response
+
+    async def request(self, method: str, url: str, idempotent: bool | None = None, **kwargs) -> httpx.Response:
+        """
+        Send a request through the rate limiter, retrying throttled
+        responses. Raises GitHubRateLimitError, carrying a retry_after hint,
+        when throttling outlasts GITHUB_MAX_RETRY_WAIT or the retries, so
+        the triage queue can reschedule the job instead of dropping the
+        write. Raises GitHubAPIError for other failures.
+
+        Connection failures and 5xx responses go through the "github"
+        resilience policy. Requests that are not idempotent (by default
+        anything but GET, PUT and DELETE) are only retried if they never
+        reached GitHub, and only GETs are hedged. While the circuit is open
+        CircuitOpenError, which also carries retry_after, is raised at once.
+        """
+        write = method.upper() != "GET"
+        if idempotent is None:
+            idempotent = method.upper() in ("GET", "PUT", "DELETE")
+
+        def retryable(error: BaseException) -> bool:
+            return idempotent or not getattr(error, "sent", True)
+
+        for attempt in range(settings.GITHUB_MAX_RETRIES + 1):
+            response = await self.resilience.call(
+                partial(self._send, method, url, write, **kwargs),
+                hedge=not write,
+                retryable=retryable
+            )
+
+            delay = self.rate_limiter.throttle_delay(response)
+            if delay is None:
+                break
+            if attempt == settings.GITHUB_MAX_RETRIES or delay > settings.GITHUB_MAX_RETRY_WAIT:
+                raise GitHubRateLimitError(
+                    f"Rate limited on {method} {url} (retry in {delay:.0f}s)",
+                    retry_after=delay
+                )
+            logger.warning(f"GitHub rate limit hit on {method} {url}, retrying in {delay:.0f}s")
+
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            raise GitHubAPIError(str(e)) from e
+        return response
+
+    def mutations(self, issue: GitHubIssue) -> IssueMutations:
+        """
+        Start a mutation buffer for an issue.
+        """
+        return IssueMutations(issue=issue)
+
+    def _applied_for(self, issue: GitHubIssue) -> dict:
+        key = issue.url
+        if key in self._applied:
+            self._applied.move_to_end(key)
+        else:
+            self._applied[key] = {"labels": set(), "assignees": set()}
+            while len(self._applied) > settings.GITHUB_MUTATION_HISTORY_SIZE:
+                self._applied.popitem(last=False)
+        return self._applied[key]
+
+    async def _pending(self, mutations: IssueMutations) -> tuple[list[str], list[str], str | None]:
+        """
+        Drop writes the issue already has: labels and assignees present in
+        the webhook payload or applied recently, and the comment if the bot
+        has already commented on this issue.
+        """
+        issue = mutations.issue
+        applied = self._applied_for(issue)
+
+        existing_labels = {
+            label.get("name") if isinstance(label, dict) else label
+            for label in issue.labels
+        } | applied["labels"]
+        labels = [label for label in mutations.labels if label not in existing_labels]
+
+        existing_assignees = {user.login for user in issue.assignees} | applied["assignees"]
+        if issue.assignee:
+            existing_assignees.add(issue.assignee.login)
+        assignees = [login for login in mutations.assignees if login not in existing_assignees]
+
+        comment = mutations.comment
+        if comment and await self.comment_ledger.has_commented(issue):
+            comment = None
+
+        return labels, assignees, comment
+
+    async def flush(self, mutations: IssueMutations) -> dict:
+        """
+        Send the pending writes for an issue, skipping ones that would be
+        no-ops. The requests are issued together, but the rate limiter still
+        spaces writes GITHUB_WRITE_MIN_INTERVAL apart, so callers that need
+        low latency should flush early writes (labels, assignees) before
+        slow ones are ready. Flushing the same buffer again only sends what
+        was added since. Returns the writes that were attempted.
+        """
+        issue = mutations.issue
+        labels, assignees, comment = await self._pending(mutations)
+        skipped = (len(mutations.labels) - len(labels)) + (len(mutations.assignees) - len(assignees))
+        if mutations.comment and comment is None:
+            skipped += 1
+        if skipped:
+            metrics.inc("github.mutations.deduplicated", skipped)
+
+        writes = []
+        if labels:
+            writes.append(self.add_labels(issue, labels))
+        if assignees:
+            writes.append(self.add_assignees(issue, assignees))
+        if comment:
+            writes.append(self.post_comment(issue, comment))
+
+        if writes:
+            await asyncio.gather(*writes)
+        else:
+            logger.info(f"No pending GitHub writes for issue #{issue.number}")
+
+        return {"labels": labels, "assignees": assignees, "comment": comment}
+
     async def add_labels(self, issue: GitHubIssue, labels: list[str]):
         """
         Add labels to an issue.
         """
-        if not settings.GITHUB_TOKEN:
+        if not self.token:
             logger.warning("GITHUB_TOKEN not set. Skipping label application.")
             return
 
         url = f"{issue.url}/labels"
-        
+
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url, 
-                    json={"labels": labels},
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                logger.info(f"Added labels {labels} to issue #{issue.number}")
+            await self.request("POST", url, idempotent=True, json={"labels": labels})
+            self._applied_for(issue)["labels"].update(labels)
+            logger.info(f"Added labels {labels} to issue #{issue.number}")
+        except (GitHubRateLimitError, CircuitOpenError):
+            # Let the triage queue reschedule the job once the limit lifts
+            raise
         except Exception as e:
             logger.error(f"Failed to add labels to issue #{issue.number}: {e}")
 
@@ -41,23 +427,39 @@ class GitHubService:
         """
         Post a comment on an issue.
         """
-        if not settings.GITHUB_TOKEN:
+        if not self.token:
             logger.warning("GITHUB_TOKEN not set. Skipping comment.")
             return
 
         url = f"{issue.url}/comments"
-        
+
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url, 
-                    json={"body": body},
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                logger.info(f"Posted comment on issue #{issue.number}")
+            await self.request("POST", url, json={"body": body})
+            await self.comment_ledger.record(issue)
+            logger.info(f"Posted comment on issue #{issue.number}")
+        except (GitHubRateLimitError, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error(f"Failed to post comment on issue #{issue.number}: {e}")
 
+    async def add_assignees(self, issue: GitHubIssue, assignees: list[str]):
+        """
+        Assign users to an issue.
+        """
+        if not self.token:
+            logger.warning("GITHUB_TOKEN not set. Skipping assignment.")
+            return
+
+        url = f"{issue.url}/assignees"
+
+        try:
+            await self.request("POST", url, idempotent=True, json={"assignees": assignees})
+            self._applied_for(issue)["assignees"].update(assignees)
+            logger.info(f"Assigned {assignees} to issue #{issue.number}")
+        except (GitHubRateLimitError, CircuitOpenError):
+            raise
+        except Exception as e:
+            logger.error(f"Failed to assign issue #{issue.number}: {e}")
+
 # Singleton instance
 github_service = GitHubService()
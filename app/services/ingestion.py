@@ -0,0 +1,221 @@
+"""
+Bulk backfill of a repository's existing issues into the vector store.
+
+Usage:
+    python -m app.services.ingestion --repo owner/name
+    python -m app.services.ingestion --repo owner/name --jsonl issues.jsonl --checkpoint backfill.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from app.config.settings import get_settings
+from app.services.lexical_index import lexical_fields
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+def issue_document(issue: dict, fingerprint) -> tuple[str, str, dict]:
+    """
+    Return (id, text, metadata) for an issue, in the same shape the
+    SimilarityAgent stores live issues.
+    """
+    text = f"{issue['title']} {issue.get('body') or ''}"
+    metadata = {
+        "number": issue["number"],
+        "title": issue["title"],
+        "state": issue.get("state", "open"),
+        "fingerprint": fingerprint(text),
+        **lexical_fields(issue["title"], issue.get("body")),
+    }
+    return str(issue["id"]), text, metadata
+
+class JSONLIssueSource:
+    """
+    Reads issues from a local JSONL export (one GitHub issue object per
+    line). The cursor is the number of lines already consumed.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    async def iter_issues(self, cursor: Optional[int] = None) -> AsyncIterator[tuple[int, dict]]:
+        start = cursor or 0
+        with open(self.path) as f:
+            for line_number, line in enumerate(f):
+                if line_number < start or not line.strip():
+                    continue
+                yield line_number + 1, json.loads(line)
+
+class GitHubIssueSource:
+    """
+    Pages through a repository's issues (oldest first) via the REST API,
+    skipping pull requests. The cursor is the page to resume from; a
+    resumed run may re-read part of a page, which upserts make harmless.
+    """
+
+    def __init__(self, repo: str, github_service=None, per_page: int = 100):
+        if github_service is None:
+            from app.services.github import github_service
+        self.repo = repo
+        self.github = github_service
+        self.per_page = per_page
+
+    async def iter_issues(self, cursor: Optional[int] = None) -> AsyncIterator[tuple[int, dict]]:
+        page = cursor or 1
+        while True:
+            response = await self.github.request(
+                "GET",
+                f"{self.github.base_url}/repos/{self.repo}/issues",
+                params={
+                    "state": "all",
+                    "sort": "created",
+                    "direction": "asc",
+                    "per_page": self.per_page,
+                    "page": page,
+                }
+            )
+            items = response.json()
+            if not items:
+                return
+            for item in items:
+                if "pull_request" not in item:
+                    yield page, item
+            page += 1
+
+class IngestionPipeline:
+    """
+    Streams issues from a source, embeds them in batches and upserts them
+    into the vector store. Memory is bounded by one batch. At most every
+    `checkpoint_interval` seconds (and at the end) the vector store is
+    persisted and then the checkpoint written, so an interrupted run
+    resumes where the last durable checkpoint left off.
+    """
+
+    def __init__(
+        self,
+        source,
+        repo: str = "unknown",
+        checkpoint_path: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        embedding_service=None,
+        vector_store=None,
+        checkpoint_interval: Optional[float] = None,
+    ):
+        if embedding_service is None:
+            from app.services.embedding import embedding_service
+        if vector_store is None:
+            from app.services.vectorstore import vector_store as vector_store_service
+            vector_store = vector_store_service.for_repo(repo)
+        self.source = source
+        self.repo = repo
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.batch_size = batch_size or settings.INGESTION_BATCH_SIZE
+        self.embedding_service = embedding_service
+        self.vector_store = vector_store
+        self.checkpoint_interval = (
+            settings.INGESTION_CHECKPOINT_INTERVAL if checkpoint_interval is None else checkpoint_interval
+        )
+
+    def load_checkpoint(self) -> dict:
+        if self.checkpoint_path and self.checkpoint_path.exists():
+            return json.loads(self.checkpoint_path.read_text())
+        return {"cursor": None, "ingested": 0}
+
+    def save_checkpoint(self, checkpoint: dict):
+        if not self.checkpoint_path:
+            return
+        tmp = self.checkpoint_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(checkpoint))
+        tmp.replace(self.checkpoint_path)
+
+    async def _flush(self, batch: list[dict]) -> int:
+        """
+        Embed and upsert a batch, skipping issues whose stored fingerprint
+        shows they are unchanged. Returns the number of issues written.
+        """
+        documents = [issue_document(issue, self.embedding_service.fingerprint) for issue in batch]
+        stored = await asyncio.to_thread(self.vector_store.get_fingerprints, [doc[0] for doc in documents])
+        documents = [doc for doc in documents if stored.get(doc[0]) != doc[2]["fingerprint"]]
+        if not documents:
+            return 0
+
+        ids, texts, metadatas = zip(*documents)
+        embeddings = await asyncio.to_thread(self.embedding_service.encode_many, list(texts))
+        await asyncio.to_thread(
+            self.vector_store.upsert_many, list(ids), embeddings, list(metadatas), list(texts)
+        )
+        return len(ids)
+
+    async def run(self) -> dict:
+        checkpoint = self.load_checkpoint()
+        start = time.perf_counter()
+        ingested = 0
+        written = 0
+        batch: list[dict] = []
+        cursor = checkpoint["cursor"]
+        checkpointed_at = time.monotonic()
+
+        async def commit():
+            nonlocal checkpointed_at
+            await asyncio.to_thread(self.vector_store.save)
+            self.save_checkpoint(checkpoint)
+            checkpointed_at = time.monotonic()
+
+        async def flush():
+            nonlocal ingested, written, batch
+            written += await self._flush(batch)
+            ingested += len(batch)
+            checkpoint["cursor"] = cursor
+            checkpoint["ingested"] += len(batch)
+            batch = []
+            if time.monotonic() - checkpointed_at >= self.checkpoint_interval:
+                await commit()
+            elapsed = time.perf_counter() - start
+            logger.info(f"Ingested {ingested} issues ({ingested / elapsed:.1f} items/s)")
+
+        async for cursor, issue in self.source.iter_issues(checkpoint["cursor"]):
+            batch.append(issue)
+            if len(batch) >= self.batch_size:
+                await flush()
+
+        if batch:
+            await flush()
+        await commit()
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            "ingested": ingested,
+            "written": written,
+            "total_ingested": checkpoint["ingested"],
+            "seconds": elapsed,
+            "items_per_second": ingested / elapsed if elapsed > 0 else 0.0,
+        }
+        logger.info(f"Backfill finished: {stats}")
+        return stats
+
+def main():
+    from app.config.logging import setup_logging
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description="Backfill existing issues into the vector store")
+    parser.add_argument("--repo", required=True, help="Repository to index, as owner/name")
+    parser.add_argument("--jsonl", help="Read from a local JSONL export (one issue per line) instead of the GitHub API")
+    parser.add_argument("--checkpoint", help="Checkpoint file used to resume an interrupted run")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    source = JSONLIssueSource(args.jsonl) if args.jsonl else GitHubIssueSource(args.repo)
+    pipeline = IngestionPipeline(
+        source, repo=args.repo, checkpoint_path=args.checkpoint, batch_size=args.batch_size
+    )
+    if not getattr(pipeline.vector_store, "writable", True):
+        parser.error("The vector store is open for writing in another process; stop the server first")
+    stats = asyncio.run(pipeline.run())
+    print(json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+from app.config.settings import get_settings
+from app.utils.extractors import ContextExtractor
+from collections import Counter, defaultdict
+import logging
+import math
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Dotted names and versions ("java.lang.NullPointerException", "1.2.3") stay
+# whole; their parts are indexed as well
+TOKEN = re.compile(r"[a-z0-9_]+(?:\.[a-z0-9_]+)*")
+STOPWORDS = frozenset("a an and are at be but by for from has i in is it not of on or the this to was when with".split())
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for token in TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "." in token:
+            tokens.extend(part for part in token.split(".") if part and part not in STOPWORDS)
+    return tokens
+
+def lexical_fields(title: str, body: str | None) -> dict:
+    """
+    Metadata stored with each issue so its lexical index entry can be
+    rebuilt: terms from the title and error signatures, and the exact
+    error signature ("" when there is none, as Chroma rejects None).
+    """
+    signatures = ContextExtractor.extract_error_signatures(body or "")
+    return {
+        "terms": " ".join(tokenize(" ".join([title, *signatures]))),
+        "signature": ContextExtractor.error_signature(body or "") or "",
+    }
+
+class BM25Index:
+    """
+    Incremental BM25 inverted index. Documents can be added, replaced and
+    removed at any time; scores always reflect the current corpus.
+
+    Also maps exact error signatures to the documents that carry them.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict[str, int]] = defaultdict(dict)
+        self._lengths: dict[str, int] = {}
+        self._terms: dict[str, Counter] = {}
+        self._total_length = 0
+        self._signatures: dict[str, set[str]] = defaultdict(set)
+        self._doc_signature: dict[str, str] = {}
+        self.metadata: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def _remove(self, doc_id: str):
+        terms = self._terms.pop(doc_id, None)
+        if terms is not None:
+            for term in terms:
+                postings = self._postings[term]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= self._lengths.pop(doc_id)
+
+        signature = self._doc_signature.pop(doc_id, None)
+        if signature:
+            self._signatures[signature].discard(doc_id)
+            if not self._signatures[signature]:
+                del self._signatures[signature]
+        self.metadata.pop(doc_id, None)
+
+    def add(self, doc_id: str, tokens: list[str], signature: str | None = None, metadata: dict | None = None):
+        """Insert or replace a document."""
+        with self._lock:
+            self._remove(doc_id)
+            terms = Counter(tokens)
+            self._terms[doc_id] = terms
+            for term, count in terms.items():
+                self._postings[term][doc_id] = count
+            self._lengths[doc_id] = len(tokens)
+            self._total_length += len(tokens)
+            if signature:
+                self._signatures[signature].add(doc_id)
+                self._doc_signature[doc_id] = signature
+            self.metadata[doc_id] = metadata or {}
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+
+    def signature_matches(self, signature: str) -> list[str]:
+        with self._lock:
+            return sorted(self._signatures.get(signature, ()))
+
+    def search(self, tokens: list[str], n_results: int = 10) -> list[tuple[str, float]]:
+        """Return up to n_results (doc_id, score) pairs, best first."""
+        with self._lock:
+            n_docs = len(self._lengths)
+            if n_docs == 0:
+                return []
+            avg_length = self._total_length / n_docs or 1.0
+
+            scores: dict[str, float] = defaultdict(float)
+            for term in set(tokens):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+
+class LexicalIndexService:
+    """
+    One BM25 index per repository, kept in memory. An index is rebuilt from
+    the terms and signatures stored in the vector store's metadata the first
+    time its repository is used, and updated incrementally afterwards.
+    """
+
+    def __init__(self, vector_store=None):
+        if vector_store is None:
+            from app.services.vectorstore import vector_store
+        self.vector_store = vector_store
+        self._indexes: dict[str, BM25Index] = {}
+        self._lock = threading.Lock()
+
+    def for_repo(self, repo: str) -> BM25Index:
+        with self._lock:
+            index = self._indexes.get(repo)
+            if index is not None:
+                return index
+
+            index = BM25Index(k1=settings.BM25_K1, b=settings.BM25_B)
+            try:
+                for doc_id, metadata in self.vector_store.for_repo(repo).all_metadata().items():
+                    index.add(
+                        doc_id,
+                        metadata.get("terms", "").split(),
+                        metadata.get("signature") or None,
+                        {"number": metadata.get("number"), "title": metadata.get("title")},
+                    )
+                logger.info(f"Built lexical index for {repo} with {len(index)} issues")
+            except Exception as e:
+                logger.warning(f"Failed to rebuild lexical index for {repo}: {e}")
+            self._indexes[repo] = index
+            return index
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[tuple[str, float]]:
+    """
+    Fuse several rankings of ids: each id scores sum(1 / (k + rank)) over
+    the rankings it appears in (rank starting at 1). Best first.
+    """
+    scores: dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+# Singleton instance
+lexical_index = LexicalIndexService()
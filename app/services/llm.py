@@ -1,12 +1,41 @@
 import google.generativeai as genai
 from app.config.settings import get_settings
+from app.core.exceptions import LLMError
+from app.core.metrics import metrics
+from app.core.resilience import ResiliencePolicy
+from app.utils.json_stream import JSONStreamParser, loads_lenient
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pydantic import TypeAdapter, ValidationError
+from typing import Any, Callable
+from google.api_core.exceptions import GoogleAPICallError
+import asyncio
+import json
 import logging
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
 class LLMService:
-    def __init__(self):
+    def __init__(self, max_concurrency: int | None = None, timeout: float | None = None):
+        # Gemini's client is synchronous, so calls run on a dedicated pool
+        # sized to the concurrency limit instead of blocking the event loop.
+        self.max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+        self.timeout = timeout or settings.LLM_TIMEOUT_SECONDS
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="llm"
+        )
+        self._semaphore = None
+        # Timeouts and API errors trip the breaker; once it is open, calls
+        # fail immediately and agents fall back to rules and templates
+        self.resilience = ResiliencePolicy(
+            "llm",
+            failure_types=(LLMError, GoogleAPICallError, ConnectionError),
+            max_retries=settings.LLM_MAX_RETRIES,
+            hedge_after=settings.LLM_HEDGE_AFTER
+        )
+
         if settings.GEMINI_API_KEY:
             genai.configure(api_key=settings.GEMINI_API_KEY)
             self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
@@ -14,24 +43,105 @@ class LLMService:
         else:
             logger.warning("GEMINI_API_KEY not set. LLM service unavailable.")
             self.available = False
-            
-    async def generate_content(self, prompt: str) -> str:
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _generation_config(self):
+        return genai.types.GenerationConfig(temperature=settings.GEMINI_TEMPERATURE)
+
+    def _generate_sync(self, prompt: str) -> str:
+        response = self.model.generate_content(prompt, generation_config=self._generation_config())
+        return response.text
+
+    def _generate_json_sync(self, prompt: str) -> str:
+        # Stream the response and stop reading as soon as the first JSON
+        # value is complete, so trailing prose is never waited for
+        parser = JSONStreamParser()
+        response = self.model.generate_content(prompt, generation_config=self._generation_config(), stream=True)
+        for chunk in response:
+            if parser.feed(chunk.text):
+                break
+        return parser.buffer
+
+    async def _call_model(self, generate: Callable[[str], str], prompt: str, timeout: float) -> str:
+        loop = asyncio.get_running_loop()
+        async with self.semaphore:
+            future = loop.run_in_executor(self._executor, partial(generate, prompt))
+            try:
+                return await asyncio.wait_for(future, timeout=timeout)
+            except asyncio.TimeoutError:
+                # The worker thread cannot be interrupted, but the caller is
+                # released and the pool size still bounds in-flight requests.
+                logger.error(f"LLM call timed out after {timeout}s")
+                raise LLMError(f"LLM call timed out after {timeout}s")
+
+    async def generate_content(self, prompt: str, timeout: float | None = None, stream_json: bool = False) -> str:
+        """
+        Return the model's response text. With `stream_json` the response
+        is streamed and cut off after its first complete JSON value.
+
+        Calls go through the "llm" resilience policy: failures are retried
+        with jittered backoff, and while the circuit is open
+        CircuitOpenError is raised without calling the model.
+        """
         if not self.available:
             return "LLM Service Unavailable"
-            
+
+        timeout = timeout or self.timeout
+        generate = self._generate_json_sync if stream_json else self._generate_sync
+
         try:
-            # Gemini execution is synchronous, wrapping if needed or just calling directly
-            # For high throughput, we might want to run this in a threadpool
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=settings.GEMINI_TEMPERATURE
-                )
-            )
-            return response.text
+            return await self.resilience.call(partial(self._call_model, generate, prompt, timeout), hedge=True)
         except Exception as e:
             logger.error(f"Error generating content: {e}")
             raise
 
+    async def generate_structured(self, prompt: str, schema: Any, timeout: float | None = None, reasks: int | None = None) -> Any:
+        """
+        Generate a response and validate it into `schema` (a Pydantic model
+        or any type Pydantic can validate, e.g. list[Model]).
+
+        The model version in use has no JSON mode, so the prompt carries the
+        JSON Schema and the response is streamed until its first JSON value
+        closes. Surrounding prose, code fences, trailing commas and Python
+        literals are repaired locally; only output that still fails
+        validation is re-asked, at most `reasks` times (default
+        LLM_STRUCTURED_REASKS) with the validation error. Raises LLMError
+        if no valid response is obtained.
+        """
+        adapter = TypeAdapter(schema)
+        reasks = settings.LLM_STRUCTURED_REASKS if reasks is None else reasks
+        instruction = (
+            "\nThe JSON must match this JSON Schema:\n"
+            + json.dumps(adapter.json_schema(), separators=(",", ":"))
+        )
+        request = prompt + instruction
+
+        for attempt in range(reasks + 1):
+            text = await self.generate_content(request, timeout=timeout, stream_json=True)
+            try:
+                return adapter.validate_python(loads_lenient(text))
+            except (ValueError, ValidationError) as e:
+                error = str(e)
+                logger.warning(f"Structured response invalid (attempt {attempt + 1}): {error[:200]}")
+
+            if attempt < reasks:
+                metrics.inc("llm.structured.reasks")
+                request = (
+                    f"{prompt}{instruction}\n\nYour previous response could not be used: {error[:500]}\n"
+                    "Respond again with only the corrected JSON."
+                )
+
+        metrics.inc("llm.structured.failures")
+        raise LLMError(f"No valid structured response after {reasks + 1} attempt(s)")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
 # Singleton instance
 llm_service = LLMService()
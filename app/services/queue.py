@@ -0,0 +1,399 @@
+import asyncio
+import logging
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import aliased, sessionmaker
+from app.agents.orchestrator import INDEX_ACTIONS, TRIAGE_ACTIONS
+from app.config.settings import get_settings
+from app.core.metrics import metrics
+from app.db.models import DeadLetterJob, TriageJob
+from app.db.session import SessionLocal
+from app.models.domain import WebhookPayload
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+JobHandler = Callable[[WebhookPayload], Awaitable[None]]
+# Called with the payloads of a claimed batch before its jobs run, e.g. to
+# classify them all in one LLM call
+BatchPreparer = Callable[[list[WebhookPayload]], Awaitable[None]]
+
+@dataclass
+class ClaimedJob:
+    id: int
+    issue_key: str
+    attempts: int
+    lease_id: str
+    payload: WebhookPayload
+
+def issue_key_for(payload: WebhookPayload) -> str:
+    repo = payload.repository.full_name if payload.repository else "unknown"
+    number = payload.issue.number if payload.issue else 0
+    return f"{repo}#{number}"
+
+def coalesce_action(queued: str, new: str) -> str:
+    """
+    The action to run when a new event arrives for an issue whose earlier
+    event is still queued. The job always runs on the newest snapshot of
+    the issue: a pending triage stays a triage (indexing is part of it)
+    unless the issue was deleted, and index updates just take the latest
+    action.
+    """
+    if new == "deleted":
+        return new
+    if new in TRIAGE_ACTIONS:
+        return new
+    if queued in TRIAGE_ACTIONS:
+        return queued
+    return new
+
+class TriageQueue:
+    """
+    Durable triage job queue backed by the application database.
+
+    Jobs are claimed with a visibility timeout: a worker that dies mid-job
+    leaves the row "running" until the lock expires, after which another
+    worker picks it up. While a job runs, a heartbeat keeps extending the
+    lock, and completion or failure only applies while the claim is still
+    held. Failed jobs are retried with exponential backoff and moved to the
+    dead-letter table once max_attempts is exhausted, including jobs whose
+    worker keeps dying before it can report a failure.
+
+    When more than batch_threshold jobs are queued and a batch preparer was
+    given, workers claim up to batch_size jobs at a time and pass them to
+    the preparer before running them concurrently.
+
+    An event for an issue that already has a queued (not yet running) job
+    is merged into that job instead of adding another, so bursts such as
+    opened + edited + edited cost one pipeline run. Jobs of an issue whose
+    previous job is still running are not claimed until it finishes, so
+    one issue never has two pipelines at once.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        workers: Optional[int] = None,
+        visibility_timeout: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        batch_threshold: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.session_factory = session_factory
+        self.workers = workers or settings.QUEUE_WORKERS
+        self.visibility_timeout = visibility_timeout or settings.QUEUE_VISIBILITY_TIMEOUT
+        self.max_attempts = max_attempts or settings.QUEUE_MAX_ATTEMPTS
+        self.poll_interval = poll_interval or settings.QUEUE_POLL_INTERVAL
+        self.backoff_base = settings.QUEUE_RETRY_BACKOFF_BASE
+        self.backoff_max = settings.QUEUE_RETRY_BACKOFF_MAX
+        self.batch_threshold = batch_threshold or settings.QUEUE_BATCH_THRESHOLD
+        self.batch_size = batch_size or settings.QUEUE_BATCH_SIZE
+        self._prepare: Optional[BatchPreparer] = None
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    # Synchronous DB operations, run via asyncio.to_thread
+
+    def _enqueue_sync(self, payload: WebhookPayload) -> tuple[int, bool]:
+        """Returns (job id, whether the event was merged into a queued job)."""
+        issue_key = issue_key_for(payload)
+        with self.session_factory() as session:
+            queued = session.execute(
+                select(TriageJob)
+                .where(TriageJob.issue_key == issue_key, TriageJob.status == "queued")
+                .order_by(TriageJob.id.desc())
+                .limit(1)
+            ).scalar_one_or_none()
+            if queued is not None and payload.action in TRIAGE_ACTIONS | INDEX_ACTIONS:
+                action = coalesce_action(queued.action, payload.action)
+                # Conditional so a job claimed in the meantime is left alone
+                result = session.execute(
+                    update(TriageJob)
+                    .where(TriageJob.id == queued.id, TriageJob.status == "queued")
+                    .values(action=action, payload=payload.model_copy(update={"action": action}).model_dump_json())
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount == 1:
+                    session.commit()
+                    return queued.id, True
+
+            job = TriageJob(
+                issue_key=issue_key,
+                action=payload.action,
+                payload=payload.model_dump_json(),
+                status="queued",
+                attempts=0,
+                available_at=time.time(),
+            )
+            session.add(job)
+            session.commit()
+            return job.id, False
+
+    def _claim_sync(self) -> Optional[ClaimedJob]:
+        running = aliased(TriageJob)
+        with self.session_factory() as session:
+            while True:
+                now = time.time()
+                busy_issues = select(running.issue_key).where(running.status == "running", running.locked_until >= now)
+                claimable = and_(
+                    or_(
+                        and_(TriageJob.status == "queued", TriageJob.available_at <= now),
+                        and_(TriageJob.status == "running", TriageJob.locked_until < now),
+                    ),
+                    TriageJob.issue_key.not_in(busy_issues),
+                )
+                job = session.execute(
+                    select(TriageJob).where(claimable).order_by(TriageJob.available_at).limit(1)
+                ).scalar_one_or_none()
+                if job is None:
+                    return None
+
+                if job.attempts >= self.max_attempts:
+                    # Only reachable when earlier claims never reported back,
+                    # e.g. a poison job that crashes the worker process
+                    logger.error(f"Job {job.id} ({job.issue_key}) dead-lettered: lease expired after {job.attempts} attempts")
+                    self._dead_letter(session, job, job.last_error or "Lease expired without completion")
+                    session.commit()
+                    continue
+
+                attempts = job.attempts + 1
+                payload = job.payload
+                lease_id = uuid.uuid4().hex
+
+                # Conditional update so two workers cannot claim the same row
+                result = session.execute(
+                    update(TriageJob)
+                    .where(TriageJob.id == job.id, claimable)
+                    .values(
+                        status="running",
+                        attempts=TriageJob.attempts + 1,
+                        locked_until=now + self.visibility_timeout,
+                        lease_id=lease_id,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                session.commit()
+                if result.rowcount != 1:
+                    # Another worker got there first; look for the next job
+                    continue
+
+                return ClaimedJob(
+                    id=job.id,
+                    issue_key=job.issue_key,
+                    attempts=attempts,
+                    lease_id=lease_id,
+                    payload=WebhookPayload.model_validate_json(payload),
+                )
+
+    def _claim_many_sync(self, limit: int) -> list[ClaimedJob]:
+        jobs = []
+        while len(jobs) < limit:
+            job = self._claim_sync()
+            if job is None:
+                break
+            jobs.append(job)
+        return jobs
+
+    def _dead_letter(self, session, job: TriageJob, error: str):
+        session.add(DeadLetterJob(
+            job_id=job.id,
+            issue_key=job.issue_key,
+            action=job.action,
+            payload=job.payload,
+            attempts=job.attempts,
+            last_error=error,
+        ))
+        session.delete(job)
+
+    def _held(self, session, job: ClaimedJob) -> Optional[TriageJob]:
+        row = session.get(TriageJob, job.id)
+        if row is None or row.lease_id != job.lease_id or row.status != "running":
+            return None
+        return row
+
+    def _extend_sync(self, job: ClaimedJob) -> bool:
+        """Push the lock of a running job forward. Returns False if the lease was lost."""
+        with self.session_factory() as session:
+            result = session.execute(
+                update(TriageJob)
+                .where(
+                    TriageJob.id == job.id,
+                    TriageJob.lease_id == job.lease_id,
+                    TriageJob.status == "running",
+                )
+                .values(locked_until=time.time() + self.visibility_timeout)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+            return result.rowcount == 1
+
+    def _complete_sync(self, job: ClaimedJob) -> bool:
+        with self.session_factory() as session:
+            row = self._held(session, job)
+            if row is None:
+                return False
+            session.delete(row)
+            session.commit()
+            return True
+
+    def _fail_sync(self, job: ClaimedJob, error: str, retry_after: Optional[float] = None) -> bool:
+        """
+        Reschedule or dead-letter a failed job. Returns True if dead-lettered.
+        retry_after, when the failure carries one (e.g. a GitHub rate-limit
+        reset), is a lower bound on the retry delay.
+        """
+        with self.session_factory() as session:
+            row = self._held(session, job)
+            if row is None:
+                return False
+
+            if row.attempts >= self.max_attempts:
+                self._dead_letter(session, row, error)
+                session.commit()
+                return True
+
+            row.status = "queued"
+            row.locked_until = None
+            row.lease_id = None
+            row.last_error = error
+            row.available_at = time.time() + max(self._backoff(row.attempts), retry_after or 0.0)
+            session.commit()
+            return False
+
+    def _backoff(self, attempts: int) -> float:
+        # Exponential backoff with equal jitter: between half and all of
+        # the delay, so a retry never comes back immediately
+        delay = min(self.backoff_max, self.backoff_base ** attempts)
+        return random.uniform(delay / 2, delay)
+
+    def _depth_sync(self) -> int:
+        with self.session_factory() as session:
+            return session.query(TriageJob).count()
+
+    # Async API
+
+    async def enqueue(self, payload: WebhookPayload) -> int:
+        job_id, merged = await asyncio.to_thread(self._enqueue_sync, payload)
+        if merged:
+            metrics.inc("queue.coalesced")
+            logger.info(f"Merged {payload.action} for {issue_key_for(payload)} into queued job {job_id}")
+            return job_id
+        if self._wakeup is not None:
+            self._wakeup.set()
+        logger.info(f"Enqueued job {job_id} for {issue_key_for(payload)}")
+        return job_id
+
+    async def depth(self) -> int:
+        return await asyncio.to_thread(self._depth_sync)
+
+    async def run_once(self, handler: JobHandler) -> bool:
+        """Claim and process a single job. Returns False if the queue was empty."""
+        job = await asyncio.to_thread(self._claim_sync)
+        if job is None:
+            return False
+        await self._run_claimed(job, handler)
+        return True
+
+    async def run_batch(self, handler: JobHandler, prepare: BatchPreparer) -> bool:
+        """
+        Claim up to batch_size jobs, prepare them together, then process
+        them concurrently. Returns False if the queue was empty. A failing
+        preparer only costs the batching benefit; each job still runs.
+        """
+        jobs = await asyncio.to_thread(self._claim_many_sync, self.batch_size)
+        if not jobs:
+            return False
+
+        # Preparation takes at most a couple of LLM timeouts, well inside
+        # the visibility timeout, so the leases need no heartbeat yet
+        try:
+            await prepare([job.payload for job in jobs])
+        except Exception as e:
+            logger.warning(f"Preparing a batch of {len(jobs)} jobs failed: {e}")
+
+        await asyncio.gather(*(self._run_claimed(job, handler) for job in jobs))
+        return True
+
+    async def _run_claimed(self, job: ClaimedJob, handler: JobHandler):
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            await handler(job.payload)
+        except Exception as e:
+            heartbeat.cancel()
+            retry_after = getattr(e, "retry_after", None)
+            dead = await asyncio.to_thread(self._fail_sync, job, repr(e), retry_after)
+            if dead:
+                logger.error(f"Job {job.id} ({job.issue_key}) dead-lettered after {job.attempts} attempts: {e}")
+            else:
+                logger.warning(f"Job {job.id} ({job.issue_key}) failed on attempt {job.attempts}, will retry: {e}")
+        else:
+            heartbeat.cancel()
+            if not await asyncio.to_thread(self._complete_sync, job):
+                logger.warning(f"Job {job.id} ({job.issue_key}) finished after its lease was lost")
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job: ClaimedJob):
+        interval = self.visibility_timeout / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                held = await asyncio.to_thread(self._extend_sync, job)
+            except Exception as e:
+                logger.warning(f"Failed to extend lease of job {job.id}: {e}")
+                continue
+            if not held:
+                logger.warning(f"Lost lease on job {job.id} ({job.issue_key})")
+                return
+
+    async def _worker(self, worker_id: int, handler: JobHandler):
+        logger.info(f"Queue worker {worker_id} started")
+        batching = False
+        depth_checked_at = float("-inf")
+        while True:
+            try:
+                # The backlog size decides between single jobs and batches;
+                # counting it is a table scan, so at most once per poll
+                if self._prepare is not None and time.monotonic() - depth_checked_at >= self.poll_interval:
+                    batching = await self.depth() > self.batch_threshold
+                    depth_checked_at = time.monotonic()
+                if batching:
+                    processed = await self.run_batch(handler, self._prepare)
+                else:
+                    processed = await self.run_once(handler)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Queue worker {worker_id} error: {e}")
+                processed = False
+
+            if not processed:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self, handler: JobHandler, prepare: Optional[BatchPreparer] = None):
+        if self._tasks:
+            return
+        self._prepare = prepare
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(i, handler), name=f"triage-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+# Singleton instance
+triage_queue = TriageQueue()
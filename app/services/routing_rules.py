@@ -0,0 +1,223 @@
+from app.config.settings import get_settings
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Signal weights. A label or a code owner is a stronger hint than a word in
+# the text, and a word in the title counts more than one in the body.
+KEYWORD_WEIGHT = 1.0
+TITLE_MULTIPLIER = 2.0
+LABEL_WEIGHT = 3.0
+PATH_WEIGHT = 2.0
+
+# The rules the router always had, used when no config file is set
+DEFAULT_CONFIG = {
+    "fallback_team": "triage-team",
+    "categories": {
+        "feature": "product-team",
+        "security": "security-team",
+        "docs": "docs-team",
+    },
+    # Categories routed to their team whatever the other signals say
+    "pinned_categories": ["security"],
+    "rules": [
+        {"team": "backend-team", "keywords": ["auth", "authentication", "login"], "categories": ["bug"]},
+        {"team": "frontend-team", "keywords": ["ui", "css"], "categories": ["bug"]},
+        {"team": "security-team", "keywords": ["security"], "categories": ["bug"]},
+    ],
+    "labels": {},
+    "codeowners": [],
+    "owners": {},
+}
+
+# File paths mentioned in issue text, e.g. in stack traces: at least one
+# directory and an extension
+PATH_TOKEN = re.compile(r"(?<![\w.-])/?(?:[\w.-]+/)+[\w.-]+\.\w+")
+
+def trie_pattern(words: list[str]) -> str:
+    """
+    One regex alternation for many words with common prefixes factored
+    out ("log(?:in|out)"), so the engine tries each text position against
+    a trie instead of against every word in turn.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        ends = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends:
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+def codeowners_pattern(pattern: str) -> re.Pattern:
+    """
+    Compile a CODEOWNERS path pattern. Issue text rarely has paths relative
+    to the repository root, so every pattern may match at any directory.
+    """
+    body = re.escape(pattern.strip("/"))
+    body = body.replace(r"\*\*", ".*").replace(r"\*", "[^/]*").replace(r"\?", "[^/]")
+    return re.compile(r"(?:^|.*/)" + body + r"(?:/.*)?$")
+
+def parse_codeowners(text: str) -> list[list]:
+    """Turn CODEOWNERS file contents into [pattern, owners] entries."""
+    entries = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            pattern, *owners = line.split()
+            entries.append([pattern, owners])
+    return entries
+
+@dataclass
+class Keyword:
+    team: str
+    weight: float
+    categories: frozenset[str] | None
+
+@dataclass
+class CompiledRules:
+    """
+    One repository's routing rules, compiled: all keywords of all rules
+    share a single trie-shaped regex, so matching costs one pass over the
+    text however many rules there are.
+    """
+    fallback_team: str
+    categories: dict[str, str]
+    pinned_categories: set[str]
+    keywords: dict[str, list[Keyword]]
+    pattern: re.Pattern | None
+    labels: dict[str, str]
+    codeowners: list[tuple[re.Pattern, str, list[str]]]
+    teams: set[str] = field(default_factory=set)
+
+    @classmethod
+    def compile(cls, config: dict) -> "CompiledRules":
+        keywords: dict[str, list[Keyword]] = defaultdict(list)
+        teams = {config["fallback_team"], *config["categories"].values()}
+        for rule in config["rules"]:
+            categories = frozenset(rule["categories"]) if rule.get("categories") else None
+            for keyword in rule["keywords"]:
+                keywords[keyword.lower()].append(Keyword(rule["team"], rule.get("weight", KEYWORD_WEIGHT), categories))
+            teams.add(rule["team"])
+
+        pattern = None
+        if keywords:
+            # Lookarounds instead of \b so keywords like "c++" work too
+            pattern = re.compile(rf"(?<!\w)(?:{trie_pattern(list(keywords))})(?!\w)", re.IGNORECASE)
+
+        owners_map = config.get("owners", {})
+        codeowners = []
+        for path_pattern, owners in config["codeowners"]:
+            owner_teams = [owners_map.get(owner, owner.lstrip("@").split("/")[-1]) for owner in owners]
+            codeowners.append((codeowners_pattern(path_pattern), path_pattern, owner_teams))
+            teams.update(owner_teams)
+
+        labels = {name.lower(): team for name, team in config["labels"].items()}
+        teams.update(labels.values())
+
+        return cls(
+            fallback_team=config["fallback_team"],
+            categories=dict(config["categories"]),
+            pinned_categories=set(config.get("pinned_categories", [])),
+            keywords=dict(keywords),
+            pattern=pattern,
+            labels=labels,
+            codeowners=codeowners,
+            teams=teams,
+        )
+
+    def _add_keywords(self, scores: dict, reasons: dict, text: str, category: str, multiplier: float):
+        if self.pattern is None:
+            return
+        # Each keyword counts once, so a long log repeating a word does not
+        # outweigh everything else
+        for word in dict.fromkeys(match.group(0).lower() for match in self.pattern.finditer(text)):
+            for keyword in self.keywords[word]:
+                if keyword.categories is None or category in keyword.categories:
+                    scores[keyword.team] += keyword.weight * multiplier
+                    reasons[keyword.team].append(f"keyword '{word}'")
+
+    def owners_of(self, path: str) -> list[str]:
+        # As in CODEOWNERS, the last matching pattern wins
+        for compiled, _, teams in reversed(self.codeowners):
+            if compiled.match(path):
+                return teams
+        return []
+
+    def route(self, title: str, body: str, labels: list[str], category: str) -> dict:
+        """
+        Score every team on the issue's signals: keywords in the title and
+        body, labels, and the code owners of file paths mentioned in the
+        body. The best-scoring team wins; without any signal the
+        category's team, then the fallback team, is used.
+        """
+        if category in self.pinned_categories and category in self.categories:
+            team = self.categories[category]
+            return {"team": team, "score": 0.0, "source": "pinned", "reasoning": f"Category '{category}' always goes to {team}."}
+
+        scores: dict[str, float] = defaultdict(float)
+        reasons: dict[str, list[str]] = defaultdict(list)
+
+        self._add_keywords(scores, reasons, title, category, TITLE_MULTIPLIER)
+        self._add_keywords(scores, reasons, body[:settings.ROUTING_MAX_BODY_CHARS], category, 1.0)
+
+        for label in labels:
+            team = self.labels.get(label.lower())
+            if team:
+                scores[team] += LABEL_WEIGHT
+                reasons[team].append(f"label '{label}'")
+
+        if self.codeowners:
+            for path in sorted(set(PATH_TOKEN.findall(body[:settings.ROUTING_MAX_BODY_CHARS]))):
+                for team in self.owners_of(path):
+                    scores[team] += PATH_WEIGHT
+                    reasons[team].append(f"owns '{path}'")
+
+        if scores:
+            # Highest score; ties go to the team signalled first
+            team = max(scores, key=lambda t: scores[t])
+            return {
+                "team": team,
+                "score": scores[team],
+                "source": "rules",
+                "reasoning": f"Scored {scores[team]:g} from " + ", ".join(reasons[team]) + "."
+            }
+
+        team = self.categories.get(category, self.fallback_team)
+        return {"team": team, "score": 0.0, "source": "default", "reasoning": f"No routing signals; default for category '{category}'."}
+
+def load_routing_config(path: str) -> dict:
+    """
+    Read the routing config file: {"default": {...}, "repos": {"owner/name":
+    {...}}}, where each repository's section overrides keys of the default
+    section. A missing or empty path gives the built-in rules.
+    """
+    if not path:
+        return {"default": DEFAULT_CONFIG, "repos": {}}
+    with open(path) as f:
+        raw = json.load(f)
+
+    base_dir = Path(path).parent
+    default = {**DEFAULT_CONFIG, **raw.get("default", {})}
+    sections = {"default": default, **{repo: {**default, **section} for repo, section in raw.get("repos", {}).items()}}
+    for section in sections.values():
+        # "codeowners" may name a CODEOWNERS file, relative to the config file
+        if isinstance(section.get("codeowners"), str):
+            section["codeowners"] = parse_codeowners((base_dir / section["codeowners"]).read_text())
+    return {"default": sections.pop("default"), "repos": sections}
@@ -0,0 +1,204 @@
+"""
+Per-team centroids of issue embeddings, for semantic routing.
+
+Each repository keeps, for every team, the sum of the normalized embeddings
+of issues routed there and their count. The normalized sums form a
+(teams x dim) matrix, so the team closest to a new issue is one
+matrix-vector product. Routing an issue adds its embedding to one row,
+so centroids stay current without rebuilding.
+"""
+from app.config.settings import get_settings
+from app.services.vectorstore import VectorStoreService, partition_name, vector_store
+from pathlib import Path
+import numpy as np
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+def _unit(embedding: np.ndarray) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float64).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class TeamCentroids:
+    """One repository's team centroids."""
+
+    def __init__(self, teams: list[str] | None = None, sums: np.ndarray | None = None, counts: np.ndarray | None = None):
+        self.teams: list[str] = list(teams or [])
+        self._index = {team: i for i, team in enumerate(self.teams)}
+        self.sums = sums
+        self.counts = counts if counts is not None else np.zeros(len(self.teams), dtype=np.int64)
+        self.matrix: np.ndarray | None = None
+        if sums is not None:
+            self.matrix = np.zeros(sums.shape, dtype=np.float32)
+            for row in range(len(self.teams)):
+                self._refresh(row)
+
+    @property
+    def dim(self) -> int | None:
+        return None if self.sums is None else self.sums.shape[1]
+
+    def _refresh(self, row: int):
+        norm = np.linalg.norm(self.sums[row])
+        self.matrix[row] = self.sums[row] / norm if norm else 0.0
+
+    def add(self, team: str, embedding: np.ndarray, weight: int = 1) -> bool:
+        """
+        Add (or with weight -1, take back) one issue's embedding to a team.
+        Returns False if the embedding's dimension does not match.
+        """
+        vector = _unit(embedding)
+        if self.sums is None:
+            self.sums = np.zeros((0, len(vector)))
+            self.matrix = np.zeros((0, len(vector)), dtype=np.float32)
+        elif len(vector) != self.dim:
+            logger.warning(f"Embedding dimension {len(vector)} does not match team centroids ({self.dim})")
+            return False
+
+        row = self._index.get(team)
+        if row is None:
+            if weight < 0:
+                return True
+            row = len(self.teams)
+            self.teams.append(team)
+            self._index[team] = row
+            self.sums = np.vstack([self.sums, np.zeros(self.dim)])
+            self.matrix = np.vstack([self.matrix, np.zeros(self.dim, dtype=np.float32)])
+            self.counts = np.append(self.counts, 0)
+
+        self.sums[row] += weight * vector
+        self.counts[row] = max(0, self.counts[row] + weight)
+        self._refresh(row)
+        return True
+
+    def nearest(self, embedding: np.ndarray, min_issues: int = 1) -> tuple[str, float] | None:
+        """
+        The team whose centroid has the highest cosine similarity to the
+        embedding, among teams with at least `min_issues` issues.
+        """
+        if self.matrix is None or not self.teams:
+            return None
+        vector = _unit(embedding).astype(np.float32)
+        if len(vector) != self.dim:
+            return None
+
+        scores = self.matrix @ vector
+        scores[self.counts < min_issues] = -np.inf
+        row = int(np.argmax(scores))
+        if not np.isfinite(scores[row]):
+            return None
+        return self.teams[row], float(scores[row])
+
+    def save(self, path: Path):
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp, teams=np.array(self.teams, dtype=str), sums=self.sums, counts=self.counts)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "TeamCentroids":
+        with np.load(path) as data:
+            return cls([str(team) for team in data["teams"]], data["sums"], data["counts"])
+
+class TeamCentroidService:
+    """
+    Hands out each repository's TeamCentroids. They are loaded from
+    TEAM_CENTROIDS_DIR, or on first use built from the issues in the
+    repository's vector store whose metadata records a routed team.
+
+    Like the local vector stores, changes are snapshotted at most every
+    VECTOR_SNAPSHOT_INTERVAL seconds and on close().
+    """
+
+    def __init__(self, directory: str | None = None, stores: VectorStoreService | None = None):
+        self.directory = Path(directory or settings.TEAM_CENTROIDS_DIR)
+        self.stores = stores or vector_store
+        self.snapshot_interval = settings.VECTOR_SNAPSHOT_INTERVAL
+        self._repos: dict[str, TeamCentroids] = {}
+        self._dirty: set[str] = set()
+        self._saved_at = time.monotonic()
+        self._lock = threading.RLock()
+
+    def path_for(self, repo: str) -> Path:
+        return self.directory / f"{partition_name(repo)}.npz"
+
+    def _build(self, repo: str) -> TeamCentroids:
+        centroids = TeamCentroids()
+        store = self.stores.for_repo(repo)
+        for issue_id, metadata in store.all_metadata().items():
+            team = metadata.get("team")
+            stored = store.get_issue(issue_id) if team else None
+            if stored is not None and stored["embedding"] is not None:
+                centroids.add(team, stored["embedding"])
+        logger.info(f"Built centroids for {len(centroids.teams)} teams of {repo} from the vector store")
+        return centroids
+
+    def for_repo(self, repo: str) -> TeamCentroids:
+        with self._lock:
+            centroids = self._repos.get(repo)
+            if centroids is None:
+                path = self.path_for(repo)
+                try:
+                    centroids = TeamCentroids.load(path) if path.exists() else self._build(repo)
+                except Exception as e:
+                    logger.warning(f"Failed to load team centroids for {repo}: {e}")
+                    centroids = TeamCentroids()
+                self._repos[repo] = centroids
+            return centroids
+
+    async def load(self, repo: str) -> TeamCentroids:
+        """
+        for_repo() for the event loop: a first use reads the snapshot or
+        scans the vector store, so it runs in a thread.
+        """
+        centroids = self._repos.get(repo)
+        if centroids is None:
+            centroids = await asyncio.to_thread(self.for_repo, repo)
+        return centroids
+
+    def record(self, repo: str, issue_id: str, team: str, embedding: np.ndarray):
+        """
+        Count a routed issue towards its team and tag it in the vector store,
+        so rebuilding from the store gives the same centroids. Issues not in
+        the store are skipped for the same reason. An issue routed again
+        (e.g. reopened) moves from its previous team.
+        """
+        store = self.stores.for_repo(repo)
+        stored = store.get_issue(issue_id)
+        if stored is None:
+            return
+        previous = stored["metadata"].get("team")
+        if previous == team:
+            return
+
+        with self._lock:
+            centroids = self.for_repo(repo)
+            if not centroids.add(team, embedding):
+                return
+            if previous:
+                centroids.add(previous, embedding, weight=-1)
+            self._dirty.add(repo)
+            store.update_metadata(issue_id, {**stored["metadata"], "team": team})
+            if time.monotonic() - self._saved_at >= self.snapshot_interval:
+                self.save()
+
+    def save(self):
+        with self._lock:
+            try:
+                if self._dirty:
+                    self.directory.mkdir(parents=True, exist_ok=True)
+                for repo in list(self._dirty):
+                    self._repos[repo].save(self.path_for(repo))
+                    self._dirty.discard(repo)
+            except Exception as e:
+                logger.error(f"Failed to save team centroids: {e}")
+            self._saved_at = time.monotonic()
+
+    def close(self):
+        self.save()
+
+team_centroids = TeamCentroidService()
@@ -1,42 +1,192 @@
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+from abc import ABC, abstractmethod
 from app.config.settings import get_settings
+import numpy as np
+import hashlib
 import logging
+import re
+import threading
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-class VectorStoreService:
-    def __init__(self):
+class VectorStore(ABC):
+    """
+    Storage for one repository's issue embeddings plus their metadata.
+
+    Distances are cosine distances (1 - cosine similarity). `search` returns results in Chroma's query shape, one list per query:
+    {"ids": [[...]], "distances": [[...]], "metadatas": [[...]]}, smallest
+    distance first. Backends that are unavailable behave as empty stores.
+    """
+
+    available: bool = False
+
+    @abstractmethod
+    def add_issue(self, issue_id: str, embedding: np.ndarray, metadata: dict, text: str):
+        """
+        Insert or replace an issue. Safe to repeat for redeliveries and
+        reopened issues.
+        """
+
+    @abstractmethod
+    def get_issue(self, issue_id: str) -> dict | None:
+        """
+        Return the stored {"embedding", "metadata"} for an issue, or None.
+        """
+
+    @abstractmethod
+    def get_fingerprints(self, ids: list[str]) -> dict[str, str]:
+        """
+        Return {issue_id: fingerprint} for the given ids that are stored.
+        """
+
+    @abstractmethod
+    def all_metadata(self) -> dict[str, dict]:
+        """
+        Return {issue_id: metadata} for every stored issue.
+        """
+
+    @abstractmethod
+    def update_metadata(self, issue_id: str, metadata: dict):
+        pass
+
+    @abstractmethod
+    def delete_issue(self, issue_id: str):
+        pass
+
+    @abstractmethod
+    def upsert_many(self, ids: list[str], embeddings: np.ndarray, metadatas: list[dict], documents: list[str]):
+        """
+        Insert or update many issues at once.
+        """
+
+    @abstractmethod
+    def search(self, embedding: np.ndarray, n_results: int = 5) -> dict | list:
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        pass
+
+    def save(self):
+        """
+        Persist pending writes. A no-op for stores that persist every write.
+        """
+
+    def close(self):
+        self.save()
+
+class ChromaVectorStore(VectorStore):
+    def __init__(self, collection_name: str = "issues", persist_dir: str | None = None, client=None):
         try:
-            self.client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIR)
-            self.collection = self.client.get_or_create_collection(name="issues")
+            if client is None:
+                # Imported lazily: chromadb is slow to import and unused by
+                # the in-process backends
+                import chromadb
+                client = chromadb.PersistentClient(path=persist_dir or settings.CHROMA_PERSIST_DIR)
+            self.client = client
+            self.collection = self.client.get_or_create_collection(
+                name=collection_name,
+                metadata={"hnsw:space": "cosine"}
+            )
             self.available = True
         except Exception as e:
             logger.warning(f"Failed to initialize ChromaDB: {e}")
             self.available = False
 
-    def add_issue(self, issue_id: str, embedding: list[float], metadata: dict, text: str):
-        if not self.available or not embedding:
+    def add_issue(self, issue_id: str, embedding: np.ndarray, metadata: dict, text: str):
+        if not self.available or embedding is None or len(embedding) == 0:
             return
 
         try:
-            self.collection.add(
+            self.collection.upsert(
                 ids=[str(issue_id)],
-                embeddings=[embedding],
+                embeddings=[np.asarray(embedding, dtype=np.float32).tolist()],
                 metadatas=[metadata],
                 documents=[text]
             )
         except Exception as e:
             logger.error(f"Error adding issue to vector store: {e}")
 
-    def search(self, embedding: list[float], n_results: int = 5):
-        if not self.available or not embedding:
+    def get_issue(self, issue_id: str) -> dict | None:
+        if not self.available:
+            return None
+
+        try:
+            result = self.collection.get(ids=[str(issue_id)], include=["embeddings", "metadatas"])
+        except Exception as e:
+            logger.error(f"Error reading issue from vector store: {e}")
+            return None
+
+        if not result["ids"]:
+            return None
+        return {
+            "embedding": np.asarray(result["embeddings"][0], dtype=np.float32),
+            "metadata": result["metadatas"][0] or {},
+        }
+
+    def get_fingerprints(self, ids: list[str]) -> dict[str, str]:
+        if not self.available or not ids:
+            return {}
+
+        result = self.collection.get(ids=[str(i) for i in ids], include=["metadatas"])
+        return {
+            issue_id: (metadata or {}).get("fingerprint")
+            for issue_id, metadata in zip(result["ids"], result["metadatas"])
+        }
+
+    def all_metadata(self) -> dict[str, dict]:
+        if not self.available:
+            return {}
+
+        result = self.collection.get(include=["metadatas"])
+        return {
+            issue_id: metadata or {}
+            for issue_id, metadata in zip(result["ids"], result["metadatas"])
+        }
+
+    def update_metadata(self, issue_id: str, metadata: dict):
+        if not self.available:
+            return
+
+        try:
+            self.collection.update(ids=[str(issue_id)], metadatas=[metadata])
+        except Exception as e:
+            logger.error(f"Error updating issue metadata in vector store: {e}")
+
+    def delete_issue(self, issue_id: str):
+        if not self.available:
+            return
+
+        try:
+            self.collection.delete(ids=[str(issue_id)])
+        except Exception as e:
+            logger.error(f"Error deleting issue from vector store: {e}")
+
+    def upsert_many(self, ids: list[str], embeddings: np.ndarray, metadatas: list[dict], documents: list[str]):
+        """
+        Insert or update many issues, in chunks of VECTOR_UPSERT_BATCH_SIZE.
+        """
+        if not self.available or len(ids) == 0:
+            return
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        chunk = settings.VECTOR_UPSERT_BATCH_SIZE
+        for start in range(0, len(ids), chunk):
+            end = start + chunk
+            self.collection.upsert(
+                ids=[str(i) for i in ids[start:end]],
+                embeddings=embeddings[start:end].tolist(),
+                metadatas=metadatas[start:end],
+                documents=documents[start:end]
+            )
+
+    def search(self, embedding: np.ndarray, n_results: int = 5):
+        if not self.available or embedding is None or len(embedding) == 0:
             return []
 
         try:
             results = self.collection.query(
-                query_embeddings=[embedding],
+                query_embeddings=[np.asarray(embedding, dtype=np.float32).tolist()],
                 n_results=n_results
             )
             return results
@@ -44,5 +194,101 @@ class VectorStoreService:
             logger.error(f"Error searching vector store: {e}")
             return []
 
+    def count(self) -> int:
+        return self.collection.count() if self.available else 0
+
+def partition_name(repo: str) -> str:
+    """
+    A name for a repository's partition that is valid both as a Chroma
+    collection name and as a directory name. The hash suffix keeps
+    repositories that differ only in punctuation apart.
+    """
+    slug = re.sub(r"[^a-zA-Z0-9]+", "-", repo).strip("-").lower()[:40] or "repo"
+    digest = hashlib.sha256(repo.encode()).hexdigest()[:8]
+    return f"issues-{slug}-{digest}"
+
+class VectorStoreService:
+    """
+    Hands out one VectorStore per repository, created on first use, so
+    search cost scales with a single repository rather than the whole
+    fleet. The backend is chosen by VECTOR_STORE_BACKEND: "chroma", "numpy"
+    (exact search over a memory-mapped matrix) or "hnsw" (approximate, for
+    large repositories).
+    """
+
+    def __init__(self, backend: str | None = None):
+        self.backend = (backend or settings.VECTOR_STORE_BACKEND).lower()
+        if self.backend not in ("chroma", "numpy", "hnsw"):
+            raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {self.backend}")
+        self._partitions: dict[str, VectorStore] = {}
+        self._lock = threading.Lock()
+        self._chroma_client = None
+
+    def _create(self, repo: str) -> VectorStore:
+        name = partition_name(repo)
+        if self.backend == "chroma":
+            if self._chroma_client is None:
+                import chromadb
+                self._chroma_client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIR)
+            return ChromaVectorStore(name, client=self._chroma_client)
+
+        from pathlib import Path
+        from app.services.vector_index import HNSWVectorStore, NumpyVectorStore
+        directory = str(Path(settings.VECTOR_STORE_DIR) / name)
+        if self.backend == "numpy":
+            return NumpyVectorStore(directory)
+        return HNSWVectorStore(directory)
+
+    def for_repo(self, repo: str) -> VectorStore:
+        with self._lock:
+            store = self._partitions.get(repo)
+            if store is None:
+                try:
+                    store = self._create(repo)
+                except Exception as e:
+                    logger.warning(f"Failed to open vector store for {repo}: {e}")
+                    return UnavailableVectorStore()
+                self._partitions[repo] = store
+            return store
+
+    def close(self):
+        with self._lock:
+            partitions = list(self._partitions.values())
+        for store in partitions:
+            try:
+                store.close()
+            except Exception as e:
+                logger.error(f"Failed to close vector store: {e}")
+
+class UnavailableVectorStore(VectorStore):
+    """Stand-in when a partition cannot be opened; behaves as an empty store."""
+
+    def add_issue(self, issue_id, embedding, metadata, text):
+        pass
+
+    def get_issue(self, issue_id):
+        return None
+
+    def get_fingerprints(self, ids):
+        return {}
+
+    def all_metadata(self):
+        return {}
+
+    def update_metadata(self, issue_id, metadata):
+        pass
+
+    def delete_issue(self, issue_id):
+        pass
+
+    def upsert_many(self, ids, embeddings, metadatas, documents):
+        pass
+
+    def search(self, embedding, n_results=5):
+        return []
+
+    def count(self):
+        return 0
+
 # Singleton instance
 vector_store = VectorStoreService()
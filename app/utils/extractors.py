@@ -1,5 +1,27 @@
+import hashlib
 import re
 
+# Exception lines such as "ValueError: bad input" or "java.lang.NullPointerException"
+EXCEPTION_LINE = re.compile(r"^\s*(?:Caused by: )?([\w.$]*(?:Error|Exception|Panic|Fault)\b)(?::\s*(.*))?$", re.MULTILINE)
+# Python frames: File "app/db.py", line 12, in connect
+PYTHON_FRAME = re.compile(r'File "([^"]+)", line \d+, in (\S+)')
+# JVM/JS frames: at com.example.Foo.bar(Foo.java:42) / at handler (server.js:10:5)
+AT_FRAME = re.compile(r"^\s*at ([\w.$<>/]+)", re.MULTILINE)
+# Parts of error messages that vary between otherwise identical crashes
+VOLATILE = re.compile(r"0x[0-9a-fA-F]+|\b[0-9a-f]{8,}\b|\d+")
+# Frames a signature needs: without them, generic messages such as a bare
+# "Error" or "ECONNREFUSED <address>" would match unrelated issues
+MIN_SIGNATURE_FRAMES = 2
+
+HTML_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+CODE_BLOCK = re.compile(r"(```[^\n]*\n)(.*?)(```)", re.DOTALL)
+# Issue-form leftovers: unanswered fields and unticked checklist items
+BOILERPLATE_LINE = re.compile(r"^\s*(?:_No response_|- \[ \] .*)\s*$", re.MULTILINE)
+EMPTY_SECTION = re.compile(r"^#{1,6} [^\n]*\n\s*(?=^#{1,6} |\Z)", re.MULTILINE)
+
+# Rough size of a token for budgeting, in characters
+CHARS_PER_TOKEN = 4
+
 class ContextExtractor:
     @staticmethod
     def extract_error_logs(text: str) -> list[str]:
@@ -36,3 +58,97 @@ class ContextExtractor:
             return []
             
         return re.findall(r'@([a-zA-Z0-9-]+)', text)
+
+    @staticmethod
+    def extract_error_signatures(text: str) -> list[str]:
+        """
+        Extract the lines that identify a crash: exception type and message,
+        and stack frames reduced to file/function. Searches the error log
+        blocks, or the whole text if there are none.
+        """
+        if not text:
+            return []
+
+        blocks = ContextExtractor.extract_error_logs(text) or [text]
+        signatures = []
+        for block in blocks:
+            for match in EXCEPTION_LINE.finditer(block):
+                name, message = match.group(1), (match.group(2) or "").strip()
+                signatures.append(f"{name}: {message}" if message else name)
+            for path, function in PYTHON_FRAME.findall(block):
+                signatures.append(f"{path.rsplit('/', 1)[-1]}:{function}")
+            signatures.extend(AT_FRAME.findall(block))
+
+        # Keep first occurrence order
+        return list(dict.fromkeys(signatures))
+
+    @staticmethod
+    def error_signature(text: str) -> str | None:
+        """
+        A stable hash of the first exception and the frames around it, with
+        numbers and addresses masked, so the same crash reported twice gets
+        the same signature. None if the text has no recognisable exception
+        or fewer than MIN_SIGNATURE_FRAMES stack frames.
+        """
+        signatures = ContextExtractor.extract_error_signatures(text)
+        exceptions = [s for s in signatures if EXCEPTION_LINE.match(s)]
+        frames = [s for s in signatures if s not in exceptions][:5]
+        if not exceptions or len(frames) < MIN_SIGNATURE_FRAMES:
+            return None
+
+        normalized = [VOLATILE.sub("#", s) for s in [exceptions[0], *frames]]
+        return hashlib.sha1("\n".join(normalized).encode()).hexdigest()
+
+    @staticmethod
+    def sample_code_block(block: str, max_lines: int = 40, max_line_chars: int = 300) -> str:
+        """
+        Shorten a code block to its first and last lines around an
+        omission marker, and clip very long lines.
+        """
+        lines = [
+            line if len(line) <= max_line_chars else line[:max_line_chars] + " ..."
+            for line in block.splitlines()
+        ]
+        if len(lines) > max_lines:
+            head = max_lines // 2
+            tail = max_lines - head
+            omitted = len(lines) - max_lines
+            lines = lines[:head] + [f"... [{omitted} lines omitted] ..."] + lines[-tail:]
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def prepare_for_prompt(text: str, max_tokens: int, max_code_lines: int = 40) -> str:
+        """
+        Shrink an issue body for an LLM prompt: drop HTML comments and
+        unanswered template fields, head/tail-sample long code blocks, and
+        cut the result to about max_tokens, keeping its start and end. The
+        first exception line is always kept, appended if trimming removed it.
+        """
+        if not text:
+            return ""
+
+        first_error = EXCEPTION_LINE.search(text)
+        first_error = first_error.group(0).strip()[:300] if first_error else None
+
+        text = HTML_COMMENT.sub("", text)
+        text = BOILERPLATE_LINE.sub("", text)
+        text = EMPTY_SECTION.sub("", text)
+        text = CODE_BLOCK.sub(
+            lambda m: m.group(1) + ContextExtractor.sample_code_block(m.group(2), max_code_lines) + m.group(3),
+            text
+        )
+        text = re.sub(r"\n{3,}", "\n\n", text).strip()
+
+        # Room is reserved for the error line in case trimming drops it
+        error_note = f"\n\nFirst error: {first_error}" if first_error else ""
+        budget = max(max_tokens * CHARS_PER_TOKEN - len(error_note), 0)
+        if len(text) > budget:
+            marker = "\n... [truncated] ...\n"
+            keep = max(budget - len(marker), 0)
+            head = keep * 2 // 3
+            tail = keep - head
+            text = text[:head] + marker + (text[-tail:] if tail else "")
+        if first_error and first_error in text:
+            error_note = ""
+
+        return text + error_note
@@ -0,0 +1,40 @@
+"""
+Advisory file locks for state shared by several processes, such as
+gunicorn workers and the backfill CLI. On platforms without fcntl the
+locks are no-ops, which is only safe with a single process.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on `path` (created if missing) for the block."""
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def try_exclusive_lock(path: Path) -> IO | None:
+    """
+    Take an exclusive lock on `path` without waiting, for as long as the
+    returned file stays open. None if another process holds it.
+    """
+    f = open(path, "a")
+    if fcntl is None:
+        return f
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return None
+    return f
@@ -0,0 +1,121 @@
+import json
+import re
+
+class JSONStreamParser:
+    """
+    Finds the first complete top-level JSON object or array in text that
+    arrives in chunks, ignoring any prose or code fences around it. `feed`
+    returns True as soon as the value is closed, so a streaming caller can
+    stop reading there.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.start: int | None = None
+        self.end: int | None = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._scanned = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    def feed(self, chunk: str) -> bool:
+        if self.complete:
+            return True
+        self.buffer += chunk
+
+        for i in range(self._scanned, len(self.buffer)):
+            char = self.buffer[i]
+            if self.start is None:
+                if char in "{[":
+                    self.start = i
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = i + 1
+                    self._scanned = i + 1
+                    return True
+        self._scanned = len(self.buffer)
+        return False
+
+    def text(self) -> str | None:
+        """
+        The JSON text found so far: the complete value, or the unfinished
+        tail from its opening bracket if the stream ended early.
+        """
+        if self.start is None:
+            return None
+        return self.buffer[self.start:self.end]
+
+    def close_unfinished(self) -> str | None:
+        """
+        The partial value with its open string and brackets closed, for
+        output that was cut off (e.g. by a token limit).
+        """
+        text = self.text()
+        if text is None or self.complete:
+            return text
+
+        closers = []
+        in_string = escaped = False
+        for char in text:
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in "{[":
+                closers.append("}" if char == "{" else "]")
+            elif char in "}]" and closers:
+                closers.pop()
+        suffix = '"' if in_string else ""
+        return re.sub(r",\s*$", "", text + suffix) + "".join(reversed(closers))
+
+def extract_json(text: str) -> str | None:
+    parser = JSONStreamParser()
+    parser.feed(text)
+    return parser.text() if parser.complete else parser.close_unfinished()
+
+def repair_json(text: str) -> str:
+    """
+    Fix the formatting slips models make most often: trailing commas and
+    Python literals.
+    """
+    text = re.sub(r",\s*([}\]])", r"\1", text)
+    text = re.sub(r"\bTrue\b", "true", text)
+    text = re.sub(r"\bFalse\b", "false", text)
+    return re.sub(r"\bNone\b", "null", text)
+
+def loads_lenient(text: str):
+    """
+    Parse the first JSON value in text, repairing it if needed. Raises
+    ValueError if no JSON value can be recovered.
+    """
+    candidate = extract_json(text)
+    if candidate is None:
+        raise ValueError("No JSON value found in output")
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        return json.loads(repair_json(candidate))
@@ -0,0 +1,40 @@
+"""
+Multi-worker deployment with the embedding model loaded once:
+
+    gunicorn -c gunicorn.conf.py
+
+The master process imports the app and loads the model weights, then
+forks the workers, which share those pages copy-on-write instead of each
+loading its own copy. Every worker still runs the app lifespan (queue
+workers, HTTP pool, warmup) itself.
+
+Settings whose state only one process may write (see
+app.core.container.single_process_reasons) force a single worker.
+"""
+import os
+import sys
+
+def worker_count() -> int:
+    from app.core.container import single_process_reasons
+
+    requested = int(os.environ.get("WEB_CONCURRENCY", 2))
+    reasons = single_process_reasons()
+    if requested > 1 and reasons:
+        print(f"Starting 1 worker instead of {requested}: " + "; ".join(reasons), file=sys.stderr)
+        return 1
+    return requested
+
+wsgi_app = "app.main:app"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = worker_count()
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+preload_app = True
+
+def on_starting(server):
+    from app.main import container
+    container.preload()
+
+def post_fork(server, worker):
+    # Connections pooled by the master must not be shared with workers
+    from app.db.session import engine
+    engine.dispose(close=False)
@@ -0,0 +1,62 @@
+"""
+Measure routing cost with many keyword rules on large issue bodies, and
+compare the compiled trie regex with a plain alternation of the keywords.
+
+Usage:
+    python scripts/benchmark_routing.py
+    python scripts/benchmark_routing.py --keywords 5000 --body-bytes 1000000
+"""
+import argparse
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keywords", type=int, default=5000)
+    parser.add_argument("--keywords-per-rule", type=int, default=5)
+    parser.add_argument("--body-bytes", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.services import routing_rules
+    from app.services.routing_rules import DEFAULT_CONFIG, CompiledRules
+
+    rng = random.Random(0)
+    words: set[str] = set()
+    while len(words) < args.keywords:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))))
+    keywords = sorted(words)
+    step = args.keywords_per_rule
+    rules = [{"team": f"team-{i // step % 50}", "keywords": keywords[i:i + step]} for i in range(0, len(keywords), step)]
+
+    start = time.perf_counter()
+    compiled = CompiledRules.compile({**DEFAULT_CONFIG, "rules": rules})
+    print(f"{len(rules)} rules, {len(keywords)} keywords compiled in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    vocabulary = keywords[:200] + ["the", "error", "when", "running", "export", "crash"] * 200
+    body = " ".join(rng.choices(vocabulary, k=args.body_bytes // 4))[:args.body_bytes]
+
+    for cap in (routing_rules.settings.ROUTING_MAX_BODY_CHARS, len(body)):
+        routing_rules.settings.ROUTING_MAX_BODY_CHARS = cap
+        ms = timed(lambda: compiled.route("Crash in export", body, [], "bug"), args.repeat)
+        print(f"route, {cap:,} body chars scanned: {ms:.2f} ms")
+
+    naive = re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, keywords)) + r")(?!\w)", re.IGNORECASE)
+    sample = body[:20000]
+    print(f"plain alternation, 20,000 chars: {timed(lambda: naive.findall(sample), args.repeat):.2f} ms")
+    print(f"trie regex, 20,000 chars: {timed(lambda: compiled.pattern.findall(sample), args.repeat):.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Compare vector store backends on build time, query latency and memory.
+
+Each (backend, size) pair runs in its own subprocess so peak RSS is not
+polluted by earlier runs. Vectors are random unit vectors with the
+dimension of all-MiniLM-L6-v2.
+
+Usage:
+    python scripts/benchmark_vectorstore.py
+    python scripts/benchmark_vectorstore.py --sizes 10000 100000 --backends numpy hnsw
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DIM = 384
+
+def make_store(backend: str, directory: str):
+    from app.services.vectorstore import ChromaVectorStore
+    from app.services.vector_index import HNSWVectorStore, NumpyVectorStore
+    if backend == "chroma":
+        return ChromaVectorStore(persist_dir=directory)
+    if backend == "numpy":
+        return NumpyVectorStore(directory, snapshot_interval=float("inf"))
+    return HNSWVectorStore(directory, snapshot_interval=float("inf"))
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_one(backend: str, size: int, queries: int, batch: int) -> dict:
+    rng = np.random.default_rng(0)
+    baseline_mb = peak_rss_mb()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(backend, directory)
+        start = time.perf_counter()
+        for offset in range(0, size, batch):
+            n = min(batch, size - offset)
+            vectors = rng.normal(size=(n, DIM)).astype(np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            ids = [str(offset + i) for i in range(n)]
+            store.upsert_many(ids, vectors, [{"number": offset + i} for i in range(n)], [""] * n)
+        store.save()
+        build_seconds = time.perf_counter() - start
+
+        query_vectors = rng.normal(size=(queries, DIM)).astype(np.float32)
+        latencies = []
+        for vector in query_vectors:
+            start = time.perf_counter()
+            store.search(vector, n_results=5)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        disk_mb = sum(f.stat().st_size for f in Path(directory).rglob("*") if f.is_file()) / 2**20
+
+    return {
+        "backend": backend,
+        "size": size,
+        "build_seconds": round(build_seconds, 2),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "peak_rss_mb": round(peak_rss_mb() - baseline_mb, 1),
+        "disk_mb": round(disk_mb, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector store backends")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--backends", nargs="+", default=["chroma", "numpy", "hnsw"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--single", nargs=2, metavar=("BACKEND", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        result = run_one(args.single[0], int(args.single[1]), args.queries, args.batch)
+        print(json.dumps(result))
+        return
+
+    header = f"{'backend':<8} {'size':>9} {'build s':>9} {'p50 ms':>8} {'p95 ms':>8} {'rss MB':>8} {'disk MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for size in args.sizes:
+        for backend in args.backends:
+            completed = subprocess.run(
+                [sys.executable, __file__, "--single", backend, str(size),
+                 "--queries", str(args.queries), "--batch", str(args.batch)],
+                capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                print(f"{backend:<8} {size:>9} failed: {completed.stderr.strip().splitlines()[-1:]}")
+                continue
+            r = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(
+                f"{r['backend']:<8} {r['size']:>9} {r['build_seconds']:>9} {r['query_p50_ms']:>8} "
+                f"{r['query_p95_ms']:>8} {r['peak_rss_mb']:>8} {r['disk_mb']:>8}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Load-test the GitHub webhook endpoint and report requests/sec.
+
+By default the app is called in-process through httpx's ASGI transport,
+with the queue's enqueue replaced by a no-op, so the numbers measure the
+ingest path (body read, signature check, parsing, validation) rather than
+the database. With --url, signed requests are sent to a running server
+and jobs really are queued.
+
+Payloads imitate real "issues" deliveries, including the repository and
+sender objects GitHub always sends (about 9 KB each).
+
+Usage:
+    python scripts/benchmark_webhook.py
+    python scripts/benchmark_webhook.py --requests 5000 --concurrency 50 --actions opened labeled
+    python scripts/benchmark_webhook.py --url http://localhost:8000 --secret "$GITHUB_WEBHOOK_SECRET"
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def user(login: str, user_id: int) -> dict:
+    base = f"https://api.github.com/users/{login}"
+    return {
+        "login": login, "id": user_id, "node_id": f"MDQ6VXNlcj{user_id}", "type": "User", "site_admin": False,
+        "avatar_url": f"https://avatars.githubusercontent.com/u/{user_id}?v=4", "gravatar_id": "",
+        "url": base, "html_url": f"https://github.com/{login}",
+        **{f"{name}_url": f"{base}/{name}" for name in (
+            "followers", "following", "gists", "starred", "subscriptions", "organizations", "repos", "events", "received_events"
+        )},
+    }
+
+def issue_event(action: str, number: int) -> dict:
+    repo_url = "https://api.github.com/repos/octo/widgets"
+    owner = user("octo", 1)
+    return {
+        "action": action,
+        "issue": {
+            "url": f"{repo_url}/issues/{number}", "repository_url": repo_url,
+            "labels_url": f"{repo_url}/issues/{number}/labels{{/name}}",
+            "comments_url": f"{repo_url}/issues/{number}/comments",
+            "events_url": f"{repo_url}/issues/{number}/events",
+            "html_url": f"https://github.com/octo/widgets/issues/{number}",
+            "id": 1_000_000 + number, "node_id": f"I_kwDO{number}", "number": number,
+            "title": f"Crash when exporting report {number}",
+            "user": user("reporter", 2), "labels": [{"id": 7, "name": "needs-triage", "color": "ededed", "default": False}],
+            "state": "open", "locked": False, "assignee": None, "assignees": [], "milestone": None,
+            "comments": 0, "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z",
+            "closed_at": None, "author_association": "NONE", "active_lock_reason": None,
+            "reactions": {"url": f"{repo_url}/issues/{number}/reactions", "total_count": 0},
+            "body": "Steps to reproduce:\n1. Open a report\n2. Click export\n\n```\nTraceback (most recent call last):\n"
+                    + "  File \"export.py\", line 10, in run\n" * 20 + "ValueError: bad row\n```\n",
+        },
+        "repository": {
+            "id": 42, "node_id": "R_42", "name": "widgets", "full_name": "octo/widgets", "private": False,
+            "owner": owner, "html_url": "https://github.com/octo/widgets", "description": "Widgets", "fork": False,
+            "url": repo_url,
+            **{f"{name}_url": f"{repo_url}/{name}" for name in (
+                "forks", "keys", "collaborators", "teams", "hooks", "issue_events", "events", "assignees", "branches",
+                "tags", "blobs", "git_tags", "git_refs", "trees", "statuses", "languages", "stargazers", "contributors",
+                "subscribers", "subscription", "commits", "git_commits", "comments", "issue_comment", "contents",
+                "compare", "merges", "archive", "downloads", "issues", "pulls", "milestones", "notifications",
+                "labels", "releases", "deployments"
+            )},
+            "created_at": "2020-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z", "pushed_at": "2024-01-01T00:00:00Z",
+            "stargazers_count": 100, "watchers_count": 100, "language": "Python", "forks_count": 10,
+            "open_issues_count": 25, "default_branch": "main", "topics": ["widgets", "reports"],
+        },
+        "sender": user("reporter", 2),
+    }
+
+async def run(client: httpx.AsyncClient, url: str, bodies: list[tuple[bytes, dict]], concurrency: int) -> list[float]:
+    latencies: list[float] = []
+    queue = iter(bodies)
+
+    async def worker():
+        for body, headers in queue:
+            start = time.perf_counter()
+            response = await client.post(url, content=body, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"Unexpected {response.status_code}: {response.text[:200]}")
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+def make_bodies(actions: list[str], count: int, secret: str) -> list[tuple[bytes, dict]]:
+    bodies = []
+    for i in range(count):
+        body = json.dumps(issue_event(actions[i % len(actions)], i + 1)).encode()
+        signature = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        bodies.append((body, {
+            "Content-Type": "application/json",
+            "X-GitHub-Event": "issues",
+            "X-Hub-Signature-256": signature,
+        }))
+    return bodies
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--actions", nargs="+", default=["opened", "labeled", "edited", "assigned"])
+    parser.add_argument("--url", help="Base URL of a running server; in-process if omitted")
+    parser.add_argument("--secret", default="benchmark-secret")
+    args = parser.parse_args()
+
+    # Client-side request logs would dominate the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    bodies = make_bodies(args.actions, args.requests, args.secret)
+    print(f"{args.requests} requests, {len(bodies[0][0])} bytes each, actions {args.actions}, concurrency {args.concurrency}")
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=30)
+    else:
+        from unittest.mock import patch
+        from app.config.settings import get_settings
+        from app.main import app
+        from app.services.queue import triage_queue
+
+        async def enqueue(payload):
+            return 0
+
+        get_settings().GITHUB_WEBHOOK_SECRET = args.secret
+        patch.object(triage_queue, "enqueue", enqueue).start()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    async with client:
+        # Warm up imports and caches
+        await run(client, "/api/v1/webhooks/github", bodies[:50], 1)
+        start = time.perf_counter()
+        latencies = await run(client, "/api/v1/webhooks/github", bodies, args.concurrency)
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"requests/sec: {len(latencies) / elapsed:,.0f}")
+    print(f"latency p50: {latencies[len(latencies) // 2] * 1000:.2f} ms, p99: {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    asyncio.run(main())
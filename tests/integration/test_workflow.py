@@ -37,5 +37,5 @@ async def test_full_workflow():
         # but running this ensures no exceptions are raised and covers the code paths.
         await orchestrator.process_issue(payload)
         
-        # Verify LLM was called
-        mock_llm.assert_called_once()
+        # Verify LLM was called for classification and for the reply
+        assert mock_llm.call_count == 2
@@ -0,0 +1,29 @@
+from unittest.mock import patch
+from app.core.cache import TTLCache
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(ttl=10, max_entries=100)
+    with patch("app.core.cache.time.monotonic", return_value=1000.0):
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+    with patch("app.core.cache.time.monotonic", return_value=1011.0):
+        assert cache.get("a") is None
+        assert "a" not in cache
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+
+def test_add_only_succeeds_for_new_or_expired_keys():
+    cache = TTLCache(ttl=10, max_entries=100)
+    with patch("app.core.cache.time.monotonic", return_value=1000.0):
+        assert cache.add("delivery-1") is True
+        assert cache.add("delivery-1") is False
+    with patch("app.core.cache.time.monotonic", return_value=1011.0):
+        assert cache.add("delivery-1") is True
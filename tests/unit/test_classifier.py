@@ -1,8 +1,26 @@
 import pytest
-from app.agents.classifier import ClassifierAgent
+from app.agents.classifier import ClassifierAgent, classification_cache
 from app.models.domain import GitHubIssue, GitHubUser
 from unittest.mock import AsyncMock, patch
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    classification_cache.clear()
+    yield
+    classification_cache.clear()
+
+def make_issue(title="Login failed", body="I cannot login", labels=None):
+    return GitHubIssue(
+        url="", repository_url="", labels_url="", comments_url="", events_url="", html_url="",
+        id=1, node_id="1", number=1, title=title,
+        user=GitHubUser(login="user", id=1, type="User"),
+        labels=labels or [],
+        state="open", locked=False, comments=0,
+        created_at="2023-01-01T00:00:00Z", updated_at="2023-01-01T00:00:00Z",
+        author_association="OWNER",
+        body=body
+    )
+
 @pytest.mark.asyncio
 async def test_classifier_success():
     issue = GitHubIssue(
@@ -44,3 +62,96 @@ async def test_classifier_fallback():
         
         assert result["category"] == "question"
         assert result["confidence"] == 0.0
+
+@pytest.mark.asyncio
+async def test_classifier_caches_llm_results_by_content():
+    with patch("app.services.llm.LLMService.generate_content", new_callable=AsyncMock) as mock_llm:
+        mock_llm.return_value = '{"category": "bug", "confidence": 0.9}'
+
+        first = await ClassifierAgent().process(make_issue())
+        # A redelivery differing only in whitespace
+        second = await ClassifierAgent().process(make_issue(body="I cannot  login\n"))
+
+        assert mock_llm.call_count == 1
+        assert first["source"] == "llm"
+        assert second["source"] == "cache"
+        assert second["category"] == "bug"
+
+@pytest.mark.asyncio
+async def test_classifier_does_not_cache_failures():
+    with patch("app.services.llm.LLMService.generate_content", new_callable=AsyncMock) as mock_llm:
+        mock_llm.side_effect = [Exception("API Error"), '{"category": "bug", "confidence": 0.9}']
+
+        await ClassifierAgent().process(make_issue())
+        result = await ClassifierAgent().process(make_issue())
+
+        assert result["category"] == "bug"
+        assert mock_llm.call_count == 2
+
+@pytest.mark.asyncio
+async def test_open_circuit_falls_back_to_weak_rule_result():
+    from app.core.exceptions import CircuitOpenError
+    with patch("app.services.llm.LLMService.generate_structured", new_callable=AsyncMock) as mock_llm:
+        mock_llm.side_effect = CircuitOpenError("Circuit for llm is open", retry_after=30)
+
+        result = await ClassifierAgent().process(make_issue(title="Export is broken", body=""))
+
+    assert result["category"] == "bug"
+    assert result["confidence"] < 0.7
+    assert result["source"] == "fallback"
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("issue, category", [
+    (make_issue(title="Login failed", body="**Describe the bug**\n\n## Steps to reproduce\n1. Click login"), "bug"),
+    (make_issue(title="Dark mode", body="**Is your feature request related to a problem?**"), "feature"),
+    (make_issue(title="[Docs] Broken link in guide", body="The link 404s"), "docs"),
+    (make_issue(title="Something odd", body="", labels=[{"name": "type: security"}]), "security"),
+    # A security keyword in a bug-template report is never outranked
+    (make_issue(title="Search fails", body="## Steps to reproduce\nSQL injection through the search box"), "security"),
+])
+async def test_rules_answer_confident_issues_without_llm(issue, category):
+    with patch("app.services.llm.LLMService.generate_content", new_callable=AsyncMock) as mock_llm:
+        result = await ClassifierAgent().process(issue)
+
+        assert result["category"] == category
+        assert result["source"] == "rules"
+        mock_llm.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_weak_rule_signals_fall_through_to_llm():
+    with patch("app.services.llm.LLMService.generate_content", new_callable=AsyncMock) as mock_llm:
+        mock_llm.return_value = '{"category": "question", "confidence": 0.8}'
+
+        result = await ClassifierAgent().process(make_issue(title="Export is broken?", body="Or am I using it wrong"))
+
+        assert result["source"] == "llm"
+        mock_llm.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_classify_many_batches_and_retries_missing_items():
+    issues = [make_issue(title=f"Odd behaviour {n}", body=f"Details {n}") for n in range(3)]
+    issues.append(make_issue(title="[Bug] Crash", body=""))
+
+    with patch("app.services.llm.LLMService.generate_content", new_callable=AsyncMock) as mock_llm:
+        mock_llm.side_effect = [
+            # Batch answer missing issue 2
+            '[{"id": 1, "category": "bug", "confidence": 0.8}, {"id": 3, "category": "docs", "confidence": 0.7}]',
+            '{"category": "question", "confidence": 0.6}',
+        ]
+        results = await ClassifierAgent().classify_many(issues)
+
+    assert [r["category"] for r in results] == ["bug", "question", "docs", "bug"]
+    assert [r["source"] for r in results] == ["batch", "llm", "batch", "rules"]
+    assert mock_llm.call_count == 2
+    assert "### Issue 3" in mock_llm.call_args_list[0][0][0]
+    assert "[Bug] Crash" not in mock_llm.call_args_list[0][0][0]
+
+@pytest.mark.asyncio
+async def test_classify_many_respects_item_limit(monkeypatch):
+    from app.agents import classifier
+    monkeypatch.setattr(classifier.settings, "CLASSIFICATION_BATCH_MAX_ITEMS", 2)
+    issues = [make_issue(title=f"Odd behaviour {n}", body=f"Details {n}") for n in range(5)]
+
+    batches = ClassifierAgent()._pack(issues)
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
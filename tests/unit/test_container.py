@@ -0,0 +1,58 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy import inspect
+from app.agents.orchestrator import AgentOrchestrator
+from app.core.container import ServiceContainer
+from app.db.session import make_engine
+
+@pytest.fixture
+def container(tmp_path):
+    return ServiceContainer(
+        engine=make_engine(f"sqlite:///{tmp_path / 'app.db'}"),
+        llm=MagicMock(),
+        embedding=MagicMock(),
+        vector_store=MagicMock(),
+        github=AsyncMock(),
+        queue=AsyncMock(start=MagicMock()),
+        orchestrator=AgentOrchestrator(),
+        team_centroids=MagicMock(),
+    )
+
+@pytest.mark.asyncio
+async def test_startup_builds_agents_once_and_starts_workers(container):
+    with patch("app.core.container.settings.EMBEDDING_PRELOAD", True):
+        await container.startup()
+
+    assert "triage_jobs" in inspect(container.engine).get_table_names()
+    container.embedding.start_background_load.assert_called_once()
+    container.github.start.assert_awaited_once()
+    handler = container.queue.start.call_args[0][0]
+    assert handler == container.orchestrator.handle_event
+    assert container.orchestrator.github is container.github
+
+    # Every issue uses the same agent instances
+    agents = container.orchestrator.agents
+    assert container.orchestrator.agents is agents
+
+    await container.shutdown()
+    container.queue.stop.assert_awaited_once()
+    container.github.close.assert_awaited_once()
+    container.llm.shutdown.assert_called_once()
+    container.team_centroids.close.assert_called_once()
+    container.vector_store.close.assert_called_once()
+
+def test_preload_loads_embedding_weights(container):
+    with patch("app.core.container.settings.EMBEDDING_PRELOAD", True):
+        container.preload()
+
+    container.embedding.preload.assert_called_once()
+
+def test_in_process_state_requires_a_single_worker(monkeypatch):
+    from app.core import container as module
+    monkeypatch.setattr(module.settings, "VECTOR_STORE_BACKEND", "chroma")
+    monkeypatch.setattr(module.settings, "SEMANTIC_ROUTING", False)
+    assert module.single_process_reasons() == []
+
+    monkeypatch.setattr(module.settings, "VECTOR_STORE_BACKEND", "hnsw")
+    monkeypatch.setattr(module.settings, "SEMANTIC_ROUTING", True)
+    assert len(module.single_process_reasons()) == 2
@@ -0,0 +1,78 @@
+import sys
+import types
+import numpy as np
+import pytest
+from app.services.embedding import EmbeddingService
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        self.batches = getattr(self, "batches", []) + [texts]
+        if isinstance(texts, str):
+            return np.ones(3, dtype=np.float32)
+        return np.array([[float(len(t)), 1.0, 1.0] for t in texts])
+
+@pytest.fixture
+def fake_sentence_transformers(monkeypatch):
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = FakeModel
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    return module
+
+@pytest.mark.asyncio
+async def test_encode_before_ready_degrades_and_starts_loading(fake_sentence_transformers):
+    service = EmbeddingService()
+    assert service.state == "not_loaded"
+
+    assert await service.encode("hello") is None
+    service._loader.join(timeout=5)
+
+    assert service.status()["ready"] is True
+    vector = await service.encode("hello")
+    assert vector.dtype == np.float32
+    assert vector.tolist() == [5.0, 1.0, 1.0]
+
+@pytest.mark.asyncio
+async def test_wait_until_ready_loads_and_warms_up(fake_sentence_transformers):
+    service = EmbeddingService()
+
+    assert await service.wait_until_ready(timeout=5) is True
+    # Warmup encode ran during loading
+    assert service.model.calls == 1
+
+def test_preload_defers_warmup_to_the_worker(fake_sentence_transformers):
+    service = EmbeddingService()
+
+    service.preload()
+    assert service.available and service.model.calls == 0
+
+    # In the forked worker, the lifespan's background load only warms up
+    service.start_background_load()
+    service._loader.join(timeout=5)
+    assert service.model.calls == 1
+
+@pytest.mark.asyncio
+async def test_load_failure_is_reported(monkeypatch):
+    monkeypatch.setitem(sys.modules, "sentence_transformers", None)
+    service = EmbeddingService()
+
+    assert await service.wait_until_ready(timeout=5) is False
+    assert service.status()["state"] == "failed"
+    assert await service.encode("hello") is None
+
+@pytest.mark.asyncio
+async def test_concurrent_encodes_share_one_batched_model_call(fake_sentence_transformers):
+    import asyncio
+    service = EmbeddingService()
+    await service.wait_until_ready(timeout=5)
+    service.model.batches = []
+
+    texts = [f"text {'x' * i}" for i in range(10)]
+    vectors = await asyncio.gather(*(service.encode(t) for t in texts))
+
+    assert service.model.batches == [texts]
+    assert [v[0] for v in vectors] == [float(len(t)) for t in texts]
@@ -0,0 +1,69 @@
+import numpy as np
+from app.services.embedding_cache import EmbeddingCache, cache_key
+
+def vec(value, dim=4):
+    return np.full(dim, value, dtype=np.float32)
+
+def test_cache_normalizes_text_and_counts_hits():
+    cache = EmbeddingCache("model", max_bytes=1024)
+
+    assert cache.get("Login  failed\n") is None
+    cache.put("Login failed", vec(1.0))
+
+    assert cache.get("  Login failed ") is not None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_cache_keys_include_model_name(tmp_path):
+    a = EmbeddingCache("model-a", max_bytes=1024, directory=str(tmp_path))
+    b = EmbeddingCache("model-b", max_bytes=1024, directory=str(tmp_path))
+
+    a.put("text", vec(1.0))
+    assert b.get("text") is None
+
+def test_cache_evicts_least_recently_used_by_bytes():
+    # Room for two 16-byte vectors
+    cache = EmbeddingCache("model", max_bytes=32)
+    cache.put("a", vec(1.0))
+    cache.put("b", vec(2.0))
+    cache.get("a")
+    cache.put("c", vec(3.0))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["memory_bytes"] <= 32
+
+def test_disk_tier_survives_restart(tmp_path):
+    cache = EmbeddingCache("model", max_bytes=1024, directory=str(tmp_path))
+    cache.put("a", vec(1.0))
+    cache.put("b", vec(2.0))
+
+    reopened = EmbeddingCache("model", max_bytes=1024, directory=str(tmp_path))
+    assert reopened.get("b").tolist() == [2.0] * 4
+    assert reopened.stats()["disk_entries"] == 2
+
+def test_disk_tier_skips_orphan_rows(tmp_path):
+    cache = EmbeddingCache("model", max_bytes=1024, directory=str(tmp_path))
+    cache.put("a", vec(1.0))
+    # A crash between writing a vector and its key
+    with open(cache.disk.vectors_path, "ab") as f:
+        f.write(vec(9.0).tobytes())
+    reopened = EmbeddingCache("model", max_bytes=1024, directory=str(tmp_path))
+    reopened.put("b", vec(2.0))
+
+    assert reopened.disk.get(cache_key("model", "b")).tolist() == [2.0] * 4
+    again = EmbeddingCache("model", max_bytes=1024, directory=str(tmp_path))
+    assert again.get("b").tolist() == [2.0] * 4
+    assert again.get("a").tolist() == [1.0] * 4
+
+def test_disk_tier_shared_by_processes(tmp_path):
+    # Two workers appending to the same directory
+    first = EmbeddingCache("model", max_bytes=1024, directory=str(tmp_path))
+    second = EmbeddingCache("model", max_bytes=1024, directory=str(tmp_path))
+    first.put("a", vec(1.0))
+    second.put("b", vec(2.0))
+    first.put("c", vec(3.0))
+
+    reopened = EmbeddingCache("model", max_bytes=1024, directory=str(tmp_path))
+    assert [reopened.get(text).tolist()[0] for text in ("a", "b", "c")] == [1.0, 2.0, 3.0]
@@ -0,0 +1,46 @@
+from app.utils.extractors import ContextExtractor
+
+TEMPLATE = """<!-- Thanks for filing! Please fill in every section. -->
+### Describe the bug
+Login hangs after submit
+
+### Logs
+```
+{log}
+ValueError: bad token
+```
+
+### Additional context
+
+_No response_
+
+- [ ] I have searched existing issues
+"""
+
+def test_prepare_for_prompt_strips_template_noise_and_samples_logs():
+    log = "\n".join(f"INFO request {i}" for i in range(5000))
+    body = TEMPLATE.format(log=log)
+
+    trimmed = ContextExtractor.prepare_for_prompt(body, max_tokens=1000)
+
+    assert "Thanks for filing" not in trimmed
+    assert "_No response_" not in trimmed
+    assert "I have searched" not in trimmed
+    assert "### Additional context" not in trimmed
+    assert "INFO request 0" in trimmed and "INFO request 4999" in trimmed
+    assert "lines omitted" in trimmed
+    assert "ValueError: bad token" in trimmed
+    assert len(trimmed) < len(body) / 20
+
+def test_prepare_for_prompt_enforces_budget_and_keeps_first_error():
+    body = "ValueError: bad token\n" + "x" * 100_000
+
+    trimmed = ContextExtractor.prepare_for_prompt(body, max_tokens=100)
+
+    assert len(trimmed) <= 100 * 4
+    assert "ValueError: bad token" in trimmed
+
+    body = "y" * 100_000 + "\nKeyError: 'user'\n" + "z" * 100_000
+    trimmed = ContextExtractor.prepare_for_prompt(body, max_tokens=100)
+    assert len(trimmed) <= 100 * 4
+    assert trimmed.endswith("First error: KeyError: 'user'")
@@ -0,0 +1,61 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.agents.classifier import classification_cache
+from app.agents.orchestrator import orchestrator, settings
+from app.models.domain import GitHubIssue, GitHubUser, WebhookPayload
+
+def make_payload():
+    return WebhookPayload(
+        action="opened",
+        issue=GitHubIssue(
+            url="", repository_url="", labels_url="", comments_url="", events_url="", html_url="",
+            id=7, node_id="7", number=7, title="Login page hangs",
+            user=GitHubUser(login="user", id=1, type="User"),
+            state="open", locked=False, comments=0,
+            created_at="2023-01-01T00:00:00Z", updated_at="2023-01-01T00:00:00Z",
+            author_association="OWNER",
+            body="After submitting the login form nothing happens."
+        )
+    )
+
+@pytest.fixture
+def fused(monkeypatch):
+    classification_cache.clear()
+    monkeypatch.setattr(settings, "LLM_FUSED_TRIAGE", True)
+    with patch("app.agents.similarity.SimilarityAgent.process", new_callable=AsyncMock) as similarity, \
+         patch("app.services.github.GitHubService.flush", new_callable=AsyncMock):
+        similarity.return_value = {"duplicates": [], "is_duplicate": False}
+        yield
+    classification_cache.clear()
+
+@pytest.mark.asyncio
+async def test_fused_mode_classifies_and_replies_in_one_call(fused):
+    with patch("app.services.llm.LLMService.generate_content", new_callable=AsyncMock) as mock_llm:
+        mock_llm.return_value = (
+            '{"category": "bug", "confidence": 0.9, "reasoning": "login broken", '
+            '"reply": "Thanks! This was routed to the frontend-team ({team})."}'
+        )
+        outcome = await orchestrator.process_issue(make_payload())
+
+    results = outcome["results"]
+    assert mock_llm.call_count == 1
+    assert results["classify"]["category"] == "bug"
+    assert results["route"]["team"] == "backend-team"
+    # Placeholder filled and the model's own team guess corrected
+    assert results["respond"]["response"] == "Thanks! This was routed to the backend-team (backend-team)."
+
+@pytest.mark.asyncio
+async def test_fused_mode_falls_back_to_separate_calls(fused):
+    with patch("app.services.llm.LLMService.generate_content", new_callable=AsyncMock) as mock_llm:
+        mock_llm.side_effect = [
+            "not json",
+            # The re-ask is answered without the reply, still invalid
+            '{"category": "bug", "confidence": 0.9}',
+            '{"category": "bug", "confidence": 0.9}',
+            "We are looking into it.",
+        ]
+        outcome = await orchestrator.process_issue(make_payload())
+
+    assert mock_llm.call_count == 4
+    assert outcome["results"]["classify"]["source"] == "llm"
+    assert outcome["results"]["respond"]["response"] == "We are looking into it."
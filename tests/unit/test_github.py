@@ -0,0 +1,207 @@
+import time
+import httpx
+import pytest
+from unittest.mock import patch
+from app.models.domain import GitHubIssue, GitHubUser
+from app.core.exceptions import GitHubRateLimitError
+from app.services.github import CommentLedger, GitHubRateLimiter, GitHubService
+from sqlalchemy.orm import sessionmaker
+from app.db.session import make_engine
+
+def make_issue():
+    return GitHubIssue(
+        url="https://api.github.com/repos/user/test-repo/issues/1",
+        repository_url="", labels_url="", comments_url="", events_url="", html_url="",
+        id=1, node_id="1", number=1, title="Login failed",
+        user=GitHubUser(login="user", id=1, type="User"),
+        state="open", locked=False, comments=0,
+        created_at="2023-01-01T00:00:00Z", updated_at="2023-01-01T00:00:00Z",
+        author_association="OWNER",
+        body="I cannot login"
+    )
+
+@pytest.fixture
+def ledger(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'github.db'}")
+    return CommentLedger(sessionmaker(bind=engine))
+
+@pytest.mark.asyncio
+async def test_github_service_reuses_client(ledger):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, json={})
+
+    service = GitHubService(token="token", comment_ledger=ledger)
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), headers=service.headers)
+    client = service.client
+
+    with patch("app.services.github.settings.GITHUB_WRITE_MIN_INTERVAL", 0.0):
+        await service.add_labels(make_issue(), ["triage/bug"])
+        await service.post_comment(make_issue(), "Thanks!")
+
+    assert service.client is client
+    assert [r.url.path for r in requests] == [
+        "/repos/user/test-repo/issues/1/labels",
+        "/repos/user/test-repo/issues/1/comments",
+    ]
+    assert requests[0].headers["X-GitHub-Api-Version"] == "2022-11-28"
+
+    await service.close()
+    assert service._client is None
+
+@pytest.mark.asyncio
+async def test_github_service_retries_throttled_request():
+    responses = iter([
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(200, json={}, headers={
+            "X-RateLimit-Limit": "5000",
+            "X-RateLimit-Remaining": "4999",
+            "X-RateLimit-Reset": str(int(time.time()) + 3600),
+        }),
+    ])
+
+    service = GitHubService(token="token")
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: next(responses)))
+
+    with patch("app.services.github.settings.GITHUB_WRITE_MIN_INTERVAL", 0.0), \
+         patch("app.services.github.settings.GITHUB_RATE_LIMIT_RESERVE", 0):
+        response = await service.request("GET", "https://api.github.com/rate_limit")
+
+    assert response.status_code == 200
+    assert service.rate_limiter.remaining == 4999
+    assert service.rate_limiter.limit == 5000
+    await service.close()
+
+def test_rate_limiter_ignores_permission_errors():
+    service = GitHubService(token="token")
+    response = httpx.Response(403, json={"message": "Resource not accessible by integration"})
+    assert service.rate_limiter.throttle_delay(response) is None
+
+@pytest.mark.asyncio
+async def test_flush_coalesces_and_deduplicates_writes(ledger):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request.url.path)
+        return httpx.Response(200, json={})
+
+    service = GitHubService(token="token", comment_ledger=ledger)
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    issue = make_issue()
+    issue.labels = [{"name": "triage/bug"}]
+
+    mutations = service.mutations(issue)
+    mutations.add_labels(["triage/bug", "needs-repro"])
+    mutations.add_assignees(["alice"])
+    mutations.set_comment("Thanks!")
+
+    with patch("app.services.github.settings.GITHUB_WRITE_MIN_INTERVAL", 0.0):
+        flushed = await service.flush(mutations)
+        # A redelivery of the same event produces no further writes
+        again = await service.flush(mutations)
+
+    assert flushed == {"labels": ["needs-repro"], "assignees": ["alice"], "comment": "Thanks!"}
+    assert sorted(requests) == [
+        "/repos/user/test-repo/issues/1/assignees",
+        "/repos/user/test-repo/issues/1/comments",
+        "/repos/user/test-repo/issues/1/labels",
+    ]
+    assert again == {"labels": [], "assignees": [], "comment": None}
+
+    # A reopened event gets a freshly generated reply with different text,
+    # and a restarted service has no in-memory history; neither re-comments
+    restarted = GitHubService(token="token", comment_ledger=ledger)
+    restarted._client = service._client
+    reopened = restarted.mutations(issue)
+    reopened.set_comment("Thanks again, with different wording!")
+    assert (await restarted.flush(reopened))["comment"] is None
+    await service.close()
+
+@pytest.fixture
+def frozen_time():
+    now = [1_000_000.0]
+    with patch("app.services.github.time.time", lambda: now[0]):
+        yield now
+
+def test_rate_limiter_spaces_writes_by_min_interval(frozen_time):
+    limiter = GitHubRateLimiter("test")
+
+    with patch("app.services.github.settings.GITHUB_WRITE_MIN_INTERVAL", 1.0):
+        delays = [limiter.reserve(write=True) for _ in range(3)]
+        # Reads are not paced
+        assert limiter.reserve(write=False) == 0.0
+
+    assert delays == [0.0, 1.0, 2.0]
+
+def test_rate_limiter_widens_spacing_when_budget_is_low(frozen_time):
+    limiter = GitHubRateLimiter("test")
+    # 110 requests left with a reserve of 10 spread over the next 1000s
+    limiter.remaining = 110
+    limiter.reset_at = frozen_time[0] + 1000
+
+    with patch("app.services.github.settings.GITHUB_WRITE_MIN_INTERVAL", 1.0), \
+         patch("app.services.github.settings.GITHUB_RATE_LIMIT_RESERVE", 10):
+        assert limiter.reserve(write=True) == 0.0
+        assert limiter.reserve(write=True) == pytest.approx(10.0)
+
+def test_rate_limiter_waits_for_reset_when_reserve_reached(frozen_time):
+    limiter = GitHubRateLimiter("test")
+    limiter.remaining = 10
+    limiter.reset_at = frozen_time[0] + 30
+
+    with patch("app.services.github.settings.GITHUB_RATE_LIMIT_RESERVE", 10):
+        assert limiter.reserve() == pytest.approx(30.0)
+        with pytest.raises(GitHubRateLimitError) as exc:
+            limiter.reserve(max_wait=5.0)
+
+    assert exc.value.retry_after == pytest.approx(30.0)
+
+def test_rate_limiter_blocks_after_retry_after(frozen_time):
+    limiter = GitHubRateLimiter("test")
+    response = httpx.Response(403, headers={"Retry-After": "45"})
+
+    assert limiter.throttle_delay(response) == 45.0
+    assert limiter.reserve() == pytest.approx(45.0)
+
+    frozen_time[0] += 45
+    assert limiter.reserve() == 0.0
+
+@pytest.mark.asyncio
+async def test_long_throttle_propagates_instead_of_dropping_write():
+    service = GitHubService(token="token")
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(429, headers={"Retry-After": "3600"})
+    ))
+
+    with pytest.raises(GitHubRateLimitError) as exc:
+        await service.add_labels(make_issue(), ["triage/bug"])
+
+    assert exc.value.retry_after == 3600.0
+    await service.close()
+
+@pytest.mark.asyncio
+async def test_server_errors_are_retried_only_for_idempotent_writes(ledger):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request.url.path)
+        # Every path fails once, then succeeds
+        return httpx.Response(502 if requests.count(request.url.path) == 1 else 200, json={})
+
+    service = GitHubService(token="token", comment_ledger=ledger)
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    with patch("app.services.github.settings.GITHUB_WRITE_MIN_INTERVAL", 0.0), \
+         patch("app.core.resilience.settings.RETRY_BACKOFF_BASE", 0.0):
+        await service.add_labels(make_issue(), ["triage/bug"])
+        # A 502 on a comment may still have posted it, so it is not resent
+        await service.post_comment(make_issue(), "Thanks!")
+
+    assert requests == [
+        "/repos/user/test-repo/issues/1/labels",
+        "/repos/user/test-repo/issues/1/labels",
+        "/repos/user/test-repo/issues/1/comments",
+    ]
+    await service.close()
@@ -0,0 +1,89 @@
+import json
+import numpy as np
+import pytest
+from app.services.ingestion import IngestionPipeline, JSONLIssueSource
+
+class FakeEmbeddingService:
+    def __init__(self):
+        self.batches = []
+
+    def fingerprint(self, text):
+        return f"fp:{text}"
+
+    def encode_many(self, texts):
+        self.batches.append(len(texts))
+        return np.ones((len(texts), 3), dtype=np.float32)
+
+class FakeVectorStore:
+    def __init__(self):
+        self.ids = []
+        self.fingerprints = {}
+
+    def get_fingerprints(self, ids):
+        return {i: self.fingerprints[i] for i in ids if i in self.fingerprints}
+
+    def upsert_many(self, ids, embeddings, metadatas, documents):
+        assert embeddings.shape == (len(ids), 3)
+        self.ids.extend(ids)
+        for issue_id, metadata in zip(ids, metadatas):
+            self.fingerprints[issue_id] = metadata["fingerprint"]
+
+    def save(self):
+        pass
+
+def write_export(path, count):
+    with open(path, "w") as f:
+        for i in range(1, count + 1):
+            f.write(json.dumps({"id": 100 + i, "number": i, "title": f"Issue {i}", "body": "text", "state": "open"}) + "\n")
+
+@pytest.mark.asyncio
+async def test_pipeline_ingests_in_batches_and_checkpoints(tmp_path):
+    export = tmp_path / "issues.jsonl"
+    checkpoint = tmp_path / "checkpoint.json"
+    write_export(export, 5)
+
+    embedding, store = FakeEmbeddingService(), FakeVectorStore()
+    pipeline = IngestionPipeline(
+        JSONLIssueSource(str(export)), checkpoint_path=str(checkpoint), batch_size=2,
+        embedding_service=embedding, vector_store=store
+    )
+    stats = await pipeline.run()
+
+    assert stats["ingested"] == 5
+    assert embedding.batches == [2, 2, 1]
+    assert store.ids == [str(100 + i) for i in range(1, 6)]
+    assert json.loads(checkpoint.read_text()) == {"cursor": 5, "ingested": 5}
+
+@pytest.mark.asyncio
+async def test_pipeline_resumes_from_checkpoint(tmp_path):
+    export = tmp_path / "issues.jsonl"
+    checkpoint = tmp_path / "checkpoint.json"
+    write_export(export, 5)
+    checkpoint.write_text(json.dumps({"cursor": 3, "ingested": 3}))
+
+    store = FakeVectorStore()
+    pipeline = IngestionPipeline(
+        JSONLIssueSource(str(export)), checkpoint_path=str(checkpoint), batch_size=10,
+        embedding_service=FakeEmbeddingService(), vector_store=store
+    )
+    stats = await pipeline.run()
+
+    assert store.ids == ["104", "105"]
+    assert stats["total_ingested"] == 5
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_unchanged_issues(tmp_path):
+    export = tmp_path / "issues.jsonl"
+    write_export(export, 3)
+    embedding, store = FakeEmbeddingService(), FakeVectorStore()
+
+    for _ in range(2):
+        pipeline = IngestionPipeline(
+            JSONLIssueSource(str(export)), batch_size=10,
+            embedding_service=embedding, vector_store=store
+        )
+        stats = await pipeline.run()
+
+    # The second run found every fingerprint unchanged
+    assert embedding.batches == [3]
+    assert stats["written"] == 0
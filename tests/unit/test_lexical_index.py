@@ -0,0 +1,31 @@
+from app.services.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+def test_bm25_ranks_rare_shared_terms_first_and_supports_removal():
+    index = BM25Index()
+    index.add("1", tokenize("NullPointerException in SessionManager.refresh"))
+    index.add("2", tokenize("Dark mode for settings page"))
+    index.add("3", tokenize("Crash in settings page"))
+
+    results = index.search(tokenize("java.lang.NullPointerException SessionManager"))
+    assert [doc_id for doc_id, _ in results] == ["1"]
+
+    index.add("1", tokenize("Typo in README"))
+    assert index.search(tokenize("NullPointerException")) == []
+
+    index.remove("3")
+    assert [doc_id for doc_id, _ in index.search(tokenize("settings page"))] == ["2"]
+    assert len(index) == 2
+
+def test_signature_matches_follow_replacements():
+    index = BM25Index()
+    index.add("1", [], signature="abc")
+    index.add("2", [], signature="abc")
+    index.add("2", [], signature="def")
+
+    assert index.signature_matches("abc") == ["1"]
+    index.remove("1")
+    assert index.signature_matches("abc") == []
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert [doc_id for doc_id, _ in fused] == ["b", "a", "d", "c"]
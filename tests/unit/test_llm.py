@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+import pytest
+from pydantic import BaseModel
+from app.core.exceptions import LLMError
+from app.services.llm import LLMService
+from app.utils.json_stream import JSONStreamParser, loads_lenient
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeModel:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        return FakeResponse(f"echo: {prompt}")
+
+class ScriptedModel:
+    """Streams each scripted response in small chunks, one per call."""
+
+    def __init__(self, responses, chunk_size=5):
+        self.responses = list(responses)
+        self.chunk_size = chunk_size
+        self.prompts = []
+        self.chunks_read = 0
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self.prompts.append(prompt)
+        text = self.responses.pop(0)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+
+        def stream_chunks():
+            for chunk in chunks:
+                self.chunks_read += 1
+                yield FakeResponse(chunk)
+        return stream_chunks() if stream else FakeResponse(text)
+
+class Verdict(BaseModel):
+    category: str
+    confidence: float
+
+def make_service(model, max_concurrency=4, timeout=5.0):
+    service = LLMService(max_concurrency=max_concurrency, timeout=timeout)
+    service.available = True
+    service.model = model
+    return service
+
+@pytest.mark.asyncio
+async def test_generate_content_runs_off_event_loop():
+    service = make_service(FakeModel(delay=0.2))
+
+    ticks = 0
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticker_task = asyncio.create_task(ticker())
+    result = await service.generate_content("hi")
+    ticker_task.cancel()
+
+    assert result == "echo: hi"
+    # The loop kept running while the model call was in flight
+    assert ticks > 5
+
+@pytest.mark.asyncio
+async def test_generate_content_bounds_concurrency():
+    model = FakeModel(delay=0.05)
+    service = make_service(model, max_concurrency=2)
+
+    results = await asyncio.gather(*(service.generate_content(str(i)) for i in range(8)))
+
+    assert len(results) == 8
+    assert model.peak <= 2
+
+@pytest.mark.asyncio
+async def test_generate_content_timeout():
+    service = make_service(FakeModel(delay=0.5), timeout=0.05)
+
+    with pytest.raises(LLMError):
+        await service.generate_content("slow")
+
+def test_stream_parser_stops_at_first_complete_value():
+    parser = JSONStreamParser()
+
+    assert not parser.feed('Sure! ```json\n{"a": "}{", "b": [1, ')
+    assert parser.feed('2]} trailing')
+    assert parser.text() == '{"a": "}{", "b": [1, 2]}'
+
+@pytest.mark.parametrize("text, expected", [
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('Here you go: {"a": [1, 2,], "b": True}', {"a": [1, 2], "b": True}),
+    ('{"a": "cut off', {"a": "cut off"}),
+])
+def test_loads_lenient_repairs_common_slips(text, expected):
+    assert loads_lenient(text) == expected
+
+@pytest.mark.asyncio
+async def test_generate_structured_stops_streaming_once_json_closes():
+    model = ScriptedModel(['{"category": "bug", "confidence": 0.9} and a long explanation nobody reads'])
+    service = make_service(model)
+
+    result = await service.generate_structured("classify", Verdict)
+
+    assert result == Verdict(category="bug", confidence=0.9)
+    assert model.chunks_read == 8
+    assert '"required"' in model.prompts[0]
+
+@pytest.mark.asyncio
+async def test_generate_structured_reasks_once_with_the_error():
+    model = ScriptedModel(['{"category": "bug"}', '{"category": "bug", "confidence": 0.5}'])
+    service = make_service(model)
+
+    result = await service.generate_structured("classify", Verdict)
+
+    assert result.confidence == 0.5
+    assert len(model.prompts) == 2
+    assert "confidence" in model.prompts[1].split("could not be used")[1]
+
+@pytest.mark.asyncio
+async def test_generate_structured_gives_up_after_reasks():
+    service = make_service(ScriptedModel(["no", "still no"]))
+
+    with pytest.raises(LLMError):
+        await service.generate_structured("classify", Verdict, reasks=1)
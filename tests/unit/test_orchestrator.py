@@ -0,0 +1,124 @@
+import asyncio
+import time
+import pytest
+from types import SimpleNamespace
+from app.agents.orchestrator import AgentOrchestrator, Agents, Stage, run_stages, settings
+from app.models.domain import GitHubIssue, GitHubUser, WebhookPayload
+from app.services.github import IssueMutations
+
+@pytest.mark.asyncio
+async def test_run_stages_runs_independent_stages_concurrently():
+    async def slow(value):
+        await asyncio.sleep(0.1)
+        return value
+
+    stages = [
+        Stage("a", lambda results: slow(1)),
+        Stage("b", lambda results: slow(2)),
+        Stage("c", lambda results: slow(results["a"] + results["b"]), deps=("a", "b")),
+    ]
+
+    start = time.perf_counter()
+    results, timings = await run_stages(stages)
+    elapsed = time.perf_counter() - start
+
+    assert results == {"a": 1, "b": 2, "c": 3}
+    assert set(timings) == {"a", "b", "c"}
+    # Critical path is a|b -> c, not a + b + c
+    assert elapsed < 0.28
+
+@pytest.mark.asyncio
+async def test_run_stages_propagates_failure_and_cancels_dependents():
+    ran = []
+
+    async def fail(results):
+        raise RuntimeError("boom")
+
+    async def dependent(results):
+        ran.append("dependent")
+
+    stages = [
+        Stage("fail", fail),
+        Stage("dependent", dependent, deps=("fail",)),
+    ]
+
+    with pytest.raises(RuntimeError):
+        await run_stages(stages)
+    assert ran == []
+
+@pytest.mark.asyncio
+async def test_run_stages_rejects_undefined_dependency():
+    async def noop(results):
+        return None
+
+    with pytest.raises(ValueError):
+        await run_stages([Stage("a", noop, deps=("missing",))])
+
+
+class Timeline:
+    def __init__(self):
+        self.events: list[str] = []
+
+    async def step(self, name: str, result, delay: float = 0.05):
+        self.events.append(f"{name}:start")
+        await asyncio.sleep(delay)
+        self.events.append(f"{name}:end")
+        return result
+
+    def index(self, event: str) -> int:
+        return self.events.index(event)
+
+class FakeGitHub:
+    def __init__(self, timeline: Timeline):
+        self.timeline = timeline
+        self.flushes: list[tuple[list[str], str | None]] = []
+
+    def mutations(self, issue):
+        return IssueMutations(issue=issue)
+
+    async def flush(self, mutations):
+        self.flushes.append((list(mutations.labels), mutations.comment))
+        self.timeline.events.append("flush:labels" if mutations.comment is None else "flush:comment")
+        return {}
+
+@pytest.mark.asyncio
+async def test_process_issue_overlaps_stages_and_flushes_labels_early(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_FUSED_TRIAGE", False)
+    timeline = Timeline()
+    agents = Agents(
+        classifier=SimpleNamespace(
+            classify_fast=lambda issue: None,
+            process=lambda issue: timeline.step("classify", {"category": "bug", "confidence": 0.9}),
+        ),
+        fused=None,
+        similarity=SimpleNamespace(
+            process=lambda issue, repo: timeline.step("similarity", {"duplicates": [], "is_duplicate": False, "embedding": None}),
+        ),
+        router=SimpleNamespace(
+            centroids=None,
+            known_teams={"backend-team"},
+            process=lambda issue, category, repo, embedding: timeline.step("route", {"team": "backend-team"}, 0),
+        ),
+        responder=SimpleNamespace(
+            process=lambda issue, category, team: timeline.step("respond", {"response": "Thanks!"}, 0.1),
+        ),
+    )
+    github = FakeGitHub(timeline)
+    payload = WebhookPayload(action="opened", issue=GitHubIssue(
+        url="", repository_url="", labels_url="", comments_url="", events_url="", html_url="",
+        id=1, node_id="1", number=1, title="Login failed",
+        user=GitHubUser(login="user", id=1, type="User"),
+        state="open", locked=False, comments=0,
+        created_at="2023-01-01T00:00:00Z", updated_at="2023-01-01T00:00:00Z",
+        author_association="OWNER", body="I cannot login"
+    ))
+
+    await AgentOrchestrator(agents, github=github).process_issue(payload)
+
+    # Classification and duplicate search run concurrently
+    assert timeline.index("similarity:start") < timeline.index("classify:end")
+    assert timeline.index("classify:start") < timeline.index("similarity:end")
+    # Labels go out while the reply is still being written, the comment after
+    assert timeline.index("flush:labels") < timeline.index("respond:end")
+    assert timeline.index("respond:end") < timeline.index("flush:comment")
+    assert github.flushes == [(["triage/bug"], None), (["triage/bug"], "Thanks!")]
@@ -0,0 +1,220 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.db.models import DeadLetterJob, TriageJob
+from app.db.session import init_db, make_engine
+from app.models.domain import WebhookPayload, GitHubIssue, GitHubUser, GitHubRepository
+from app.services.queue import TriageQueue
+
+def make_payload(number=1):
+    return WebhookPayload(
+        action="opened",
+        repository=GitHubRepository(
+            id=1, name="test-repo", full_name="user/test-repo",
+            private=False, owner=GitHubUser(login="user", id=1, type="User"), html_url="http://github.com/user/test-repo"
+        ),
+        issue=GitHubIssue(
+            url="", repository_url="", labels_url="", comments_url="", events_url="", html_url="",
+            id=number, node_id="1", number=number, title="Login failed",
+            user=GitHubUser(login="user", id=1, type="User"),
+            state="open", locked=False, comments=0,
+            created_at="2023-01-01T00:00:00Z", updated_at="2023-01-01T00:00:00Z",
+            author_association="OWNER",
+            body="I cannot login"
+        )
+    )
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'queue.db'}")
+    init_db(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+@pytest.mark.asyncio
+async def test_queue_processes_job(session_factory):
+    queue = TriageQueue(session_factory=session_factory)
+    seen = []
+
+    async def handler(payload):
+        seen.append(payload.issue.number)
+
+    await queue.enqueue(make_payload(7))
+    assert await queue.depth() == 1
+
+    assert await queue.run_once(handler) is True
+    assert seen == [7]
+    assert await queue.depth() == 0
+    assert await queue.run_once(handler) is False
+
+@pytest.mark.asyncio
+async def test_queue_retries_then_dead_letters(session_factory):
+    queue = TriageQueue(session_factory=session_factory, max_attempts=2)
+    queue.backoff_base = 0.0
+
+    async def handler(payload):
+        raise RuntimeError("boom")
+
+    await queue.enqueue(make_payload())
+    assert await queue.run_once(handler) is True
+    with session_factory() as session:
+        job = session.query(TriageJob).one()
+        assert job.status == "queued"
+        assert job.attempts == 1
+
+    assert await queue.run_once(handler) is True
+    with session_factory() as session:
+        assert session.query(TriageJob).count() == 0
+        dead = session.query(DeadLetterJob).one()
+        assert dead.attempts == 2
+        assert "boom" in dead.last_error
+
+@pytest.mark.asyncio
+async def test_queue_reclaims_after_visibility_timeout(session_factory):
+    queue = TriageQueue(session_factory=session_factory, visibility_timeout=0.001)
+
+    await queue.enqueue(make_payload())
+    first = queue._claim_sync()
+    assert first is not None
+
+    # The first claim's lock expires, so another worker can pick it up
+    import time
+    time.sleep(0.01)
+    second = queue._claim_sync()
+    assert second is not None
+    assert second.id == first.id
+    assert second.attempts == 2
+
+@pytest.mark.asyncio
+async def test_queue_dead_letters_job_whose_worker_keeps_dying(session_factory):
+    import time
+    queue = TriageQueue(session_factory=session_factory, visibility_timeout=0.001, max_attempts=2)
+
+    await queue.enqueue(make_payload())
+    # Two claims that never report back, as if the worker process crashed
+    assert queue._claim_sync() is not None
+    time.sleep(0.01)
+    assert queue._claim_sync() is not None
+    time.sleep(0.01)
+
+    assert queue._claim_sync() is None
+    with session_factory() as session:
+        assert session.query(TriageJob).count() == 0
+        assert session.query(DeadLetterJob).one().attempts == 2
+
+@pytest.mark.asyncio
+async def test_queue_stale_claim_cannot_complete_reclaimed_job(session_factory):
+    import time
+    queue = TriageQueue(session_factory=session_factory, visibility_timeout=0.001)
+
+    await queue.enqueue(make_payload())
+    stale = queue._claim_sync()
+    time.sleep(0.01)
+    current = queue._claim_sync()
+
+    assert queue._complete_sync(stale) is False
+    assert queue._fail_sync(stale, "late") is False
+    with session_factory() as session:
+        assert session.query(TriageJob).one().lease_id == current.lease_id
+
+    assert queue._complete_sync(current) is True
+
+@pytest.mark.asyncio
+async def test_queue_heartbeat_extends_lease(session_factory):
+    import asyncio
+    queue = TriageQueue(session_factory=session_factory, visibility_timeout=0.3)
+    claims = []
+
+    async def handler(payload):
+        # Runs well past the visibility timeout while the heartbeat renews it
+        for _ in range(5):
+            await asyncio.sleep(0.15)
+            claims.append(await asyncio.to_thread(queue._claim_sync))
+
+    await queue.enqueue(make_payload())
+    assert await queue.run_once(handler) is True
+    assert claims == [None] * 5
+    assert await queue.depth() == 0
+
+@pytest.mark.asyncio
+async def test_queue_honours_retry_after_hint(session_factory):
+    import time
+    from app.core.exceptions import GitHubRateLimitError
+    queue = TriageQueue(session_factory=session_factory)
+
+    async def handler(payload):
+        raise GitHubRateLimitError("throttled", retry_after=3600)
+
+    await queue.enqueue(make_payload())
+    await queue.run_once(handler)
+
+    with session_factory() as session:
+        assert session.query(TriageJob).one().available_at >= time.time() + 3500
+
+@pytest.mark.asyncio
+async def test_run_batch_prepares_claimed_jobs_together(session_factory):
+    queue = TriageQueue(session_factory=session_factory, batch_size=3)
+    prepared, seen = [], []
+
+    async def prepare(payloads):
+        prepared.append(sorted(p.issue.number for p in payloads))
+        raise RuntimeError("preparation is best-effort")
+
+    async def handler(payload):
+        seen.append(payload.issue.number)
+
+    for number in range(1, 6):
+        await queue.enqueue(make_payload(number))
+
+    assert await queue.run_batch(handler, prepare) is True
+    assert prepared == [[1, 2, 3]]
+    assert sorted(seen) == [1, 2, 3]
+    assert await queue.depth() == 2
+
+@pytest.mark.asyncio
+async def test_events_for_a_queued_issue_are_coalesced(session_factory):
+    queue = TriageQueue(session_factory=session_factory)
+    seen = []
+
+    async def handler(payload):
+        seen.append((payload.action, payload.issue.title))
+
+    opened = make_payload(1)
+    edited = make_payload(1)
+    edited.action = "edited"
+    edited.issue.title = "Login failed on Safari"
+
+    first = await queue.enqueue(opened)
+    assert await queue.enqueue(edited) == first
+    await queue.enqueue(make_payload(2))
+
+    assert await queue.depth() == 2
+    while await queue.run_once(handler):
+        pass
+    # Triaged once, on the newest snapshot
+    assert seen == [("opened", "Login failed on Safari"), ("opened", "Login failed")]
+
+@pytest.mark.asyncio
+async def test_running_job_is_not_coalesced(session_factory):
+    queue = TriageQueue(session_factory=session_factory)
+    first = await queue.enqueue(make_payload(1))
+
+    job = queue._claim_sync()
+    assert job.id == first
+    second = await queue.enqueue(make_payload(1))
+
+    assert second != first
+    assert await queue.depth() == 2
+
+@pytest.mark.asyncio
+async def test_issue_with_running_job_is_not_claimed_again(session_factory):
+    queue = TriageQueue(session_factory=session_factory)
+    await queue.enqueue(make_payload(1))
+    running = queue._claim_sync()
+    # Not coalesced into the running job, and must wait for it
+    await queue.enqueue(make_payload(1))
+    await queue.enqueue(make_payload(2))
+
+    assert queue._claim_sync().issue_key == "user/test-repo#2"
+    assert queue._claim_sync() is None
+
+    assert queue._complete_sync(running)
+    assert queue._claim_sync().issue_key == "user/test-repo#1"
@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.core.exceptions import CircuitOpenError
+from app.core.resilience import CircuitBreaker, ResiliencePolicy, RetryBudget
+
+class Flaky(Exception):
+    pass
+
+@pytest.fixture(autouse=True)
+def no_backoff():
+    with patch("app.core.resilience.settings.RETRY_BACKOFF_BASE", 0.0):
+        yield
+
+def test_breaker_opens_after_consecutive_failures_and_probes_once():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as exc:
+        breaker.before_call()
+    assert 0 < exc.value.retry_after <= 60
+
+    breaker.opened_at -= 60
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    breaker.opened_at -= 60
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+
+def test_retry_budget_caps_retries_relative_to_requests():
+    budget = RetryBudget(ratio=0.5, min_retries=1, window=60)
+    for _ in range(4):
+        budget.record_request()
+
+    assert [budget.try_spend() for _ in range(4)] == [True, True, True, False]
+
+@pytest.mark.asyncio
+async def test_policy_retries_failures_and_passes_other_errors_through():
+    policy = ResiliencePolicy("test-retry", failure_types=(Flaky,), max_retries=2)
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise Flaky()
+        return "ok"
+
+    assert await policy.call(flaky) == "ok"
+    assert len(calls) == 3
+
+    async def not_found():
+        raise KeyError("missing")
+
+    with pytest.raises(KeyError):
+        await policy.call(not_found)
+    assert policy.breaker.failures == 0
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast_without_calling():
+    policy = ResiliencePolicy("test-open", failure_types=(Flaky,), max_retries=0, failure_threshold=1)
+    calls = []
+
+    async def down():
+        calls.append(1)
+        raise Flaky()
+
+    with pytest.raises(Flaky):
+        await policy.call(down)
+    with pytest.raises(CircuitOpenError):
+        await policy.call(down)
+    assert len(calls) == 1
+
+@pytest.mark.asyncio
+async def test_hedge_returns_the_faster_attempt():
+    policy = ResiliencePolicy("test-hedge", failure_types=(Flaky,), max_retries=0, hedge_after=0.02)
+    delays = iter([1.0, 0.0])
+
+    async def call():
+        await asyncio.sleep(next(delays))
+        return "done"
+
+    result = await asyncio.wait_for(policy.call(call, hedge=True), timeout=0.5)
+
+    assert result == "done"
@@ -1,5 +1,8 @@
+import json
+import re
 import pytest
 from app.agents.router import RouterAgent
+from app.services.routing_rules import load_routing_config, trie_pattern
 from app.models.domain import GitHubIssue, GitHubUser
 
 @pytest.mark.asyncio
@@ -35,3 +38,69 @@ async def test_router_feature_default():
     result = await agent.process(issue, category="feature")
     
     assert result["team"] == "product-team"
+
+def make_issue(title, body="", labels=None):
+    return GitHubIssue(
+        url="", repository_url="", labels_url="", comments_url="", events_url="", html_url="",
+        id=1, node_id="1", number=1, title=title,
+        user=GitHubUser(login="user", id=1, type="User"),
+        labels=labels or [],
+        state="open", locked=False, comments=0,
+        created_at="2023-01-01T00:00:00Z", updated_at="2023-01-01T00:00:00Z",
+        author_association="OWNER",
+        body=body
+    )
+
+@pytest.mark.asyncio
+async def test_router_matches_whole_words_only():
+    # "build" and "require" contain "ui"
+    result = await RouterAgent().process(make_issue("Build fails", "Does not require anything"), category="bug")
+
+    assert result["team"] == "triage-team"
+
+@pytest.mark.asyncio
+async def test_router_picks_highest_scoring_team():
+    issue = make_issue("CSS broken on the login page", "The UI overlaps and the css is wrong")
+
+    result = await RouterAgent().process(issue, category="bug")
+
+    # css in the title (2) + ui + css beats login in the title (2)
+    assert result["team"] == "frontend-team"
+    assert result["score"] == 4.0
+
+@pytest.mark.asyncio
+async def test_security_category_ignores_other_signals():
+    result = await RouterAgent().process(make_issue("XSS in the UI"), category="security")
+
+    assert result["team"] == "security-team"
+
+@pytest.mark.asyncio
+async def test_repo_config_with_labels_and_codeowners(tmp_path):
+    (tmp_path / "CODEOWNERS").write_text("*.py @acme/backend\n/web/ @acme/web-team\nweb/legacy/ @acme/platform\n")
+    (tmp_path / "routing.json").write_text(json.dumps({
+        "repos": {
+            "acme/app": {
+                "labels": {"area/docs": "docs-team"},
+                "codeowners": "CODEOWNERS",
+                "owners": {"@acme/backend": "backend-team"}
+            }
+        }
+    }))
+    agent = RouterAgent(load_routing_config(str(tmp_path / "routing.json")))
+    trace = 'Traceback:\n  File "/srv/app/web/legacy/views.py", line 3\n  File "/srv/app/web/legacy/forms.py", line 9'
+
+    result = await agent.process(make_issue("Crash", trace), category="bug", repo="acme/app")
+    # The last matching CODEOWNERS pattern wins for each path
+    assert result["team"] == "platform"
+    assert {"backend-team", "web-team", "platform"} <= agent.known_teams
+
+    labelled = make_issue("Typo", labels=[{"name": "area/docs"}])
+    assert (await agent.process(labelled, category="bug", repo="acme/app"))["team"] == "docs-team"
+    # Other repositories keep the default rules
+    assert (await agent.process(labelled, category="bug", repo="other/repo"))["team"] == "triage-team"
+
+def test_trie_pattern_matches_exactly_the_words():
+    words = ["log", "login", "logout", "c++", "ui"]
+    pattern = re.compile(rf"(?<!\w)(?:{trie_pattern(words)})(?!\w)")
+
+    assert pattern.findall("login then logout, log c++ ui logs build") == ["login", "logout", "log", "c++", "ui"]
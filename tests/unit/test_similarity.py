@@ -0,0 +1,200 @@
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.agents.similarity import SimilarityAgent
+from app.services.lexical_index import LexicalIndexService
+from app.models.domain import GitHubIssue, GitHubUser
+
+def make_issue(body="I cannot login", state="open", issue_id=1, number=1):
+    return GitHubIssue(
+        url="", repository_url="", labels_url="", comments_url="", events_url="", html_url="",
+        id=issue_id, node_id=str(issue_id), number=number, title="Login failed",
+        user=GitHubUser(login="user", id=1, type="User"),
+        state=state, locked=False, comments=0,
+        created_at="2023-01-01T00:00:00Z", updated_at="2023-01-01T00:00:00Z",
+        author_association="OWNER",
+        body=body
+    )
+
+class FakeVectorStore:
+    def __init__(self):
+        self.items = {}
+        self.writes = 0
+
+    def get_issue(self, issue_id):
+        return self.items.get(issue_id)
+
+    def all_metadata(self):
+        return {issue_id: item["metadata"] for issue_id, item in self.items.items()}
+
+    def add_issue(self, issue_id, embedding, metadata, text):
+        self.writes += 1
+        self.items[issue_id] = {"embedding": embedding, "metadata": metadata}
+
+    def update_metadata(self, issue_id, metadata):
+        self.items[issue_id]["metadata"] = metadata
+
+    def delete_issue(self, issue_id):
+        self.items.pop(issue_id, None)
+
+    def search(self, embedding, n_results=5):
+        ids = list(self.items)
+        distances = [
+            1.0 - float(np.dot(embedding, item["embedding"]) / (np.linalg.norm(embedding) * np.linalg.norm(item["embedding"])))
+            for item in self.items.values()
+        ]
+        order = sorted(range(len(ids)), key=lambda i: distances[i])[:n_results]
+        return {
+            "ids": [[ids[i] for i in order]],
+            "distances": [[distances[i] for i in order]],
+            "metadatas": [[self.items[ids[i]]["metadata"] for i in order]],
+        }
+
+class FakeVectorStoreService:
+    def __init__(self):
+        self.partitions = {}
+
+    def for_repo(self, repo):
+        return self.partitions.setdefault(repo, FakeVectorStore())
+
+@pytest.fixture
+def service():
+    fake = FakeVectorStoreService()
+    with patch("app.agents.similarity.vector_store", fake), \
+         patch("app.agents.similarity.lexical_index", LexicalIndexService(fake)):
+        yield fake
+
+@pytest.fixture
+def store(service):
+    return service.for_repo("unknown")
+
+@pytest.fixture
+def encode():
+    with patch("app.services.embedding.EmbeddingService.encode", new_callable=AsyncMock) as mock_encode:
+        mock_encode.return_value = np.ones(3, dtype=np.float32)
+        yield mock_encode
+
+@pytest.mark.asyncio
+async def test_unchanged_issue_reuses_stored_embedding(store, encode):
+    agent = SimilarityAgent()
+    await agent.process(make_issue())
+    # A reopened or redelivered issue with the same content
+    await agent.process(make_issue())
+
+    assert encode.call_count == 1
+    assert store.writes == 1
+
+@pytest.mark.asyncio
+async def test_sync_handles_edits_state_changes_and_deletes(store, encode):
+    agent = SimilarityAgent()
+    await agent.process(make_issue())
+
+    closed = await agent.sync(make_issue(state="closed"), "closed")
+    assert closed["reindexed"] is False
+    assert store.items["1"]["metadata"]["state"] == "closed"
+
+    edited = await agent.sync(make_issue(body="Login fails with 500"), "edited")
+    assert edited["reindexed"] is True
+    assert encode.call_count == 2
+
+    await agent.sync(make_issue(), "deleted")
+    assert store.items == {}
+
+@pytest.mark.asyncio
+async def test_only_neighbours_above_threshold_are_duplicates(service, encode):
+    agent = SimilarityAgent()
+    agent.threshold = 0.85
+    store = service.for_repo("octo/app")
+    store.add_issue("10", np.array([1.0, 0.0, 0.0]), {"number": 10, "title": "close"}, "")
+    store.add_issue("11", np.array([0.0, 1.0, 0.0]), {"number": 11, "title": "unrelated"}, "")
+    encode.return_value = np.array([1.0, 0.1, 0.0], dtype=np.float32)
+
+    result = await agent.process(make_issue(issue_id=12, number=12), repo="octo/app")
+
+    assert [d["number"] for d in result["duplicates"]] == [10]
+    assert result["duplicates"][0]["similarity"] >= 0.85
+    assert result["is_duplicate"] is True
+
+@pytest.mark.asyncio
+async def test_repositories_are_searched_separately(service, encode):
+    agent = SimilarityAgent()
+    await agent.process(make_issue(issue_id=1, number=1), repo="octo/app")
+
+    result = await agent.process(make_issue(issue_id=2, number=1), repo="octo/other")
+
+    assert result["is_duplicate"] is False
+    assert set(service.partitions) == {"octo/app", "octo/other"}
+
+CRASH = """Crashes on startup
+```
+Traceback (most recent call last):
+  File "/srv/app/main.py", line 40, in start
+  File "/srv/app/db.py", line 12, in connect
+ConnectionError: timeout after 30s
+```"""
+
+@pytest.mark.asyncio
+async def test_exact_crash_signature_skips_embedding(service, encode):
+    agent = SimilarityAgent()
+    await agent.process(make_issue(body=CRASH, issue_id=1, number=1))
+    assert encode.call_count == 1
+
+    # Same crash with a different timeout and line number
+    repeat = CRASH.replace("30s", "45s").replace("line 12", "line 14")
+    encode.reset_mock()
+    with patch("app.agents.similarity.SimilarityAgent._embed", new_callable=AsyncMock) as embed:
+        result = await agent.process(make_issue(body=repeat, issue_id=2, number=2))
+
+    assert result["is_duplicate"] is True
+    assert result["duplicates"][0]["number"] == 1
+    assert result["duplicates"][0]["match"] == "signature"
+    # The original report's embedding stands in for routing
+    assert result["embedding"] is not None
+    encode.assert_not_called()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("body", [
+    "```\nError\n```",
+    "```\nTypeError: Cannot read properties of undefined (reading 'map')\n```",
+    "```\nError: connect ECONNREFUSED 10.0.0.1:5432\n    at TCPConnectWrap.afterConnect\n```",
+])
+async def test_generic_errors_do_not_short_circuit(service, encode, body):
+    agent = SimilarityAgent()
+    agent.threshold = agent.lexical_threshold = 0.99
+    await agent.process(make_issue(body=body, issue_id=1, number=1))
+    encode.return_value = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+
+    result = await agent.process(make_issue(body=body.replace("10.0.0.1", "10.0.0.2"), issue_id=2, number=2))
+
+    assert result["is_duplicate"] is False
+
+@pytest.mark.asyncio
+async def test_lexical_match_lowers_similarity_bar(service, encode):
+    agent = SimilarityAgent()
+    agent.threshold, agent.lexical_threshold = 0.95, 0.7
+    store = service.for_repo("unknown")
+    vectors = {
+        "10": np.array([1.0, 0.6, 0.0]),  # similarity ~0.86, shares the error
+        "11": np.array([1.0, 0.6, 0.0]),  # same similarity, no shared terms
+    }
+    store.add_issue("10", vectors["10"], {"number": 10, "title": "ValueError in parser", "terms": "valueerror parser"}, "")
+    store.add_issue("11", vectors["11"], {"number": 11, "title": "Slow startup", "terms": "slow startup"}, "")
+    encode.return_value = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+
+    issue = make_issue(body="", issue_id=12, number=12)
+    issue.title = "ValueError in parser"
+    result = await agent.process(issue)
+
+    assert [d["number"] for d in result["duplicates"]] == [10]
+    assert result["duplicates"][0]["match"] == "hybrid"
+
+@pytest.mark.asyncio
+async def test_routed_team_survives_reindexing(store, encode):
+    agent = SimilarityAgent()
+    result = await agent.process(make_issue())
+    assert result["embedding"] is not None
+    store.items["1"]["metadata"]["team"] = "backend-team"
+
+    await agent.sync(make_issue(body="Login fails with 500"), "edited")
+
+    assert store.items["1"]["metadata"]["team"] == "backend-team"
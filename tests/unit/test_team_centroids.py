@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app.agents.router import RouterAgent
+from app.models.domain import GitHubIssue, GitHubUser
+from app.services.team_centroids import TeamCentroids, TeamCentroidService
+
+class FakeVectorStore:
+    def __init__(self):
+        self.items = {}
+
+    def get_issue(self, issue_id):
+        return self.items.get(issue_id)
+
+    def all_metadata(self):
+        return {issue_id: item["metadata"] for issue_id, item in self.items.items()}
+
+    def update_metadata(self, issue_id, metadata):
+        self.items[issue_id]["metadata"] = metadata
+
+class FakeVectorStoreService:
+    def __init__(self):
+        self.partitions = {}
+
+    def for_repo(self, repo):
+        return self.partitions.setdefault(repo, FakeVectorStore())
+
+def make_issue(title, issue_id=1):
+    return GitHubIssue(
+        url="", repository_url="", labels_url="", comments_url="", events_url="", html_url="",
+        id=issue_id, node_id=str(issue_id), number=issue_id, title=title,
+        user=GitHubUser(login="user", id=1, type="User"),
+        state="open", locked=False, comments=0,
+        created_at="2023-01-01T00:00:00Z", updated_at="2023-01-01T00:00:00Z",
+        author_association="OWNER",
+        body=""
+    )
+
+@pytest.fixture
+def stores():
+    return FakeVectorStoreService()
+
+@pytest.fixture
+def service(tmp_path, stores):
+    return TeamCentroidService(str(tmp_path), stores)
+
+def test_nearest_team_and_incremental_updates():
+    centroids = TeamCentroids()
+    centroids.add("backend-team", np.array([1.0, 0.0, 0.0]))
+    centroids.add("frontend-team", np.array([0.0, 2.0, 0.0]))
+
+    assert centroids.nearest(np.array([0.9, 0.1, 0.0]))[0] == "backend-team"
+    assert centroids.nearest(np.array([0.9, 0.1, 0.0]), min_issues=2) is None
+
+    # Enough frontend issues pointing the other way pull its centroid over
+    for _ in range(3):
+        centroids.add("frontend-team", np.array([1.0, 0.2, 0.0]))
+    team, similarity = centroids.nearest(np.array([0.9, 0.3, 0.0]), min_issues=2)
+    assert team == "frontend-team"
+    assert 0 < similarity <= 1
+
+def test_built_from_tagged_issues_in_the_vector_store(service, stores):
+    store = stores.for_repo("octo/app")
+    store.items["1"] = {"embedding": np.array([1.0, 0.0]), "metadata": {"team": "backend-team"}}
+    store.items["2"] = {"embedding": np.array([0.0, 1.0]), "metadata": {"team": "docs-team"}}
+    store.items["3"] = {"embedding": np.array([0.7, 0.7]), "metadata": {}}
+
+    centroids = service.for_repo("octo/app")
+
+    assert sorted(centroids.teams) == ["backend-team", "docs-team"]
+    assert centroids.nearest(np.array([0.1, 1.0]))[0] == "docs-team"
+
+def test_record_tags_the_issue_and_persists(service, stores, tmp_path):
+    store = stores.for_repo("octo/app")
+    store.items["1"] = {"embedding": np.array([1.0, 0.0]), "metadata": {"number": 1}}
+
+    service.record("octo/app", "1", "backend-team", np.array([1.0, 0.0]))
+    # Routed again elsewhere: moves rather than counting twice
+    service.record("octo/app", "1", "frontend-team", np.array([1.0, 0.0]))
+    service.close()
+
+    assert store.items["1"]["metadata"] == {"number": 1, "team": "frontend-team"}
+    reloaded = TeamCentroidService(str(tmp_path), FakeVectorStoreService()).for_repo("octo/app")
+    assert dict(zip(reloaded.teams, reloaded.counts)) == {"backend-team": 0, "frontend-team": 1}
+    assert reloaded.nearest(np.array([1.0, 0.0]))[0] == "frontend-team"
+
+@pytest.mark.asyncio
+async def test_router_uses_centroids_only_without_rule_signals(service, stores):
+    store = stores.for_repo("octo/app")
+    router = RouterAgent(centroids=service)
+
+    with patch("app.agents.router.settings.SEMANTIC_ROUTING_MIN_ISSUES", 2):
+        # Keyword-routed issues train the backend centroid
+        for issue_id, vector in ((1, [1.0, 0.1, 0.0]), (2, [1.0, 0.0, 0.1])):
+            store.items[str(issue_id)] = {"embedding": np.array(vector), "metadata": {}}
+            result = await router.process(make_issue("Login broken", issue_id), "bug", "octo/app", np.array(vector))
+            assert result["source"] == "rules"
+
+        close = await router.process(make_issue("Session drops", 3), "bug", "octo/app", np.array([0.9, 0.1, 0.1]))
+        far = await router.process(make_issue("Session drops", 4), "bug", "octo/app", np.array([0.0, 0.0, 1.0]))
+
+    assert close["team"] == "backend-team"
+    assert close["source"] == "semantic"
+    assert far["team"] == "triage-team"
+    # Semantic guesses are not fed back into the centroids
+    assert service.for_repo("octo/app").counts.tolist() == [2]
+
+@pytest.mark.asyncio
+async def test_only_stored_issues_are_recorded(service, stores):
+    stores.for_repo("octo/app").items["1"] = {"embedding": np.array([1.0, 0.0]), "metadata": {"team": "docs-team"}}
+    # Built off the event loop on first use
+    centroids = await service.load("octo/app")
+    assert centroids.teams == ["docs-team"]
+
+    service.record("octo/app", "2", "backend-team", np.array([0.0, 1.0]))
+
+    assert centroids.teams == ["docs-team"]
+    assert "octo/app" not in service._dirty
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from app.services.vector_index import HNSWVectorStore, NumpyVectorStore
+from app.services.vectorstore import VectorStoreService, partition_name, settings
+
+BACKENDS = [NumpyVectorStore, HNSWVectorStore]
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_search_returns_nearest_first(tmp_path, backend):
+    store = backend(str(tmp_path), snapshot_interval=3600)
+    store.add_issue("1", unit(1, 0, 0), {"number": 1}, "a")
+    store.add_issue("2", unit(0, 1, 0), {"number": 2}, "b")
+    store.add_issue("3", unit(1, 1, 0), {"number": 3}, "c")
+
+    results = store.search(unit(1, 0.1, 0), n_results=2)
+
+    assert results["ids"] == [["1", "3"]]
+    assert results["distances"][0][0] == pytest.approx(1 - unit(1, 0.1, 0)[0], abs=1e-5)
+    assert [m["number"] for m in results["metadatas"][0]] == [1, 3]
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_upsert_replaces_and_delete_removes(tmp_path, backend):
+    store = backend(str(tmp_path), snapshot_interval=3600)
+    store.add_issue("1", unit(1, 0, 0), {"fingerprint": "old"}, "a")
+    store.add_issue("2", unit(0, 1, 0), {"fingerprint": "x"}, "b")
+    store.add_issue("1", unit(0, 0, 1), {"fingerprint": "new"}, "a")
+
+    assert store.count() == 2
+    assert store.get_fingerprints(["1", "2", "9"]) == {"1": "new", "2": "x"}
+    np.testing.assert_allclose(store.get_issue("1")["embedding"], unit(0, 0, 1), atol=1e-6)
+
+    store.delete_issue("1")
+    assert store.get_issue("1") is None
+    assert store.search(unit(0, 0, 1), n_results=5)["ids"] == [["2"]]
+
+    # Freed slots are reused without disturbing the remaining issues
+    store.add_issue("3", unit(1, 0, 0), {"fingerprint": "y"}, "c")
+    assert store.search(unit(1, 0, 0), n_results=1)["ids"] == [["3"]]
+    assert store.get_fingerprints(["2"]) == {"2": "x"}
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_snapshot_survives_restart(tmp_path, backend):
+    store = backend(str(tmp_path), snapshot_interval=3600)
+    ids = [str(i) for i in range(50)]
+    vectors = np.random.default_rng(0).normal(size=(50, 8)).astype(np.float32)
+    store.upsert_many(ids, vectors, [{"number": i} for i in range(50)], [""] * 50)
+    store.delete_issue("7")
+    store.close()
+
+    reopened = backend(str(tmp_path))
+
+    assert reopened.count() == 49
+    assert reopened.get_issue("7") is None
+    assert reopened.search(vectors[12], n_results=1)["ids"] == [["12"]]
+    # Writes after a reload go to a writable copy
+    reopened.add_issue("99", vectors[3], {"number": 99}, "")
+    assert reopened.count() == 50
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_snapshots_are_written_in_the_background(tmp_path, backend):
+    store = backend(str(tmp_path), snapshot_interval=0)
+    store.add_issue("1", unit(1, 0, 0), {"number": 1}, "")
+    store._saver.join()
+
+    assert store.meta_path.exists()
+    store.close()
+    assert backend(str(tmp_path)).count() == 1
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_only_one_writer_per_directory(tmp_path, backend):
+    writer = backend(str(tmp_path), snapshot_interval=3600)
+    other = backend(str(tmp_path), snapshot_interval=3600)
+    assert writer.writable and not other.writable
+
+    writer.add_issue("1", unit(1, 0, 0), {"number": 1}, "")
+    other.add_issue("2", unit(0, 1, 0), {"number": 2}, "")
+    other.close()
+    writer.close()
+
+    # The read-only copy could not overwrite the writer's snapshot
+    reopened = backend(str(tmp_path))
+    assert reopened.get_issue("1") is not None
+    assert reopened.get_issue("2") is None
+
+def test_service_partitions_by_repository(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_STORE_DIR", str(tmp_path))
+    service = VectorStoreService("numpy")
+
+    service.for_repo("octo/app").add_issue("1", unit(1, 0, 0), {"number": 1}, "")
+
+    assert service.for_repo("octo/app") is service.for_repo("octo/app")
+    assert service.for_repo("octo/app").count() == 1
+    assert service.for_repo("octo/other").count() == 0
+    assert partition_name("octo/app") != partition_name("octo-app")
@@ -0,0 +1,94 @@
+import hashlib
+import hmac
+import json
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+from app.api.v1.endpoints.webhooks import seen_deliveries
+from app.main import app
+
+SECRET = "test-secret"
+
+def issue_event(action="opened"):
+    return {
+        "action": action,
+        "issue": {
+            "url": "", "repository_url": "", "labels_url": "", "comments_url": "", "events_url": "", "html_url": "",
+            "id": 1, "node_id": "1", "number": 1, "title": "Login failed",
+            "user": {"login": "user", "id": 1, "type": "User"},
+            "state": "open", "locked": False, "comments": 0,
+            "created_at": "2023-01-01T00:00:00Z", "updated_at": "2023-01-01T00:00:00Z",
+            "author_association": "OWNER", "body": "I cannot login"
+        }
+    }
+
+def post(client, payload, event="issues", signature=None, delivery=None):
+    body = json.dumps(payload).encode()
+    if signature is None:
+        signature = "sha256=" + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return client.post(
+        "/api/v1/webhooks/github",
+        content=body,
+        headers={
+            "X-Hub-Signature-256": signature, "X-GitHub-Event": event, "Content-Type": "application/json",
+            **({"X-GitHub-Delivery": delivery} if delivery else {})
+        }
+    )
+
+@pytest.fixture
+def client():
+    seen_deliveries.clear()
+    with patch("app.core.security.settings.GITHUB_WEBHOOK_SECRET", SECRET), \
+         patch("app.api.v1.endpoints.webhooks.triage_queue.enqueue", new_callable=AsyncMock) as enqueue:
+        enqueue.return_value = 42
+        test_client = TestClient(app)
+        test_client.enqueue = enqueue
+        yield test_client
+
+def test_processed_event_is_validated_and_queued(client):
+    response = post(client, issue_event())
+
+    assert response.json()["job_id"] == 42
+    payload = client.enqueue.call_args[0][0]
+    assert payload.issue.title == "Login failed"
+
+def test_bad_signature_is_rejected_before_parsing(client):
+    response = post(client, issue_event(), signature="sha256=bad")
+
+    assert response.status_code == 401
+    client.enqueue.assert_not_called()
+
+@pytest.mark.parametrize("payload, event", [
+    # Ignored actions and events are not validated, so incomplete bodies are fine
+    ({"action": "labeled", "issue": {"number": 1}}, "issues"),
+    ({"zen": "Keep it logically awesome."}, "ping"),
+])
+def test_unhandled_events_are_ignored_without_validation(client, payload, event):
+    response = post(client, payload, event=event)
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ignored"
+    client.enqueue.assert_not_called()
+
+def test_invalid_processed_event_is_rejected(client):
+    payload = issue_event()
+    del payload["issue"]["title"]
+
+    assert post(client, payload).status_code == 422
+
+def test_repeated_delivery_is_queued_once(client):
+    first = post(client, issue_event(), delivery="d-1")
+    repeat = post(client, issue_event(), delivery="d-1")
+    post(client, issue_event(), delivery="d-2")
+
+    assert first.json()["status"] == "accepted"
+    assert repeat.json()["status"] == "duplicate"
+    assert client.enqueue.call_count == 2
+
+def test_delivery_that_failed_to_queue_can_be_retried(client):
+    client.enqueue.side_effect = [RuntimeError("database locked"), 42]
+
+    with pytest.raises(RuntimeError):
+        post(client, issue_event(), delivery="d-1")
+
+    assert post(client, issue_event(), delivery="d-1").json()["status"] == "accepted"